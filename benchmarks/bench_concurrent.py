@@ -0,0 +1,113 @@
+"""
+Read throughput of a shared tree as the number of reader threads grows.
+
+Each reader thread performs a fixed number of lookups and short range
+scans through a ThreadPoolExecutor while one writer thread keeps
+inserting and deleting keys at a steady rate. The ConcurrentRedBlackTree
+reader-writer lock is compared with a single mutex around every call,
+and with lock free reads of a snapshot. Under CPython's GIL the tree
+code itself does not run in parallel, so this mostly shows how much the
+locking scheme costs and whether readers serialize behind each other.
+
+Run from the repository root:
+
+    python benchmarks/bench_concurrent.py
+"""
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from rbtree import RedBlackTree  # noqa: E402
+from rbtree_concurrent import ConcurrentRedBlackTree  # noqa: E402
+
+
+N = 50000
+READS_PER_THREAD = 20000
+THREADS = (1, 2, 4, 8)
+# Pause between the writer's updates, so the mix is read-mostly
+WRITE_PAUSE = 0.001
+
+
+class MutexTree():
+    """
+    The simplest thread-safe tree: one lock around every call.
+    """
+
+    def __init__(self: "MutexTree", tree: RedBlackTree) -> None:
+        self._tree = tree
+        self._lock = threading.Lock()
+
+    def search(self: "MutexTree", key: Any) -> Any:
+        with self._lock:
+            return self._tree.search(key)
+
+    def irange(self: "MutexTree", lo: Any, hi: Any) -> list:
+        with self._lock:
+            return list(self._tree.irange(lo, hi))
+
+    def insert(self: "MutexTree", key: Any) -> None:
+        with self._lock:
+            self._tree.insert(key)
+
+    def delete(self: "MutexTree", key: Any) -> None:
+        with self._lock:
+            self._tree.delete(key)
+
+
+def read(tree: Any, seed: int) -> None:
+    rng = random.Random(seed)
+    search = tree.search
+    for i in range(READS_PER_THREAD):
+        key = rng.randrange(2 * N)
+        if i % 16:
+            search(key)
+        else:
+            list(tree.irange(key, key + 20))
+
+
+def write(tree: Any, stop: threading.Event) -> None:
+    rng = random.Random(-1)
+    while not stop.is_set():
+        key = rng.randrange(2 * N)
+        tree.insert(key)
+        tree.delete(key)
+        time.sleep(WRITE_PAUSE)
+
+
+def run(label: str, reads: Any, writes: Any) -> None:
+    line = "%-10s" % label
+    for threads in THREADS:
+        stop = threading.Event()
+        writer = None
+        if writes is not None:
+            writer = threading.Thread(target=write, args=(writes, stop))
+            writer.start()
+        start = time.perf_counter()
+        with ThreadPoolExecutor(threads) as pool:
+            list(pool.map(read, [reads] * threads, range(threads)))
+        elapsed = time.perf_counter() - start
+        stop.set()
+        if writer is not None:
+            writer.join()
+        line += "  %2d: %9.0f reads/s" % (
+            threads, threads * READS_PER_THREAD / elapsed)
+    print(line)
+
+
+def main() -> None:
+    keys = range(0, 2 * N, 2)
+    run("mutex", *[MutexTree(RedBlackTree.from_sorted(keys))] * 2)
+    ctree = ConcurrentRedBlackTree(RedBlackTree.from_sorted(keys))
+    run("rwlock", ctree, ctree)
+    ctree = ConcurrentRedBlackTree(RedBlackTree.from_sorted(keys))
+    run("snapshot", ctree.snapshot(), ctree)
+
+
+if __name__ == "__main__":
+    main()
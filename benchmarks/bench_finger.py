@@ -0,0 +1,76 @@
+"""
+Compare plain and finger searches on access patterns with locality:
+monotonic inserts (timestamps), a sequential scan of nearby lookups, and
+random lookups, where the finger cannot help.
+
+Run from the repository root:
+
+    python benchmarks/bench_finger.py
+"""
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from rbtree import RedBlackTree  # noqa: E402
+
+
+N = 100000
+
+
+def tree(finger: bool) -> RedBlackTree:
+    bst = RedBlackTree()
+    if finger:
+        bst.enable_finger()
+    return bst
+
+
+def run(label: str, finger: bool) -> None:
+    keys = list(range(N))
+    shuffled = keys[:]
+    random.Random(1).shuffle(shuffled)
+    # Keys that move a short random distance each time
+    walk = []
+    key = N // 2
+    rng = random.Random(2)
+    for _ in range(N):
+        key = min(max(key + rng.randrange(-20, 21), 0), N - 1)
+        walk.append(key)
+
+    def ingest() -> None:
+        insert = tree(finger).insert
+        for k in keys:
+            insert(k)
+
+    bst = tree(finger)
+    bst.insert_many(keys)
+
+    def near() -> None:
+        search = bst.search
+        for k in walk:
+            search(k)
+
+    def near_floor() -> None:
+        floor = bst.floor
+        for k in walk:
+            floor(k + 0.5)
+
+    def scattered() -> None:
+        search = bst.search
+        for k in shuffled:
+            search(k)
+
+    print("%-8s ingest %.3f s  near search %.3f s  near floor %.3f s  "
+          "random search %.3f s" % (
+              label,
+              min(timeit.repeat(ingest, number=1, repeat=3)),
+              min(timeit.repeat(near, number=1, repeat=3)),
+              min(timeit.repeat(near_floor, number=1, repeat=3)),
+              min(timeit.repeat(scattered, number=1, repeat=3))))
+
+
+if __name__ == "__main__":
+    run("plain", False)
+    run("finger", True)
@@ -0,0 +1,133 @@
+"""
+Time insert, search and delete for different key types, and for a tree
+ordered by a key function.
+
+To check that the default int path does not get slower, save the timings
+of an older checkout and compare against them with the harness's
+regression check, which exits with status 1 on a regression:
+
+    git worktree add /tmp/before <commit>
+    python benchmarks/bench_keys.py --src /tmp/before/src --save before.json
+    python benchmarks/bench_keys.py --compare before.json
+
+Run from the repository root:
+
+    python benchmarks/bench_keys.py
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, List
+
+
+SRC = os.path.join(os.path.dirname(__file__), "..", "src")
+N = 50000
+
+
+def best_of(func: Callable[[], Any], setup: Callable[[], Any] = None,
+            repeat: int = 5) -> float:
+    """
+    Return the lowest CPU time of repeat calls to func, which is passed
+    the result of setup if one is given. setup is not timed.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        args = () if setup is None else (setup(),)
+        start = time.process_time()
+        func(*args)
+        best = min(best, time.process_time() - start)
+    return best
+
+
+def run(tree_class: type, label: str, keys: list, **kwargs: Any) -> dict:
+    def build() -> Any:
+        bst = tree_class(**kwargs)
+        insert = bst.insert
+        for key in keys:
+            insert(key)
+        return bst
+
+    def lookups() -> None:
+        search = bst.search
+        for key in keys:
+            search(key)
+
+    def deletes(bst: Any) -> None:
+        delete = bst.delete
+        for key in keys:
+            delete(key)
+
+    bst = build()
+    t_insert = best_of(build)
+    t_search = best_of(lookups)
+    t_delete = best_of(deletes, build)
+    print("%-12s insert %7.0f ns  search %7.0f ns  delete %7.0f ns" % (
+        label, t_insert / N * 1e9, t_search / N * 1e9, t_delete / N * 1e9))
+
+    tracemalloc.start()
+    try:
+        build()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    # Laid out like the results of harness.py, so its compare applies
+    return {
+        "insert": {"ops_per_sec": N / t_insert},
+        "search": {"ops_per_sec": N / t_search},
+        "delete": {"ops_per_sec": N / t_delete},
+        "peak_memory_bytes": peak,
+    }
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--src", default=SRC,
+                        help="directory to import rbtree from")
+    parser.add_argument("--save", help="write the results to this file")
+    parser.add_argument("--compare", help="results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed fractional regression (default 0.25)")
+    args = parser.parse_args(argv)
+
+    # Import the tree under test before the harness, which would
+    # otherwise import the one from this checkout
+    sys.path.insert(0, args.src)
+    from rbtree import RedBlackTree
+    from harness import compare
+
+    rng = random.Random(42)
+    ints = [rng.randrange(10 ** 9) for _ in range(N)]
+    results = {
+        "int": run(RedBlackTree, "int", ints),
+        "tuple": run(RedBlackTree, "tuple", [(k % 1000, k) for k in ints]),
+        "str": run(RedBlackTree, "str", ["%09d" % k for k in ints]),
+    }
+    try:
+        results["key=neg"] = run(RedBlackTree, "key=neg", ints,
+                                 key=lambda k: -k)
+    except TypeError:
+        # Trees from before key functions were supported
+        pass
+
+    if args.save:
+        with open(args.save, "w") as outfile:
+            json.dump(results, outfile, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare) as infile:
+            baseline = json.load(infile)
+        regressions = compare(results, baseline, args.tolerance)
+        for message in regressions:
+            print("REGRESSION: " + message, file=sys.stderr)
+        if regressions:
+            return 1
+        print("No regressions against " + args.compare)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
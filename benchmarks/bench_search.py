@@ -0,0 +1,71 @@
+"""
+Compare per-lookup cost of the iterative search against the old recursive
+search on the operation trace in tests/test_input.txt.
+
+Run from the repository root:
+
+    python benchmarks/bench_search.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from rbtree import Node, RedBlackTree  # noqa: E402
+
+
+TRACE = os.path.join(os.path.dirname(__file__), "..", "tests",
+                     "test_input.txt")
+
+
+def recursive_search(node: Node, key: int) -> Node:
+    """The recursive search_tree_helper this benchmark measures against."""
+    if node.is_null() or key == node.get_key():
+        return node
+
+    if key < node.get_key():
+        return recursive_search(node.left, key)
+    return recursive_search(node.right, key)
+
+
+def load_trace(path: str) -> tuple:
+    bst = RedBlackTree()
+    keys = []
+    with open(path) as infile:
+        for line in infile:
+            op, key = line.split()
+            key = int(key)
+            keys.append(key)
+            if op == "a":
+                bst.insert(key)
+            else:
+                bst.delete(key)
+    return bst, keys
+
+
+def main() -> None:
+    bst, keys = load_trace(TRACE)
+    root = bst.get_root()
+    repeat = 5
+
+    def iterative() -> None:
+        search = bst.search
+        for key in keys:
+            search(key)
+
+    def recursive() -> None:
+        for key in keys:
+            recursive_search(root, key)
+
+    t_iter = min(timeit.repeat(iterative, number=1, repeat=repeat))
+    t_rec = min(timeit.repeat(recursive, number=1, repeat=repeat))
+    n = len(keys)
+    print("tree size:  %d, lookups per run: %d" % (bst.size, n))
+    print("recursive:  %.1f ns/lookup" % (t_rec / n * 1e9))
+    print("iterative:  %.1f ns/lookup" % (t_iter / n * 1e9))
+    print("speedup:    %.2fx" % (t_rec / t_iter))
+
+
+if __name__ == "__main__":
+    main()
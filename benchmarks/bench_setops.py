@@ -0,0 +1,66 @@
+"""
+Time union, intersection and difference of a large and a small tree
+against the obvious loops of insert/search calls, and split plus join
+against rebuilding the halves.
+
+Run from the repository root:
+
+    python benchmarks/bench_setops.py
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from rbtree import RedBlackTree  # noqa: E402
+
+
+N = 200000
+SMALL = (100, 10000, 100000)
+
+
+def timed(func: object) -> float:
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    rng = random.Random(1)
+    big_keys = sorted(rng.sample(range(10 * N), N))
+    for m in SMALL:
+        small_keys = sorted(rng.sample(range(10 * N), m))
+
+        def trees() -> tuple:
+            return (RedBlackTree.from_sorted(big_keys),
+                    RedBlackTree.from_sorted(small_keys))
+
+        line = "m=%-7d" % m
+        big, small = trees()
+        line += " union %8.4f s" % timed(lambda: big.union(small))
+        big, small = trees()
+
+        def loop_union() -> None:
+            for node in small.iter_inorder():
+                if big.search(node._key) is big.TNULL:
+                    big.insert(node._key)
+
+        line += " (loop %8.4f s)" % timed(loop_union)
+        big, small = trees()
+        line += "  intersection %8.4f s" % timed(
+            lambda: big.intersection(small))
+        big, small = trees()
+        line += "  difference %8.4f s" % timed(lambda: big.difference(small))
+        print(line)
+
+    bst = RedBlackTree.from_sorted(big_keys)
+    pivot = big_keys[N // 3]
+    print("split %.6f s" % timed(lambda: bst.split(pivot)))
+    lower, upper = RedBlackTree.from_sorted(big_keys).split(pivot)
+    print("join  %.6f s" % timed(lambda: lower.join(pivot - 0.5, upper)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Batch ingest and range aggregation throughput of ShardedRedBlackTree for
+different numbers of worker processes, next to a single in-process
+RedBlackTree. Scaling is bounded by the number of cores and by the cost
+of pickling batches across the pipes.
+
+Run from the repository root:
+
+    python benchmarks/bench_sharded.py
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from rbtree import RedBlackTree  # noqa: E402
+from rbtree_sharded import ShardedRedBlackTree  # noqa: E402
+
+
+N = 200000
+BATCH = 20000
+QUERIES = 50
+SHARDS = (1, 2, 4, 8)
+
+
+def sum_values(pairs: object) -> int:
+    return sum(value for _, value in pairs)
+
+
+def main() -> None:
+    rng = random.Random(7)
+    pairs = [(rng.randrange(10 ** 9), 1) for _ in range(N)]
+    batches = [pairs[i:i + BATCH] for i in range(0, N, BATCH)]
+    ranges = [sorted(rng.randrange(10 ** 9) for _ in range(2))
+              for _ in range(QUERIES)]
+    print("cores: %d" % os.cpu_count())
+
+    start = time.perf_counter()
+    bst = RedBlackTree()
+    for batch in batches:
+        bst.insert_many(batch, items=True)
+    ingest = time.perf_counter() - start
+    start = time.perf_counter()
+    for lo, hi in ranges:
+        sum(node.value for node in bst.irange(lo, hi))
+    query = time.perf_counter() - start
+    print("%-10s ingest %9.0f keys/s  aggregate %7.1f ranges/s" % (
+        "in-process", N / ingest, QUERIES / query))
+
+    for shards in SHARDS:
+        with ShardedRedBlackTree(shards=shards) as stree:
+            start = time.perf_counter()
+            for batch in batches:
+                stree.insert_many(batch, items=True)
+            ingest = time.perf_counter() - start
+            start = time.perf_counter()
+            for lo, hi in ranges:
+                sum(stree.map_range(sum_values, lo, hi))
+            query = time.perf_counter() - start
+        print("%-10s ingest %9.0f keys/s  aggregate %7.1f ranges/s" % (
+            "%d shards" % shards, N / ingest, QUERIES / query))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,306 @@
+"""
+Benchmark harness for RedBlackTree.
+
+Replays operation traces (like tests/test_input.txt) and synthetic
+workloads against a fresh tree and reports, per kind of operation,
+throughput, median and 99th percentile latency, plus the peak memory of
+each workload. Results can be saved as a baseline and later runs
+compared against it; a regression beyond the tolerance makes the script
+exit with status 1.
+
+Trace files have one operation per line:
+
+    a <key>          insert key
+    r <key>          delete key
+    s <key>          search for key
+    g <key>          bst[key]
+    p <key> <value>  bst[key] = value
+
+Examples, run from the repository root:
+
+    python benchmarks/harness.py
+    python benchmarks/harness.py --workload random zipf -n 20000
+    python benchmarks/harness.py --save benchmarks/baseline.json
+    python benchmarks/harness.py --compare benchmarks/baseline.json
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+from itertools import accumulate
+from typing import Callable, Dict, List, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from rbtree import RedBlackTree  # noqa: E402
+
+
+DEFAULT_TRACE = os.path.join(os.path.dirname(__file__), "..", "tests",
+                             "test_input.txt")
+
+# Trace opcode -> name used in reports
+KINDS = {"a": "insert", "r": "delete", "s": "search", "g": "getitem",
+         "p": "setitem"}
+
+# How many full inorder traversals to time after each workload
+TRAVERSALS = 5
+
+Op = Tuple[str, int, int]
+
+
+# Workloads #
+def load_trace(path: str) -> List[Op]:
+    ops = []
+    with open(path) as infile:
+        for line in infile:
+            sline = line.split()
+            if not sline:
+                continue
+            value = int(sline[2]) if len(sline) > 2 else 0
+            ops.append((sline[0], int(sline[1]), value))
+    return ops
+
+
+def sequential_ops(n: int, seed: int = 0) -> List[Op]:
+    """
+    Insert keys 0..n-1 in order, look each one up, then delete them in
+    the same order. Exercises the rotation-heavy monotonic insert path.
+    """
+    ops = [("a", key, 0) for key in range(n)]
+    ops += [("s", key, 0) for key in range(n)]
+    ops += [("r", key, 0) for key in range(n)]
+    return ops
+
+
+def random_ops(n: int, seed: int = 0) -> List[Op]:
+    """
+    A uniform mix of inserts, deletes, searches and mapping accesses over
+    a key space four times larger than the number of operations.
+    """
+    rng = random.Random(seed)
+    space = 4 * n
+    ops = []
+    for _ in range(n):
+        key = rng.randrange(space)
+        ops.append((rng.choice("aarsgp"), key, key))
+    return ops
+
+
+def zipf_ops(n: int, seed: int = 0, s: float = 1.1) -> List[Op]:
+    """
+    Mostly reads and updates whose keys follow a Zipf distribution, so a
+    few hot keys receive most of the traffic.
+    """
+    rng = random.Random(seed)
+    universe = max(n // 4, 1)
+    cum_weights = list(accumulate(1.0 / (rank ** s)
+                                  for rank in range(1, universe + 1)))
+    # Scatter the popularity ranks over the key space
+    keys = rng.sample(range(10 * universe), universe)
+    ops = [("a", key, 0) for key in keys]
+    for key in rng.choices(keys, cum_weights=cum_weights, k=n):
+        ops.append((rng.choice("ssgpp"), key, key))
+    return ops
+
+
+def sliding_window_ops(n: int, seed: int = 0, window: int = 1000) -> List[Op]:
+    """
+    Insert increasing timestamps, expire the oldest once the window is
+    full and look up a recent timestamp after every step.
+    """
+    rng = random.Random(seed)
+    ops = []
+    for ts in range(n):
+        ops.append(("a", ts, 0))
+        if ts >= window:
+            ops.append(("r", ts - window, 0))
+        ops.append(("s", ts - rng.randrange(min(ts + 1, window)), 0))
+    return ops
+
+
+GENERATORS: Dict[str, Callable[..., List[Op]]] = {
+    "sequential": sequential_ops,
+    "random": random_ops,
+    "zipf": zipf_ops,
+    "window": sliding_window_ops,
+}
+
+
+# Measurement #
+def replay(ops: List[Op]) -> Tuple[RedBlackTree, Dict[str, List[int]]]:
+    """
+    Apply ops to a fresh tree, timing every operation in nanoseconds.
+    """
+    bst = RedBlackTree()
+    clock = time.perf_counter_ns
+    timings: Dict[str, List[int]] = {kind: [] for kind in KINDS.values()}
+    t_insert = timings["insert"].append
+    t_delete = timings["delete"].append
+    t_search = timings["search"].append
+    t_get = timings["getitem"].append
+    t_set = timings["setitem"].append
+
+    for op, key, value in ops:
+        if op == "a":
+            start = clock()
+            bst.insert(key)
+            t_insert(clock() - start)
+        elif op == "r":
+            start = clock()
+            bst.delete(key)
+            t_delete(clock() - start)
+        elif op == "s":
+            start = clock()
+            bst.search(key)
+            t_search(clock() - start)
+        elif op == "g":
+            start = clock()
+            try:
+                bst[key]
+            except KeyError:
+                pass
+            t_get(clock() - start)
+        elif op == "p":
+            start = clock()
+            bst[key] = value
+            t_set(clock() - start)
+        else:
+            raise ValueError("Unknown trace operation: " + op)
+    return bst, timings
+
+
+def time_traversals(bst: RedBlackTree) -> List[int]:
+    """
+    Time full inorder traversals, as nanoseconds per visited node.
+    """
+    if not bst.size:
+        return []
+    clock = time.perf_counter_ns
+    per_node = []
+    for _ in range(TRAVERSALS):
+        start = clock()
+        for _node in bst.iter_inorder():
+            pass
+        per_node.append((clock() - start) // bst.size)
+    return per_node
+
+
+def peak_memory(ops: List[Op]) -> int:
+    tracemalloc.start()
+    try:
+        replay(ops)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def summarize(latencies: List[int], count: int) -> dict:
+    ordered = sorted(latencies)
+    total = sum(ordered)
+    return {
+        "ops": count,
+        "ops_per_sec": count / (total / 1e9) if total else 0.0,
+        "p50_ns": ordered[len(ordered) // 2],
+        "p99_ns": ordered[min(len(ordered) - 1, len(ordered) * 99 // 100)],
+    }
+
+
+def run_workload(ops: List[Op]) -> dict:
+    bst, timings = replay(ops)
+    result = {}
+    for kind, latencies in timings.items():
+        if latencies:
+            result[kind] = summarize(latencies, len(latencies))
+    traversal = time_traversals(bst)
+    if traversal:
+        stats = summarize(traversal, bst.size * len(traversal))
+        stats["ops_per_sec"] = 1e9 / (sum(traversal) / len(traversal))
+        result["traverse"] = stats
+    result["peak_memory_bytes"] = peak_memory(ops)
+    return result
+
+
+# Reporting #
+def report(results: dict) -> None:
+    for workload, result in results.items():
+        print("%s (peak memory %.1f MiB)" % (
+            workload, result["peak_memory_bytes"] / 2 ** 20))
+        for kind, stats in result.items():
+            if kind == "peak_memory_bytes":
+                continue
+            print("  %-9s %8d ops %12.0f ops/s  p50 %7d ns  p99 %7d ns" % (
+                kind, stats["ops"], stats["ops_per_sec"], stats["p50_ns"],
+                stats["p99_ns"]))
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> List[str]:
+    """
+    Return a message for every throughput drop or peak memory increase
+    larger than tolerance (a fraction) relative to the baseline.
+    """
+    regressions = []
+    for workload, result in results.items():
+        base = baseline.get(workload)
+        if base is None:
+            continue
+        for kind, stats in result.items():
+            if kind == "peak_memory_bytes" or kind not in base:
+                continue
+            old = base[kind]["ops_per_sec"]
+            new = stats["ops_per_sec"]
+            if new < old * (1 - tolerance):
+                regressions.append("%s/%s: %.0f ops/s, baseline %.0f" % (
+                    workload, kind, new, old))
+        old_mem = base.get("peak_memory_bytes")
+        new_mem = result["peak_memory_bytes"]
+        if old_mem and new_mem > old_mem * (1 + tolerance):
+            regressions.append("%s: peak memory %d bytes, baseline %d" % (
+                workload, new_mem, old_mem))
+    return regressions
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--trace", nargs="*", default=[DEFAULT_TRACE],
+                        help="operation trace files to replay")
+    parser.add_argument("--workload", nargs="*", default=list(GENERATORS),
+                        choices=list(GENERATORS),
+                        help="synthetic workloads to run")
+    parser.add_argument("-n", type=int, default=50000,
+                        help="operations per synthetic workload")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save", help="write the results to this file")
+    parser.add_argument("--compare", help="baseline file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed fractional regression (default 0.25)")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for path in args.trace:
+        results["trace:" + os.path.basename(path)] = \
+            run_workload(load_trace(path))
+    for name in args.workload:
+        results[name] = run_workload(GENERATORS[name](args.n, args.seed))
+    report(results)
+
+    if args.save:
+        with open(args.save, "w") as outfile:
+            json.dump(results, outfile, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare) as infile:
+            baseline = json.load(infile)
+        regressions = compare(results, baseline, args.tolerance)
+        for message in regressions:
+            print("REGRESSION: " + message, file=sys.stderr)
+        if regressions:
+            return 1
+        print("No regressions against " + args.compare)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
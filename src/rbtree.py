@@ -1,85 +1,413 @@
 # Implementing Red-Black Tree in Python
 # Adapted from https://www.programiz.com/dsa/red-black-tree
 
+import copy
+import mmap
+import pickle
+import struct
 import sys
-from typing import Type, TypeVar, Iterator
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import ItemsView, KeysView, ValuesView
+from operator import attrgetter
+from typing import Any, Callable, Iterable, Iterator, Type, TypeVar
 
 
 T = TypeVar('T', bound='Node')
 
+# Node colors. These are stored directly on nodes; the strings accepted by
+# Node.get_color/Node.set_color are only a compatibility layer.
+BLACK = 0
+RED = 1
+
 
 # Node creation
 class Node():
+    __slots__ = ("_key", "parent", "left", "right", "_color", "value",
+                 "_size")
 
-    def __init__(self: T, key: int) -> None:
+    def __init__(self: T, key: Any) -> None:
         self._key = key
         self.parent = None
         self.left = None
         self.right = None
-        self._color = 1
+        self._color = RED
         self.value = None
+        # Number of nodes in the subtree rooted here
+        self._size = 1
 
     def __repr__(self: T) -> str:
-        return "Key: " + str(self._key) + " Value: " + str(self.value)
+        return "Key: " + str(self.get_key()) + " Value: " + str(self.value)
 
     def get_color(self: T) -> str:
-        return "black" if self._color == 0 else "red"
+        return "black" if self._color == BLACK else "red"
 
     def set_color(self: T, color: str) -> None:
         if color == "black":
-            self._color = 0
+            self._color = BLACK
         elif color == "red":
-            self._color = 1
+            self._color = RED
         else:
             raise Exception("Unknown color")
 
-    def get_key(self: T) -> int:
+    def get_key(self: T) -> Any:
         return self._key
 
     def is_red(self: T) -> bool:
-        return self._color == 1
+        return self._color == RED
 
     def is_black(self: T) -> bool:
-        return self._color == 0
+        return self._color == BLACK
 
     def is_null(self: T) -> bool:
         return self._key is None
 
     def depth(self: T) -> int:
-        return 0 if self.parent is None else self.parent.depth() + 1
+        depth = 0
+        node = self.parent
+        while node is not None:
+            depth += 1
+            node = node.parent
+        return depth
 
     @classmethod
     def null(cls: Type[T]) -> T:
         node = cls(0)
         node._key = None
-        node.set_color("black")
+        node._color = BLACK
+        node._size = 0
         return node
 
 
+class KeyedNode(Node):
+    """
+    Node for trees ordered by a key function. The result of the key
+    function is computed once and kept in _key, which is what the tree
+    compares; get_key returns the key that was originally inserted.
+    """
+    __slots__ = ("_orig",)
+
+    def __init__(self: T, sort_key: Any, key: Any) -> None:
+        super().__init__(sort_key)
+        self._orig = key
+
+    def get_key(self: T) -> Any:
+        return self._orig
+
+
+class TreeStats():
+    """
+    Counters collected by a RedBlackTree while stats are enabled.
+    """
+
+    def __init__(self: "TreeStats") -> None:
+        self.hooks = []
+        self.reset()
+
+    def reset(self: "TreeStats") -> None:
+        self.rotations = 0
+        self.recolors = 0
+        self.insert_fixup_iterations = 0
+        self.delete_fixup_iterations = 0
+        # Histograms mapping comparisons per descent to number of descents
+        self.search_comparisons = {}
+        self.insert_comparisons = {}
+
+    def record(self: "TreeStats", event: str, value: Any) -> None:
+        if event == "rotation":
+            self.rotations += 1
+        elif event == "search":
+            histogram = self.search_comparisons
+            histogram[value] = histogram.get(value, 0) + 1
+        elif event == "insert":
+            histogram = self.insert_comparisons
+            histogram[value] = histogram.get(value, 0) + 1
+        for hook in self.hooks:
+            hook(event, value)
+
+    def fixup(self: "TreeStats", event: str, iterations: int,
+              recolors: int) -> None:
+        self.recolors += recolors
+        if event == "insert_fixup":
+            self.insert_fixup_iterations += iterations
+        else:
+            self.delete_fixup_iterations += iterations
+        for hook in self.hooks:
+            hook(event, iterations)
+
+    def snapshot(self: "TreeStats") -> dict:
+        return {
+            "rotations": self.rotations,
+            "recolors": self.recolors,
+            "insert_fixup_iterations": self.insert_fixup_iterations,
+            "delete_fixup_iterations": self.delete_fixup_iterations,
+            "search_comparisons": dict(self.search_comparisons),
+            "insert_comparisons": dict(self.insert_comparisons),
+        }
+
+
 T = TypeVar('T', bound='RedBlackTree')
 
+# Sorts nodes by the key the tree compares on
+_node_sort_key = attrgetter("_key")
+
+# Marks an omitted default argument, so None can still be passed explicitly
+_MISSING = object()
+
 
 class RedBlackTree():
-    def __init__(self: T) -> None:
-        self.TNULL = Node.null()
+    # insert_many/delete_many rebuild the whole tree once a batch holds at
+    # least 1/rebuild_ratio as many keys as the tree
+    rebuild_ratio = 4
+    # Node classes for plain and key-function trees
+    _node_class = Node
+    _keyed_node_class = KeyedNode
+    # Subclasses that keep a summary of each subtree in its root set this
+    # and implement _pull; the tree then calls _pull on every node whose
+    # subtree changed, children before parents.
+    _augmented = False
+
+    def __init__(self: T, key: Callable = None) -> None:
+        """
+        Keys can be of any mutually comparable type. If a key function is
+        given, the tree is ordered by key(k) instead of k, like sorted().
+        It is called once per inserted node and once per lookup.
+        """
+        self.TNULL = self._node_class.null()
         self.root = self.TNULL
         self.size = 0
+        # Leftmost and rightmost nodes, or TNULL when empty
+        self._first = self.TNULL
+        self._last = self.TNULL
+        # Last node accessed, or None while finger search is off
+        self._finger = None
         self._iter_format = 0
+        self._key_func = key
+        self._stats = None
+
+    @classmethod
+    def from_sorted(cls: Type[T], iterable: Iterable, items: bool = False,
+                    key: Callable = None) -> T:
+        """
+        Build a tree from an iterable of keys (or of (key, value) pairs if
+        items is True) in linear time. The input is expected to already be
+        in ascending key order; if it is not, it is sorted first.
+        """
+        return cls(key=key)._load_sorted(iterable, items)
+
+    def _load_sorted(self: T, iterable: Iterable, items: bool) -> T:
+        """
+        Fill an empty tree for from_sorted. Subclasses whose constructor
+        takes more arguments reuse this from their own from_sorted.
+        """
+        if items:
+            nodes = [self._new_node(k, v) for k, v in iterable]
+        else:
+            nodes = [self._new_node(k) for k in iterable]
+        if not all(nodes[i]._key <= nodes[i + 1]._key
+                   for i in range(len(nodes) - 1)):
+            nodes.sort(key=_node_sort_key)
+        self._build(nodes)
+        return self
+
+    def _new_node(self: T, key: Any, value: Any = None) -> Node:
+        """
+        Create an unlinked node for key, applying the key function if the
+        tree has one.
+        """
+        if self._key_func is None:
+            node = self._node_class(key)
+        else:
+            node = self._keyed_node_class(self._key_func(key), key)
+        node.value = value
+        return node
+
+    def _build(self: T, nodes: list) -> None:
+        """
+        Replace the contents of the tree with the given list of nodes,
+        which must be in key order. The nodes are linked into a balanced
+        tree in which every level is black except for an incomplete
+        bottom level, which is red.
+        """
+        tnull = self.TNULL
+        red_depth = (len(nodes) + 1).bit_length() - 1
+        pull = self._pull if self._augmented else None
+
+        def build(lo: int, hi: int, parent: Node, depth: int) -> Node:
+            if lo >= hi:
+                return tnull
+            mid = (lo + hi) // 2
+            node = nodes[mid]
+            node.parent = parent
+            node._color = RED if depth == red_depth else BLACK
+            node._size = hi - lo
+            node.left = build(lo, mid, node, depth + 1)
+            node.right = build(mid + 1, hi, node, depth + 1)
+            if pull is not None:
+                pull(node)
+            return node
+
+        self.root = build(0, len(nodes), None, 0)
+        self.size = len(nodes)
+        self._first = nodes[0] if nodes else tnull
+        self._last = nodes[-1] if nodes else tnull
+        if self._finger is not None:
+            self._finger = tnull
 
     # Dunder Methods #
-    def __iter__(self: T) -> Iterator:
+    def __iter__(self: T) -> Iterator[Node]:
         if self._iter_format == 0:
-            return iter(self.preorder())
+            return self.iter_preorder()
         if self._iter_format == 1:
-            return iter(self.inorder())
+            return self.iter_inorder()
         if self._iter_format == 2:
-            return iter(self.postorder())
+            return self.iter_postorder()
+
+    def __len__(self: T) -> int:
+        return self.size
+
+    def __contains__(self: T, key: Any) -> bool:
+        return self.search(key) is not self.TNULL
+
+    def __getitem__(self: T, key: Any) -> Any:
+        node = self.search(key)
+        if node is self.TNULL:
+            raise KeyError(key)
+        return node.value
+
+    def __setitem__(self: T, key: Any, value: Any) -> None:
+        node, added = self._find_or_add(key, value)
+        if not added:
+            node.value = value
+            if self._augmented:
+                self._pull_up(node)
+
+    def __delitem__(self: T, key: Any) -> None:
+        if self.delete(key) is self.TNULL:
+            raise KeyError(key)
+
+    # Mapping Methods #
+    def get(self: T, key: Any, default: Any = None) -> Any:
+        node = self.search(key)
+        return default if node is self.TNULL else node.value
+
+    def setdefault(self: T, key: Any, default: Any = None) -> Any:
+        return self._find_or_add(key, default)[0].value
+
+    def pop(self: T, key: Any, default: Any = _MISSING) -> Any:
+        node = self.delete(key)
+        if node is self.TNULL:
+            if default is _MISSING:
+                raise KeyError(key)
+            return default
+        return node.value
+
+    def keys(self: T) -> "TreeKeysView":
+        return TreeKeysView(self)
+
+    def values(self: T) -> "TreeValuesView":
+        return TreeValuesView(self)
+
+    def items(self: T) -> "TreeItemsView":
+        return TreeItemsView(self)
+
+    # Instrumentation #
+    def enable_stats(self: T) -> None:
+        """
+        Start counting rotations, recolors, fix-up loop iterations and
+        comparisons per search/insert descent. While stats are disabled
+        (the default) these counters cost next to nothing.
+        """
+        if self._stats is None:
+            self._stats = TreeStats()
 
-    def __getitem__(self: T, key: int) -> int:
-        return self.search(key).value
+    def disable_stats(self: T) -> None:
+        """
+        Stop counting and drop the collected counters and hooks.
+        """
+        self._stats = None
 
-    def __setitem__(self: T, key: int, value: int) -> None:
-        self.search(key).value = value
+    def reset_stats(self: T) -> None:
+        if self._stats is not None:
+            self._stats.reset()
+
+    def stats(self: T) -> dict:
+        """
+        Return a snapshot of the counters, or None if stats are disabled.
+        """
+        return None if self._stats is None else self._stats.snapshot()
+
+    def add_stats_hook(self: T, hook: Callable[[str, Any], None]) -> None:
+        """
+        Call hook(event, value) for every instrumented event, enabling
+        stats if needed. Events are "rotation" (value "left" or "right"),
+        "insert_fixup" and "delete_fixup" (value is the number of loop
+        iterations) and "search" and "insert" (value is the number of
+        comparisons in the descent).
+        """
+        self.enable_stats()
+        self._stats.hooks.append(hook)
+
+    def remove_stats_hook(self: T, hook: Callable[[str, Any], None]) -> None:
+        if self._stats is not None:
+            self._stats.hooks.remove(hook)
+
+    # Finger search #
+    def enable_finger(self: T) -> None:
+        """
+        Remember the last node found or inserted, and start later
+        lookups from it. search, insert, delete, floor, ceiling and the
+        bound lookups then climb from the finger only as far as needed,
+        so a key at distance d from the previous one costs O(log d)
+        comparisons instead of O(log n). Keys beyond either end of the
+        tree start from the cached minimum or maximum.
+        """
+        if self._finger is None:
+            self._finger = self.TNULL
+
+    def disable_finger(self: T) -> None:
+        self._finger = None
+
+    def _reads_update(self: T) -> bool:
+        """
+        Whether lookups change the tree's state, so that concurrent
+        readers need exclusive access.
+        """
+        return self._finger is not None
+
+    def _climb(self: T, key: Any, after: bool) -> tuple:
+        """
+        Return (node, bound) where node is the lowest ancestor of the
+        finger whose subtree holds every node between the finger and
+        key, so a descent for key can start there. Equal keys count as
+        after the finger if after is set. bound is the parent the climb
+        stopped below, or TNULL: the nearest node beyond the subtree on
+        the side of key, for nearest-key lookups that come up empty.
+        """
+        tnull = self.TNULL
+        node = self._finger
+        if node is tnull:
+            return self.root, tnull
+        last = self._last
+        if last._key < key or (after and last._key == key):
+            return last, tnull
+        first = self._first
+        if key < first._key or (not after and key == first._key):
+            return first, tnull
+
+        parent = node.parent
+        if node._key < key or (after and node._key == key):
+            # Up to the first ancestor whose key is above key
+            while parent is not None and \
+                    (node is parent.right or not key < parent._key):
+                node = parent
+                parent = node.parent
+        else:
+            while parent is not None and \
+                    (node is parent.left or not parent._key < key):
+                node = parent
+                parent = node.parent
+        return node, tnull if parent is None else parent
 
     # Setters and Getters #
     def get_root(self: T) -> Node:
@@ -110,139 +438,271 @@ class RedBlackTree():
         Perform a preorder tree traversal starting at the
         given node.
         """
-        output = []
-        if not node.is_null():
-            left = self.pre_order_helper(node.left)
-            right = self.pre_order_helper(node.right)
-            output.extend([node])
-            output.extend(left)
-            output.extend(right)
-        return output
+        return list(self.iter_preorder(node))
 
     def in_order_helper(self: T, node: Node) -> list:
         """
         Perform a inorder tree traversal starting at the
         given node.
         """
-        output = []
-        if not node.is_null():
-            left = self.in_order_helper(node.left)
-            right = self.in_order_helper(node.right)
-            output.extend(left)
-            output.extend([node])
-            output.extend(right)
-        return output
+        return list(self.iter_inorder(node))
 
     def post_order_helper(self: T, node: Node) -> list:
-        output = []
-        if not node.is_null():
-            left = self.post_order_helper(node.left)
-            right = self.post_order_helper(node.right)
-            output.extend(left)
-            output.extend(right)
-            output.extend([node])
-        return output
+        return list(self.iter_postorder(node))
 
-    # Search the tree
-    def search_tree_helper(self: T, node: Node, key: int) -> Node:
-        if node.is_null() or key == node.get_key():
-            return node
+    def iter_preorder(self: T, node: Node = None) -> Iterator[Node]:
+        """
+        Lazily yield the nodes of a preorder traversal starting at the
+        given node (the root by default). Each step is O(1) amortized
+        and only a stack of pending right children is kept.
+        """
+        tnull = self.TNULL
+        if node is None:
+            node = self.root
+        if node is tnull:
+            return
+        stack = [node]
+        pop = stack.pop
+        push = stack.append
+        while stack:
+            node = pop()
+            yield node
+            if node.right is not tnull:
+                push(node.right)
+            if node.left is not tnull:
+                push(node.left)
+
+    def iter_inorder(self: T, node: Node = None) -> Iterator[Node]:
+        """
+        Lazily yield the nodes of an inorder traversal starting at the
+        given node (the root by default).
+        """
+        tnull = self.TNULL
+        if node is None:
+            node = self.root
+        stack = []
+        pop = stack.pop
+        push = stack.append
+        while True:
+            while node is not tnull:
+                push(node)
+                node = node.left
+            if not stack:
+                return
+            node = pop()
+            yield node
+            node = node.right
 
-        if key < node.get_key():
-            return self.search_tree_helper(node.left, key)
-        return self.search_tree_helper(node.right, key)
+    def iter_postorder(self: T, node: Node = None) -> Iterator[Node]:
+        """
+        Lazily yield the nodes of a postorder traversal starting at the
+        given node (the root by default).
+        """
+        tnull = self.TNULL
+        if node is None:
+            node = self.root
+        stack = []
+        pop = stack.pop
+        push = stack.append
+        last = None
+        while stack or node is not tnull:
+            if node is not tnull:
+                push(node)
+                node = node.left
+                continue
+            top = stack[-1]
+            if top.right is not tnull and top.right is not last:
+                node = top.right
+            else:
+                yield top
+                last = pop()
+
+    # Search the tree
+    def search_tree_helper(self: T, node: Node, key: Any) -> Node:
+        tnull = self.TNULL
+        while node is not tnull:
+            node_key = node._key
+            if key == node_key:
+                return node
+            node = node.left if key < node_key else node.right
+        return node
 
     # Balancing the tree after deletion
     def delete_fix(self: T, x: Node) -> None:
-        while x != self.root and x.is_black():
-            if x == x.parent.left:
+        if self._stats is not None:
+            self._counted_delete_fix(x)
+            return
+        while x is not self.root and x._color == BLACK:
+            if x is x.parent.left:
                 s = x.parent.right
-                if s.is_red():
-                    s.set_color("black")
-                    x.parent.set_color("red")
+                if s._color == RED:
+                    s._color = BLACK
+                    x.parent._color = RED
                     self.left_rotate(x.parent)
                     s = x.parent.right
 
-                if s.left.is_black() and s.right.is_black():
-                    s.set_color("red")
+                if s.left._color == BLACK and s.right._color == BLACK:
+                    s._color = RED
                     x = x.parent
                 else:
-                    if s.right.is_black():
-                        s.left.set_color("black")
-                        s.set_color("red")
+                    if s.right._color == BLACK:
+                        s.left._color = BLACK
+                        s._color = RED
                         self.right_rotate(s)
                         s = x.parent.right
 
-                    s.set_color(x.parent.get_color())
-                    x.parent.set_color("black")
-                    s.right.set_color("black")
+                    s._color = x.parent._color
+                    x.parent._color = BLACK
+                    s.right._color = BLACK
                     self.left_rotate(x.parent)
                     x = self.root
             else:
                 s = x.parent.left
-                if s.is_red():
-                    s.set_color("black")
-                    x.parent.set_color("red")
+                if s._color == RED:
+                    s._color = BLACK
+                    x.parent._color = RED
                     self.right_rotate(x.parent)
                     s = x.parent.left
 
-                if s.left.is_black() and s.right.is_black():
-                    s.set_color("red")
+                if s.left._color == BLACK and s.right._color == BLACK:
+                    s._color = RED
                     x = x.parent
                 else:
-                    if s.left.is_black():
-                        s.right.set_color("black")
-                        s.set_color("red")
+                    if s.left._color == BLACK:
+                        s.right._color = BLACK
+                        s._color = RED
                         self.left_rotate(s)
                         s = x.parent.left
 
-                    s.set_color(x.parent.get_color())
-                    x.parent.set_color("black")
-                    s.left.set_color("black")
+                    s._color = x.parent._color
+                    x.parent._color = BLACK
+                    s.left._color = BLACK
                     self.right_rotate(x.parent)
                     x = self.root
-        x.set_color("black")
+        x._color = BLACK
+
+    def _counted_delete_fix(self: T, x: Node) -> None:
+        """
+        delete_fix, also counting loop iterations and recolors. Only used
+        while stats are enabled.
+        """
+        iterations = 0
+        recolors = 0
+        while x is not self.root and x._color == BLACK:
+            iterations += 1
+            if x is x.parent.left:
+                s = x.parent.right
+                if s._color == RED:
+                    s._color = BLACK
+                    x.parent._color = RED
+                    self.left_rotate(x.parent)
+                    s = x.parent.right
+                    recolors += 2
+
+                if s.left._color == BLACK and s.right._color == BLACK:
+                    s._color = RED
+                    x = x.parent
+                    recolors += 1
+                else:
+                    if s.right._color == BLACK:
+                        s.left._color = BLACK
+                        s._color = RED
+                        self.right_rotate(s)
+                        s = x.parent.right
+                        recolors += 2
+
+                    s._color = x.parent._color
+                    x.parent._color = BLACK
+                    s.right._color = BLACK
+                    self.left_rotate(x.parent)
+                    x = self.root
+                    recolors += 3
+            else:
+                s = x.parent.left
+                if s._color == RED:
+                    s._color = BLACK
+                    x.parent._color = RED
+                    self.right_rotate(x.parent)
+                    s = x.parent.left
+                    recolors += 2
+
+                if s.left._color == BLACK and s.right._color == BLACK:
+                    s._color = RED
+                    x = x.parent
+                    recolors += 1
+                else:
+                    if s.left._color == BLACK:
+                        s.right._color = BLACK
+                        s._color = RED
+                        self.left_rotate(s)
+                        s = x.parent.left
+                        recolors += 2
+
+                    s._color = x.parent._color
+                    x.parent._color = BLACK
+                    s.left._color = BLACK
+                    self.right_rotate(x.parent)
+                    x = self.root
+                    recolors += 3
+        recolors += x._color == RED
+        self._stats.fixup("delete_fixup", iterations, recolors)
+        x._color = BLACK
 
     def __rb_transplant(self: T, u: Node, v: Node) -> None:
         if u.parent is None:
             self.root = v
-        elif u == u.parent.left:
+        elif u is u.parent.left:
             u.parent.left = v
         else:
             u.parent.right = v
         v.parent = u.parent
 
     # Node deletion
-    def delete_node_helper(self: T, node: Node, key: int) -> None:
-        z = self.TNULL
-        while not node.is_null():
-            if node.get_key() == key:
-                z = node
-
-            if node.get_key() <= key:
-                node = node.right
-            else:
-                node = node.left
+    def delete_node_helper(self: T, node: Node, key: Any) -> Node:
+        """
+        Remove a node with the given key from the subtree rooted at node,
+        stopping at the first one found on the way down. Returns the
+        removed node, or TNULL if the key was not found.
+        """
+        tnull = self.TNULL
+        while node is not tnull:
+            node_key = node._key
+            if key == node_key:
+                break
+            node = node.left if key < node_key else node.right
 
-        if z.is_null():
+        if node is tnull:
             # print("Cannot find key in the tree")
-            return
+            return node
+        return self._remove(node)
+
+    def _remove(self: T, z: Node) -> Node:
+        """
+        Unlink node z from the tree and rebalance. Returns z.
+        """
+        tnull = self.TNULL
+        if z is self._first:
+            self._first = self.successor(z)
+        if z is self._last:
+            self._last = self.predecessor(z)
+        if z is self._finger:
+            self._finger = tnull
 
         y = z
-        y_original_color = y.get_color()
-        if z.left.is_null():
+        y_original_color = y._color
+        if z.left is tnull:
             # If no left child, just scoot the right subtree up
             x = z.right
             self.__rb_transplant(z, z.right)
-        elif (z.right.is_null()):
+        elif z.right is tnull:
             # If no right child, just scoot the left subtree up
             x = z.left
             self.__rb_transplant(z, z.left)
         else:
             y = self.minimum(z.right)
-            y_original_color = y.get_color()
+            y_original_color = y._color
             x = y.right
-            if y.parent == z:
+            if y.parent is z:
                 x.parent = y
             else:
                 self.__rb_transplant(y, y.right)
@@ -252,51 +712,125 @@ class RedBlackTree():
             self.__rb_transplant(z, y)
             y.left = z.left
             y.left.parent = y
-            y.set_color(z.get_color())
-        if y_original_color == "black":
+            y._color = z._color
+
+        # Every node whose subtree lost a node is on the path up from x
+        node = x.parent
+        while node is not None:
+            node._size = node.left._size + node.right._size + 1
+            node = node.parent
+        if self._augmented and x.parent is not None:
+            self._pull_up(x.parent)
+
+        if y_original_color == BLACK:
             self.delete_fix(x)
 
         self.size -= 1
+        return z
 
     # Balance the tree after insertion
-    def fix_insert(self: T, node: Node) -> None:
-        while node.parent.is_red():
-            if node.parent == node.parent.parent.right:
+    def fix_insert(self: T, node: Node) -> bool:
+        """
+        Restore the red-black properties after node was linked in red.
+        Returns whether the black height of the tree grew, which happens
+        when a red node is pushed up to the root.
+        """
+        if self._stats is not None:
+            return self._counted_fix_insert(node)
+        while node.parent._color == RED:
+            if node.parent is node.parent.parent.right:
+                u = node.parent.parent.left
+                if u._color == RED:
+                    u._color = BLACK
+                    node.parent._color = BLACK
+                    node.parent.parent._color = RED
+                    node = node.parent.parent
+                else:
+                    if node is node.parent.left:
+                        node = node.parent
+                        self.right_rotate(node)
+                    node.parent._color = BLACK
+                    node.parent.parent._color = RED
+                    self.left_rotate(node.parent.parent)
+            else:
+                u = node.parent.parent.right
+
+                if u._color == RED:
+                    u._color = BLACK
+                    node.parent._color = BLACK
+                    node.parent.parent._color = RED
+                    node = node.parent.parent
+                else:
+                    if node is node.parent.right:
+                        node = node.parent
+                        self.left_rotate(node)
+                    node.parent._color = BLACK
+                    node.parent.parent._color = RED
+                    self.right_rotate(node.parent.parent)
+            if node is self.root:
+                break
+        grew = self.root._color == RED
+        self.root._color = BLACK
+        return grew
+
+    def _counted_fix_insert(self: T, node: Node) -> bool:
+        """
+        fix_insert, also counting loop iterations and recolors. Only used
+        while stats are enabled.
+        """
+        iterations = 0
+        recolors = 0
+        while node.parent._color == RED:
+            iterations += 1
+            if node.parent is node.parent.parent.right:
                 u = node.parent.parent.left
-                if u.is_red():
-                    u.set_color("black")
-                    node.parent.set_color("black")
-                    node.parent.parent.set_color("red")
+                if u._color == RED:
+                    u._color = BLACK
+                    node.parent._color = BLACK
+                    node.parent.parent._color = RED
                     node = node.parent.parent
+                    recolors += 3
                 else:
-                    if node == node.parent.left:
+                    if node is node.parent.left:
                         node = node.parent
                         self.right_rotate(node)
-                    node.parent.set_color("black")
-                    node.parent.parent.set_color("red")
+                    node.parent._color = BLACK
+                    node.parent.parent._color = RED
                     self.left_rotate(node.parent.parent)
+                    recolors += 2
             else:
                 u = node.parent.parent.right
 
-                if u.is_red():
-                    u.set_color("black")
-                    node.parent.set_color("black")
-                    node.parent.parent.set_color("red")
+                if u._color == RED:
+                    u._color = BLACK
+                    node.parent._color = BLACK
+                    node.parent.parent._color = RED
                     node = node.parent.parent
+                    recolors += 3
                 else:
-                    if node == node.parent.right:
+                    if node is node.parent.right:
                         node = node.parent
                         self.left_rotate(node)
-                    node.parent.set_color("black")
-                    node.parent.parent.set_color("red")
+                    node.parent._color = BLACK
+                    node.parent.parent._color = RED
                     self.right_rotate(node.parent.parent)
-            if node == self.root:
+                    recolors += 2
+            if node is self.root:
                 break
-        self.root.set_color("black")
+        grew = self.root._color == RED
+        recolors += grew
+        self._stats.fixup("insert_fixup", iterations, recolors)
+        self.root._color = BLACK
+        return grew
 
     # Printing the tree
     def __print_helper(self: T, node: Node, indent: str, last: bool) -> None:
-        if not node.is_null():
+        tnull = self.TNULL
+        stack = [(node, indent, last)]
+        while stack:
+            node, indent, last = stack.pop()
+            if node is tnull:
+                continue
             sys.stdout.write(indent)
             if last:
                 sys.stdout.write("R----  ")
@@ -307,15 +841,83 @@ class RedBlackTree():
 
             s_color = "RED" if node.is_red() else "BLACK"
             print(str(node.get_key()) + "(" + s_color + ")")
-            self.__print_helper(node.left, indent, False)
-            self.__print_helper(node.right, indent, True)
+            stack.append((node.right, indent, True))
+            stack.append((node.left, indent, False))
+
+    def search(self: T, key: Any) -> Node:
+        if self._key_func is not None:
+            key = self._key_func(key)
+        if self._stats is not None:
+            return self._counted_search(key)
+        if self._finger is None:
+            return self.search_tree_helper(self.root, key)
+        return self._finger_search(key)
+
+    def _finger_search(self: T, key: Any) -> Node:
+        """
+        search_tree_helper starting from the finger, with the climb of
+        _climb inlined since lookups are the most common operation.
+        """
+        tnull = self.TNULL
+        node = self._finger
+        if node is tnull:
+            node = self.root
+        else:
+            parent = node.parent
+            node_key = node._key
+            if key == node_key:
+                return node
+            if node_key < key:
+                if self._last._key < key:
+                    return tnull
+                while parent is not None and \
+                        (node is parent.right or not key < parent._key):
+                    node = parent
+                    parent = node.parent
+            else:
+                if key < self._first._key:
+                    return tnull
+                while parent is not None and \
+                        (node is parent.left or not parent._key < key):
+                    node = parent
+                    parent = node.parent
+        while node is not tnull:
+            node_key = node._key
+            if key == node_key:
+                self._finger = node
+                return node
+            node = node.left if key < node_key else node.right
+        return node
 
-    def search(self: T, key: int) -> Node:
-        return self.search_tree_helper(self.root, key)
+    def _counted_search(self: T, key: Any) -> Node:
+        """
+        search, recording how many nodes the descent compared against,
+        after the climb from the finger if there is one. Only used while
+        stats are enabled.
+        """
+        tnull = self.TNULL
+        node = self.root
+        finger = self._finger
+        if finger is not None and finger is not tnull:
+            if key == finger._key:
+                self._stats.record("search", 1)
+                return finger
+            node = self._climb(key, False)[0]
+        comparisons = 0
+        while node is not tnull:
+            comparisons += 1
+            node_key = node._key
+            if key == node_key:
+                break
+            node = node.left if key < node_key else node.right
+        if finger is not None and node is not tnull:
+            self._finger = node
+        self._stats.record("search", comparisons)
+        return node
 
     def minimum(self: T, node: Node = None) -> Node:
         if node is None:
-            node = self.root
+            return self._first
         if node.is_null():
             return self.TNULL
         while not node.left.is_null():
@@ -324,7 +926,7 @@ class RedBlackTree():
 
     def maximum(self: T, node: Node = None) -> Node:
         if node is None:
-            node = self.root
+            return self._last
         if node.is_null():
             return self.TNULL
         while not node.right.is_null():
@@ -332,95 +934,1220 @@ class RedBlackTree():
         return node
 
     def successor(self: T, x: Node) -> Node:
-        if not x.right.is_null():
-            return self.minimum(x.right)
-
-        y = x.parent
-        while not y.is_null() and x == y.right:
-            x = y
-            y = y.parent
+        tnull = self.TNULL
+        if x.right is not tnull:
+            y = self.minimum(x.right)
+        else:
+            y = x.parent
+            while y is not None and x is y.right:
+                x = y
+                y = y.parent
+            if y is None:
+                return tnull
+        if self._finger is not None:
+            self._finger = y
         return y
 
     def predecessor(self: T,  x: Node) -> Node:
-        if (not x.left.is_null()):
-            return self.maximum(x.left)
+        tnull = self.TNULL
+        if x.left is not tnull:
+            y = self.maximum(x.left)
+        else:
+            y = x.parent
+            while y is not None and x is y.left:
+                x = y
+                y = y.parent
+            if y is None:
+                return tnull
+        if self._finger is not None:
+            self._finger = y
+        return y
+
+    # Range queries #
+    def _first_above(self: T, key: Any, inclusive: bool) -> Node:
+        """
+        Return the first node (in key order) whose key is greater than
+        (or, if inclusive, equal to) key, or TNULL if there is none.
+        """
+        tnull = self.TNULL
+        if self._finger is None:
+            node = self.root
+            best = tnull
+        else:
+            # If the subtree below node has no match, the bound does
+            node, best = self._climb(key, not inclusive)
+        while node is not tnull:
+            node_key = node._key
+            if key < node_key or (inclusive and node_key == key):
+                best = node
+                node = node.left
+            else:
+                node = node.right
+        if self._finger is not None and best is not tnull:
+            self._finger = best
+        return best
 
-        y = x.parent
-        while not y.is_null() and x == y.left:
-            x = y
-            y = y.parent
+    def _last_below(self: T, key: Any, inclusive: bool) -> Node:
+        """
+        Return the last node (in key order) whose key is less than (or, if
+        inclusive, equal to) key, or TNULL if there is none.
+        """
+        tnull = self.TNULL
+        if self._finger is None:
+            node = self.root
+            best = tnull
+        else:
+            node, best = self._climb(key, inclusive)
+        while node is not tnull:
+            node_key = node._key
+            if node_key < key or (inclusive and node_key == key):
+                best = node
+                node = node.right
+            else:
+                node = node.left
+        if self._finger is not None and best is not tnull:
+            self._finger = best
+        return best
 
-        return y
+    def floor(self: T, key: Any) -> Node:
+        """
+        Return the node with the largest key <= key, or TNULL.
+        """
+        if self._key_func is not None:
+            key = self._key_func(key)
+        return self._last_below(key, True)
+
+    def ceiling(self: T, key: Any) -> Node:
+        """
+        Return the node with the smallest key >= key, or TNULL.
+        """
+        if self._key_func is not None:
+            key = self._key_func(key)
+        return self._first_above(key, True)
+
+    def lower_bound(self: T, key: Any) -> Node:
+        """
+        Return the first node whose key is not less than key, or TNULL.
+        """
+        if self._key_func is not None:
+            key = self._key_func(key)
+        return self._first_above(key, True)
+
+    def upper_bound(self: T, key: Any) -> Node:
+        """
+        Return the first node whose key is greater than key, or TNULL.
+        """
+        if self._key_func is not None:
+            key = self._key_func(key)
+        return self._first_above(key, False)
+
+    def irange(self: T, lo: Any = None, hi: Any = None,
+               inclusive: tuple = (True, True),
+               reverse: bool = False) -> Iterator[Node]:
+        """
+        Lazily yield the nodes with keys between lo and hi, in ascending
+        order (descending if reverse is True). A bound of None leaves
+        that end of the range open, and inclusive says whether each end
+        of the range is included. Finding the first node takes one
+        descent; every further node is a successor step.
+        """
+        tnull = self.TNULL
+        key_func = self._key_func
+        if key_func is not None:
+            lo = None if lo is None else key_func(lo)
+            hi = None if hi is None else key_func(hi)
+        if not reverse:
+            if lo is None:
+                node = self.minimum()
+            else:
+                node = self._first_above(lo, inclusive[0])
+            while node is not tnull:
+                if hi is not None and \
+                        (hi < node._key or (not inclusive[1] and
+                                            node._key == hi)):
+                    return
+                yield node
+                node = self.successor(node)
+        else:
+            if hi is None:
+                node = self.maximum()
+            else:
+                node = self._last_below(hi, inclusive[1])
+            while node is not tnull:
+                if lo is not None and \
+                        (node._key < lo or (not inclusive[0] and
+                                            node._key == lo)):
+                    return
+                yield node
+                node = self.predecessor(node)
+
+    # Order statistics #
+    def select(self: T, i: int) -> Node:
+        """
+        Return the node holding the i-th smallest key (0-based, negative
+        indices count from the end) in O(log n).
+        """
+        if i < 0:
+            i += self.size
+        if not 0 <= i < self.size:
+            raise IndexError("tree index out of range")
+        node = self.root
+        while True:
+            left_size = node.left._size
+            if i < left_size:
+                node = node.left
+            elif i == left_size:
+                return node
+            else:
+                i -= left_size + 1
+                node = node.right
+
+    def _count_below(self: T, key: Any, inclusive: bool) -> int:
+        """
+        Count the keys less than (or, if inclusive, less than or equal to)
+        key in a single descent.
+        """
+        tnull = self.TNULL
+        node = self.root
+        count = 0
+        while node is not tnull:
+            node_key = node._key
+            if node_key < key or (inclusive and node_key == key):
+                count += node.left._size + 1
+                node = node.right
+            else:
+                node = node.left
+        return count
+
+    def rank(self: T, key: Any) -> int:
+        """
+        Return the number of keys in the tree strictly less than key.
+        """
+        if self._key_func is not None:
+            key = self._key_func(key)
+        return self._count_below(key, False)
+
+    def count_range(self: T, lo: Any, hi: Any,
+                    inclusive: tuple = (True, True)) -> int:
+        """
+        Return the number of keys between lo and hi. inclusive says
+        whether each end of the range is included.
+        """
+        if self._key_func is not None:
+            lo = self._key_func(lo)
+            hi = self._key_func(hi)
+        count = self._count_below(hi, inclusive[1]) - \
+            self._count_below(lo, not inclusive[0])
+        return max(count, 0)
 
     def left_rotate(self: T, x: Node) -> None:
         y = x.right
         x.right = y.left
-        if not y.left.is_null():
+        if y.left is not self.TNULL:
             y.left.parent = x
 
         y.parent = x.parent
         if x.parent is None:
             self.root = y
-        elif x == x.parent.left:
+        elif x is x.parent.left:
             x.parent.left = y
         else:
             x.parent.right = y
         y.left = x
         x.parent = y
+        y._size = x._size
+        x._size = x.left._size + x.right._size + 1
+        if self._augmented:
+            self._pull(x)
+            self._pull(y)
+        if self._stats is not None:
+            self._stats.record("rotation", "left")
 
     def right_rotate(self: T, x: Node) -> None:
         y = x.left
         x.left = y.right
-        if not y.right.is_null():
+        if y.right is not self.TNULL:
             y.right.parent = x
 
         y.parent = x.parent
         if x.parent is None:
             self.root = y
-        elif x == x.parent.right:
+        elif x is x.parent.right:
             x.parent.right = y
         else:
             x.parent.left = y
         y.right = x
         x.parent = y
+        y._size = x._size
+        x._size = x.left._size + x.right._size + 1
+        if self._augmented:
+            self._pull(x)
+            self._pull(y)
+        if self._stats is not None:
+            self._stats.record("rotation", "right")
+
+    def insert(self: T, key: Any, value: Any = None) -> None:
+        tnull = self.TNULL
+        if self._key_func is None:
+            node = self._node_class(key)
+        else:
+            node = self._keyed_node_class(self._key_func(key), key)
+            key = node._key
+        node.value = value
+        node.left = tnull
+        node.right = tnull
+
+        if self._stats is not None:
+            y = self._counted_descend(key)
+        else:
+            y = None
+            x = self.root
+            finger = self._finger
+            if finger is not None and finger is not tnull:
+                x = self._climb(key, True)[0]
+                y = x.parent
+                while y is not None:
+                    y._size += 1
+                    y = y.parent
+
+            while x is not tnull:
+                y = x
+                x._size += 1
+                if key < x._key:
+                    x = x.left
+                else:
+                    x = x.right
+        self._link(node, y)
+        if self._finger is not None:
+            self._finger = node
 
-    def insert(self: T, key: int) -> None:
-        node = Node(key)
-        node.left = self.TNULL
-        node.right = self.TNULL
-        node.set_color("red")
-
+    def _counted_descend(self: T, key: Any) -> Node:
+        """
+        The descent of insert, returning the parent for the new node and
+        recording how many nodes it compared against, after the climb
+        from the finger if there is one. Only used while stats are
+        enabled.
+        """
+        tnull = self.TNULL
         y = None
         x = self.root
-
-        while not x.is_null():
+        finger = self._finger
+        if finger is not None and finger is not tnull:
+            x = self._climb(key, True)[0]
+            y = x.parent
+            while y is not None:
+                y._size += 1
+                y = y.parent
+
+        comparisons = 0
+        while x is not tnull:
+            comparisons += 1
             y = x
-            if node.get_key() < x.get_key():
+            x._size += 1
+            if key < x._key:
                 x = x.left
             else:
                 x = x.right
+        self._stats.record("insert", comparisons)
+        return y
 
+    def _link(self: T, node: Node, y: Node) -> None:
+        """
+        Hang a new node below y (or make it the root if y is None) and
+        rebalance. Subtree sizes above it must already be updated.
+        """
         node.parent = y
         if y is None:
             self.root = node
-        elif node.get_key() < y.get_key():
+            self._first = self._last = node
+        elif node._key < y._key:
             y.left = node
+            if y is self._first:
+                self._first = node
         else:
             y.right = node
+            if y is self._last:
+                self._last = node
 
         self.size += 1
+        if self._augmented:
+            self._pull_up(node)
 
-        if node.parent is None:
-            node.set_color("black")
+        if y is None:
+            node._color = BLACK
             return
 
-        if node.parent.parent is None:
+        if y.parent is None:
             return
 
         self.fix_insert(node)
 
-    def delete(self: T, key: int) -> None:
-        self.delete_node_helper(self.root, key)
+    def _find_or_add(self: T, key: Any, value: Any) -> tuple:
+        """
+        Find a node with the given key, or insert one holding value if
+        there is none, in a single descent. Returns (node, added).
+        """
+        tnull = self.TNULL
+        sort_key = key
+        if self._key_func is not None:
+            sort_key = self._key_func(key)
+        y = None
+        x = self.root
+        finger = self._finger
+        if finger is not None and finger is not tnull:
+            x = self._climb(sort_key, True)[0]
+            y = x.parent
+        while x is not tnull:
+            x_key = x._key
+            if sort_key == x_key:
+                if self._finger is not None:
+                    self._finger = x
+                return x, False
+            y = x
+            x = x.left if sort_key < x_key else x.right
+
+        if self._key_func is None:
+            node = self._node_class(key)
+        else:
+            node = self._keyed_node_class(sort_key, key)
+        node.value = value
+        node.left = tnull
+        node.right = tnull
+        parent = y
+        while parent is not None:
+            parent._size += 1
+            parent = parent.parent
+        self._link(node, y)
+        if self._finger is not None:
+            self._finger = node
+        return node, True
+
+    # Augmentation #
+    def _pull(self: T, node: Node) -> None:
+        """
+        Recompute node's subtree summary from its own data and its
+        children's summaries. Only called when _augmented is set.
+        """
+        pass
+
+    def _pull_up(self: T, node: Node) -> None:
+        """
+        Recompute the summaries of node and all of its ancestors.
+        """
+        pull = self._pull
+        while node is not None:
+            pull(node)
+            node = node.parent
+
+    def delete(self: T, key: Any) -> Node:
+        """
+        Remove a node with the given key. Returns the removed node, or
+        TNULL if the key was not found.
+        """
+        if self._key_func is not None:
+            key = self._key_func(key)
+        if self._finger is None:
+            return self.delete_node_helper(self.root, key)
+        return self.delete_node_helper(self._climb(key, True)[0], key)
+
+    def pop_min(self: T) -> Node:
+        """
+        Remove and return the node with the smallest key (the first one
+        inserted among equal keys) in O(log n), without a search.
+        """
+        node = self._first
+        if node is self.TNULL:
+            raise IndexError("pop from an empty tree")
+        return self._remove(node)
+
+    def pop_max(self: T) -> Node:
+        """
+        Remove and return the node with the largest key (the last one
+        inserted among equal keys) in O(log n).
+        """
+        node = self._last
+        if node is self.TNULL:
+            raise IndexError("pop from an empty tree")
+        return self._remove(node)
+
+    def _use_rebuild(self: T, batch_size: int) -> bool:
+        """
+        Decide whether a batch is large enough that merging it with the
+        existing nodes and rebuilding the tree beats one descent per key.
+        """
+        return batch_size * self.rebuild_ratio >= self.size
+
+    def insert_many(self: T, iterable: Iterable, items: bool = False) -> None:
+        """
+        Insert every key in iterable (or every (key, value) pair if items
+        is True). Small batches are inserted one key at a time; large ones
+        are sorted, merged with the existing nodes and rebuilt in linear
+        time.
+        """
+        batch = list(iterable)
+        if not self._use_rebuild(len(batch)):
+            for entry in batch:
+                if items:
+                    self.insert(*entry)
+                else:
+                    self.insert(entry)
+            return
+
+        if items:
+            new_nodes = [self._new_node(k, v) for k, v in batch]
+        else:
+            new_nodes = [self._new_node(k) for k in batch]
+        new_nodes.sort(key=_node_sort_key)
+
+        # Equal keys keep existing nodes first, like insert does
+        merged = []
+        append = merged.append
+        i = 0
+        n_new = len(new_nodes)
+        for node in self.iter_inorder():
+            key = node._key
+            while i < n_new and new_nodes[i]._key < key:
+                append(new_nodes[i])
+                i += 1
+            append(node)
+        merged.extend(new_nodes[i:])
+        self._build(merged)
+
+    def delete_many(self: T, iterable: Iterable) -> None:
+        """
+        Delete one node for every key in iterable, ignoring keys that are
+        not in the tree. Large batches are applied with a single merge
+        pass over the tree followed by a linear rebuild.
+        """
+        batch = list(iterable)
+        if not self._use_rebuild(len(batch)):
+            for key in batch:
+                self.delete(key)
+            return
+
+        if self._key_func is not None:
+            batch = [self._key_func(key) for key in batch]
+        batch.sort()
+        kept = []
+        append = kept.append
+        i = 0
+        n_batch = len(batch)
+        for node in self.iter_inorder():
+            key = node._key
+            while i < n_batch and batch[i] < key:
+                i += 1
+            if i < n_batch and batch[i] == key:
+                i += 1
+            else:
+                append(node)
+        if len(kept) != self.size:
+            self._build(kept)
+
+    # Split, join and set operations #
+    #
+    # These work on detached subtrees, passed around as (root, black height)
+    # pairs, where the black height counts the black nodes on a path from
+    # the root down to TNULL. All subtrees must share this tree's TNULL.
+    # Nodes are reused rather than copied, so the input trees are emptied.
+    def _empty_like(self: T) -> T:
+        """
+        Return an empty tree with the same settings and sentinel.
+        """
+        tree = copy.copy(self)
+        tree._clear()
+        tree._stats = None
+        return tree
+
+    def _clear(self: T) -> None:
+        self.root = self._first = self._last = self.TNULL
+        self.size = 0
+        if self._finger is not None:
+            self._finger = self.TNULL
+
+    def _black_height(self: T, node: Node) -> int:
+        height = 0
+        while node is not self.TNULL:
+            height += node._color == BLACK
+            node = node.left
+        return height
+
+    def _adopt(self: T, other: T) -> None:
+        """
+        Make other's nodes use this tree's sentinel, if they don't yet.
+        """
+        old = other.TNULL
+        tnull = self.TNULL
+        if old is tnull:
+            return
+        for node in list(other.iter_inorder()):
+            if node.left is old:
+                node.left = tnull
+            if node.right is old:
+                node.right = tnull
+        other.TNULL = tnull
+        if other.root is old:
+            other._clear()
+
+    def _join_nodes(self: T, left: Node, lh: int, mid: Node, right: Node,
+                    rh: int) -> tuple:
+        """
+        Join two subtrees and a middle node whose key lies between them
+        into one subtree, in O(|lh - rh| + 1). Returns (root, height).
+        """
+        tnull = self.TNULL
+        if left._color == RED:
+            left._color = BLACK
+            lh += 1
+        if right._color == RED:
+            right._color = BLACK
+            rh += 1
+        mid.parent = None
+        if lh == rh:
+            mid.left = left
+            mid.right = right
+            left.parent = mid
+            right.parent = mid
+            mid._color = BLACK
+            mid._size = left._size + right._size + 1
+            if self._augmented:
+                self._pull(mid)
+            tnull.parent = None
+            return mid, lh + 1
+
+        # Walk down the inner spine of the taller subtree to a black node
+        # as high (in black nodes) as the shorter one, and hang mid there
+        # in red with the shorter subtree as its other child.
+        taller, short, height, target = (left, right, lh, rh) if lh > rh \
+            else (right, left, rh, lh)
+        parent = None
+        node = taller
+        while node._color == RED or height != target:
+            height -= node._color == BLACK
+            parent = node
+            parent._size += short._size + 1
+            node = node.right if lh > rh else node.left
+        if lh > rh:
+            mid.left = node
+            mid.right = short
+            parent.right = mid
+        else:
+            mid.left = short
+            mid.right = node
+            parent.left = mid
+        node.parent = mid
+        short.parent = mid
+        mid.parent = parent
+        mid._color = RED
+        mid._size = node._size + short._size + 1
+        taller.parent = None
+        tnull.parent = None
+        if self._augmented:
+            self._pull_up(mid)
+        self.root = taller
+        grew = False
+        if parent._color == RED:
+            grew = self.fix_insert(mid)
+        return self.root, max(lh, rh) + grew
+
+    def _join2(self: T, left: Node, lh: int, right: Node, rh: int) -> tuple:
+        """
+        Join two subtrees without a middle node.
+        """
+        if right is self.TNULL:
+            return left, lh
+        if left is self.TNULL:
+            return right, rh
+        right, rh, mid = self._pop_min(right, rh)
+        return self._join_nodes(left, lh, mid, right, rh)
+
+    def _pop_min(self: T, node: Node, height: int) -> tuple:
+        """
+        Detach the leftmost node of a subtree. Returns (root, height,
+        node) for the rest of the subtree and the detached node.
+        """
+        child_height = height - (node._color == BLACK)
+        left = node.left
+        right = node.right
+        if left is self.TNULL:
+            right.parent = None
+            return right, child_height, node
+        rest, rest_height, first = self._pop_min(left, child_height)
+        root, height = self._join_nodes(rest, rest_height, node, right,
+                                        child_height)
+        return root, height, first
+
+    def _split3(self: T, node: Node, height: int, key: Any) -> tuple:
+        """
+        Split a subtree into the nodes with keys below, equal to and
+        above key. Returns (lower, lh, equal, eh, upper, uh).
+        """
+        tnull = self.TNULL
+        if node is tnull:
+            return tnull, 0, tnull, 0, tnull, 0
+        child_height = height - (node._color == BLACK)
+        left = node.left
+        right = node.right
+        if key < node._key:
+            lower, lh, equal, eh, upper, uh = self._split3(left, child_height,
+                                                           key)
+            upper, uh = self._join_nodes(upper, uh, node, right,
+                                         child_height)
+        elif node._key < key:
+            lower, lh, equal, eh, upper, uh = self._split3(right,
+                                                           child_height, key)
+            lower, lh = self._join_nodes(left, child_height, node, lower, lh)
+        else:
+            # Repeated keys can sit on both sides of an equal node
+            lower, lh, equal, eh, _, _ = self._split3(left, child_height, key)
+            _, _, equal2, eh2, upper, uh = self._split3(right, child_height,
+                                                        key)
+            equal, eh = self._join_nodes(equal, eh, node, equal2, eh2)
+        return lower, lh, equal, eh, upper, uh
+
+    def _set_root(self: T, root: Node) -> T:
+        root.parent = None
+        if root is not self.TNULL:
+            root._color = BLACK
+        self.root = root
+        self.size = root._size
+        self._first = self.minimum(root)
+        self._last = self.maximum(root)
+        return self
+
+    def _combine(self: T, other: T, op: tuple) -> T:
+        """
+        Run a set operation (the flags of _merge) on the roots of this
+        tree and other and return the result as a new tree. The smaller
+        tree's leaves are re-pointed to the larger tree's sentinel first
+        if they differ.
+        """
+        big, small = (self, other) if self.size >= other.size \
+            else (other, self)
+        big._adopt(small)
+        result = big._empty_like()
+        a = self.root
+        b = other.root
+        root, _ = result._merge(a, self._black_height(a), b,
+                                self._black_height(b), *op)
+        result._set_root(root)
+        self._clear()
+        other._clear()
+        return result
+
+    def _merge(self: T, a: Node, ah: int, b: Node, bh: int, both: bool,
+               a_only: bool, b_only: bool) -> tuple:
+        """
+        Set operation on subtrees a (of the receiver) and b, splitting b
+        around a's root and recursing on both halves. Nodes of a whose
+        key is also in b are kept if both is set; nodes with keys in only
+        one of the subtrees are kept if a_only or b_only is set.
+        """
+        tnull = self.TNULL
+        if b is tnull:
+            return (a, ah) if a_only else (tnull, 0)
+        if a is tnull:
+            return (b, bh) if b_only else (tnull, 0)
+
+        # a's own children, unless its key repeats in them, in which case
+        # the repeats are split off to stay with the root
+        key = a._key
+        child_height = ah - (a._color == BLACK)
+        al = a.left
+        ar = a.right
+        alh = arh = child_height
+        low_repeats = high_repeats = tnull
+        low_height = high_height = 0
+        if al is not tnull:
+            last = al
+            while last.right is not tnull:
+                last = last.right
+            if last._key == key:
+                al, alh, low_repeats, low_height, _, _ = self._split3(
+                    al, alh, key)
+        if ar is not tnull:
+            first = ar
+            while first.left is not tnull:
+                first = first.left
+            if first._key == key:
+                _, _, high_repeats, high_height, ar, arh = self._split3(
+                    ar, arh, key)
+
+        bl, blh, be, _, br, brh = self._split3(b, bh, key)
+        lower, lh = self._merge(al, alh, bl, blh, both, a_only, b_only)
+        upper, uh = self._merge(ar, arh, br, brh, both, a_only, b_only)
+        keep = a_only if be is tnull else \
+            self._keep_common(a, be, both, a_only, b_only)
+        if not keep:
+            return self._join2(lower, lh, upper, uh)
+        if low_repeats is tnull and high_repeats is tnull:
+            return self._join_nodes(lower, lh, a, upper, uh)
+        equal, eh = self._join_nodes(low_repeats, low_height, a,
+                                     high_repeats, high_height)
+        return self._concat3(lower, lh, equal, eh, upper, uh)
+
+    def _keep_common(self: T, node: Node, other: Node, both: bool,
+                     a_only: bool, b_only: bool) -> bool:
+        """
+        Whether _merge keeps node, whose key is also in the subtree other
+        of the second tree. Subclasses can fold other's data into node
+        here.
+        """
+        return both
+
+    def _concat3(self: T, lower: Node, lh: int, equal: Node, eh: int,
+                 upper: Node, uh: int) -> tuple:
+        if equal is self.TNULL:
+            return self._join2(lower, lh, upper, uh)
+        equal, eh, first = self._pop_min(equal, eh)
+        upper, uh = self._join2(equal, eh, upper, uh)
+        return self._join_nodes(lower, lh, first, upper, uh)
+
+    def split(self: T, key: Any) -> tuple:
+        """
+        Split the tree into two trees, one with the keys less than key
+        and one with the rest, in O(log n). The nodes are moved, not
+        copied, so this tree is left empty.
+        """
+        if self._key_func is not None:
+            key = self._key_func(key)
+        root = self.root
+        lower, lh, equal, eh, upper, uh = self._split3(
+            root, self._black_height(root), key)
+        upper, _ = self._join2(equal, eh, upper, uh)
+        lower_tree = self._empty_like()._set_root(lower)
+        upper_tree = self._empty_like()._set_root(upper)
+        self._clear()
+        return lower_tree, upper_tree
+
+    def join(self: T, key: Any, other: T, value: Any = None) -> T:
+        """
+        Return a tree holding the nodes of this tree, a new node for key
+        and the nodes of other, where no key in this tree may be greater
+        than key and no key in other less than it. Takes O(log n) when
+        both trees share a sentinel, as the halves of a split do;
+        otherwise the smaller tree's leaves are re-pointed first. Both
+        trees are left empty.
+        """
+        node = self._new_node(key, value)
+        self._check_join(node._key, other)
+        return self._join_node(node, other)
+
+    def _check_join(self: T, key: Any, other: T) -> None:
+        if (self.root is not self.TNULL and key < self.maximum()._key) or \
+                (other.root is not other.TNULL and
+                 other.minimum()._key < key):
+            raise Exception("Keys are out of order for join")
+
+    def _join_node(self: T, node: Node, other: T) -> T:
+        """
+        The linking part of join, for an unlinked node whose key has been
+        checked by _check_join.
+        """
+        big = self if self.size >= other.size else other
+        big._adopt(other if big is self else self)
+        result = big._empty_like()
+        node.left = node.right = result.TNULL
+        left = self.root
+        right = other.root
+        root, _ = result._join_nodes(left, self._black_height(left), node,
+                                     right, other._black_height(right))
+        result._set_root(root)
+        self._clear()
+        other._clear()
+        return result
+
+    def union(self: T, other: T) -> T:
+        """
+        Return a tree with the nodes of this tree plus the nodes of other
+        whose keys are not in this tree, in O(m log(n/m + 1)) for trees
+        of sizes m <= n. Nodes are moved rather than copied, so both
+        trees are left empty.
+        """
+        return self._combine(other, (True, True, True))
+
+    def intersection(self: T, other: T) -> T:
+        """
+        Return a tree with the nodes of this tree whose keys are also in
+        other, like union.
+        """
+        return self._combine(other, (True, False, False))
+
+    def difference(self: T, other: T) -> T:
+        """
+        Return a tree with the nodes of this tree whose keys are not in
+        other, like union.
+        """
+        return self._combine(other, (False, True, False))
 
     def print_tree(self: T) -> None:
         self.__print_helper(self.root, "", True)
+
+    # Serialization #
+    def dump(self: T, path: str) -> None:
+        """
+        Write the tree's keys and values, in key order, to path in a
+        compact binary format (see _write_tree) that load can rebuild
+        from in linear time and MappedTree can serve lookups from.
+        """
+        keys = []
+        values = []
+        for node in self.iter_inorder():
+            keys.append(node.get_key())
+            values.append(node.value)
+        with open(path, "wb") as outfile:
+            _write_tree(outfile, keys, values)
+
+    @classmethod
+    def load(cls: Type[T], path: str, key: Callable = None) -> T:
+        """
+        Rebuild a tree written by dump in linear time. Trees that were
+        ordered by a key function need the same function passed again.
+        """
+        return cls(key=key)._load_file(path)
+
+    def _load_file(self: T, path: str) -> T:
+        """
+        Fill an empty tree for load, like _load_sorted.
+        """
+        with open(path, "rb") as infile:
+            data = infile.read()
+        keys, values = _read_tree(memoryview(data))
+        new_node = self._new_node
+        if isinstance(values, _NoneSequence):
+            nodes = [new_node(k) for k in keys]
+        else:
+            nodes = [new_node(k, v) for k, v in zip(keys, values)]
+        # The stored order only holds for the key function the tree was
+        # dumped with, so check it
+        if not all(nodes[i]._key <= nodes[i + 1]._key
+                   for i in range(len(nodes) - 1)):
+            nodes.sort(key=_node_sort_key)
+        self._build(nodes)
+        return self
+
+
+# Mapping views #
+class TreeKeysView(KeysView):
+    """
+    Live view of a tree's keys in sorted order.
+    """
+
+    def __iter__(self: "TreeKeysView") -> Iterator:
+        for node in self._mapping.iter_inorder():
+            yield node.get_key()
+
+    def __reversed__(self: "TreeKeysView") -> Iterator:
+        for node in self._mapping.irange(reverse=True):
+            yield node.get_key()
+
+
+class TreeValuesView(ValuesView):
+    """
+    Live view of a tree's values, ordered by key.
+    """
+
+    def __iter__(self: "TreeValuesView") -> Iterator:
+        for node in self._mapping.iter_inorder():
+            yield node.value
+
+    def __reversed__(self: "TreeValuesView") -> Iterator:
+        for node in self._mapping.irange(reverse=True):
+            yield node.value
+
+    def __contains__(self: "TreeValuesView", value: Any) -> bool:
+        for v in self:
+            if v is value or v == value:
+                return True
+        return False
+
+
+class TreeItemsView(ItemsView):
+    """
+    Live view of a tree's (key, value) pairs in key order.
+    """
+
+    def __iter__(self: "TreeItemsView") -> Iterator:
+        for node in self._mapping.iter_inorder():
+            yield (node.get_key(), node.value)
+
+    def __reversed__(self: "TreeItemsView") -> Iterator:
+        for node in self._mapping.irange(reverse=True):
+            yield (node.get_key(), node.value)
+
+
+# Serialization #
+#
+# A dumped tree is a 16 byte header followed by a key section and a value
+# section, each padded to a multiple of 8 bytes. All numbers are little
+# endian.
+#
+#   header  magic b"RBT", format version, key format, value format,
+#           2 pad bytes, number of entries (uint64)
+#   keys    KEY_INT: int64 array, KEY_FLOAT: float64 array,
+#           FORMAT_PICKLE: uint64 offsets (count + 1) then the pickles
+#   values  FORMAT_NONE: nothing (every value is None),
+#           FORMAT_PICKLE: as for keys
+#
+# Entries are in key order, so numeric keys can be binary searched in
+# place. The tree shape and colors are not stored: loading rebuilds a
+# balanced tree from the sorted entries, which is linear anyway.
+
+_MAGIC = b"RBT"
+_VERSION = 1
+_HEADER = struct.Struct("<3sBBBxxQ")
+FORMAT_NONE = 0
+FORMAT_PICKLE = 1
+KEY_INT = 2
+KEY_FLOAT = 3
+_PICKLE_PROTOCOL = 4
+_TYPECODES = {KEY_INT: "q", KEY_FLOAT: "d", FORMAT_PICKLE: "Q"}
+
+
+def _pad(size: int) -> int:
+    return -size % 8
+
+
+def _to_le(values: array) -> bytes:
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _from_le(buffer: memoryview, typecode: str) -> Any:
+    """
+    View an 8-byte-per-item little endian buffer as a sequence of
+    numbers without copying it where the host byte order allows.
+    """
+    if sys.byteorder == "little":
+        return buffer.cast(typecode)
+    values = array(typecode, buffer.tobytes())
+    values.byteswap()
+    return values
+
+
+def _write_pickles(outfile: Any, objects: list) -> None:
+    blobs = [pickle.dumps(obj, _PICKLE_PROTOCOL) for obj in objects]
+    offsets = array("Q", [0])
+    total = 0
+    for blob in blobs:
+        total += len(blob)
+        offsets.append(total)
+    outfile.write(_to_le(offsets))
+    for blob in blobs:
+        outfile.write(blob)
+    outfile.write(bytes(_pad(total)))
+
+
+def _write_tree(outfile: Any, keys: list, values: list) -> None:
+    if all(type(key) is int and -2 ** 63 <= key < 2 ** 63 for key in keys):
+        key_format = KEY_INT
+    elif all(type(key) is float for key in keys):
+        key_format = KEY_FLOAT
+    else:
+        key_format = FORMAT_PICKLE
+    if all(value is None for value in values):
+        value_format = FORMAT_NONE
+    else:
+        value_format = FORMAT_PICKLE
+
+    outfile.write(_HEADER.pack(_MAGIC, _VERSION, key_format, value_format,
+                               len(keys)))
+    if key_format == FORMAT_PICKLE:
+        _write_pickles(outfile, keys)
+    else:
+        outfile.write(_to_le(array(_TYPECODES[key_format], keys)))
+    if value_format == FORMAT_PICKLE:
+        _write_pickles(outfile, values)
+
+
+class _PickleSequence():
+    """
+    Read-only sequence over a pickled section, unpickling items on access.
+    """
+
+    def __init__(self: "_PickleSequence", offsets: Any,
+                 blob: memoryview) -> None:
+        self._offsets = offsets
+        self._blob = blob
+
+    def __len__(self: "_PickleSequence") -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self: "_PickleSequence", i: int) -> Any:
+        if i < 0:
+            i += len(self)
+        return pickle.loads(self._blob[self._offsets[i]:self._offsets[i + 1]])
+
+    def __iter__(self: "_PickleSequence") -> Iterator:
+        blob = self._blob
+        offsets = self._offsets
+        for i in range(len(offsets) - 1):
+            yield pickle.loads(blob[offsets[i]:offsets[i + 1]])
+
+
+class _NoneSequence():
+    def __init__(self: "_NoneSequence", count: int) -> None:
+        self._count = count
+
+    def __len__(self: "_NoneSequence") -> int:
+        return self._count
+
+    def __getitem__(self: "_NoneSequence", i: int) -> None:
+        return None
+
+    def __iter__(self: "_NoneSequence") -> Iterator:
+        for _ in range(self._count):
+            yield None
+
+
+def _read_section(data: memoryview, offset: int, count: int,
+                  section_format: int) -> tuple:
+    """
+    Return (sequence, offset of the next section) for one section.
+    """
+    if section_format == FORMAT_NONE:
+        return _NoneSequence(count), offset
+    if section_format == FORMAT_PICKLE:
+        end = offset + 8 * (count + 1)
+        offsets = _from_le(data[offset:end], "Q")
+        blob_size = offsets[count]
+        blob = data[end:end + blob_size]
+        return _PickleSequence(offsets, blob), \
+            end + blob_size + _pad(blob_size)
+    end = offset + 8 * count
+    return _from_le(data[offset:end], _TYPECODES[section_format]), end
+
+
+def _read_tree(data: memoryview) -> tuple:
+    """
+    Return lazily decoding (keys, values) sequences for a dumped tree.
+    """
+    if len(data) < _HEADER.size:
+        raise ValueError("Not a dumped red-black tree")
+    magic, version, key_format, value_format, count = \
+        _HEADER.unpack(data[:_HEADER.size])
+    if magic != _MAGIC:
+        raise ValueError("Not a dumped red-black tree")
+    if version != _VERSION:
+        raise ValueError("Unsupported tree file version " + str(version))
+    keys, offset = _read_section(data, _HEADER.size, count, key_format)
+    values, offset = _read_section(data, offset, count, value_format)
+    return keys, values
+
+
+class MappedTree():
+    """
+    Read-only sorted mapping served straight from a file written by
+    RedBlackTree.dump through mmap, without building any nodes. Lookups
+    binary search the key section in place, and values are unpickled
+    only when they are read. If the tree was ordered by a key function,
+    pass the same function.
+    """
+
+    def __init__(self: "MappedTree", path: str, key: Callable = None) -> None:
+        with open(path, "rb") as infile:
+            self._mmap = mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ)
+        self._data = memoryview(self._mmap)
+        self._keys, self._values = _read_tree(self._data)
+        self._key_func = key
+
+    def close(self: "MappedTree") -> None:
+        # Every view into the map has to be released before closing it
+        self._keys = self._values = None
+        self._data.release()
+        self._mmap.close()
+
+    def __enter__(self: "MappedTree") -> "MappedTree":
+        return self
+
+    def __exit__(self: "MappedTree", *exc_info: Any) -> None:
+        self.close()
+
+    def _bisect(self: "MappedTree", key: Any, right: bool = False) -> int:
+        keys = self._keys
+        if self._key_func is not None:
+            key = self._key_func(key)
+            keys = _KeyedSequence(keys, self._key_func)
+        return (bisect_right if right else bisect_left)(keys, key)
+
+    def _find(self: "MappedTree", key: Any) -> int:
+        """
+        Return the index of the first entry with the given key, or -1.
+        """
+        i = self._bisect(key)
+        if i < len(self._keys):
+            found = self._keys[i]
+            if self._key_func is not None:
+                found = self._key_func(found)
+                key = self._key_func(key)
+            if found == key:
+                return i
+        return -1
+
+    def __len__(self: "MappedTree") -> int:
+        return len(self._keys)
+
+    def __contains__(self: "MappedTree", key: Any) -> bool:
+        return self._find(key) >= 0
+
+    def __getitem__(self: "MappedTree", key: Any) -> Any:
+        i = self._find(key)
+        if i < 0:
+            raise KeyError(key)
+        return self._values[i]
+
+    def get(self: "MappedTree", key: Any, default: Any = None) -> Any:
+        i = self._find(key)
+        return default if i < 0 else self._values[i]
+
+    def keys(self: "MappedTree") -> Iterator:
+        keys = self._keys
+        for i in range(len(keys)):
+            yield keys[i]
+
+    def values(self: "MappedTree") -> Iterator:
+        values = self._values
+        for i in range(len(values)):
+            yield values[i]
+
+    def items(self: "MappedTree") -> Iterator:
+        keys = self._keys
+        values = self._values
+        for i in range(len(keys)):
+            yield (keys[i], values[i])
+
+    def irange(self: "MappedTree", lo: Any = None, hi: Any = None,
+               inclusive: tuple = (True, True),
+               reverse: bool = False) -> Iterator:
+        """
+        Lazily yield the (key, value) pairs with keys between lo and hi,
+        like RedBlackTree.irange.
+        """
+        start = 0 if lo is None else self._bisect(lo, not inclusive[0])
+        stop = len(self._keys) if hi is None else self._bisect(hi,
+                                                               inclusive[1])
+        indices = range(start, stop)
+        if reverse:
+            indices = reversed(indices)
+        keys = self._keys
+        values = self._values
+        for i in indices:
+            yield (keys[i], values[i])
+
+
+class _KeyedSequence():
+    """
+    Applies a key function to the items of a sequence as they are read,
+    so bisect can search a file ordered by that function.
+    """
+
+    def __init__(self: "_KeyedSequence", items: Any, key: Callable) -> None:
+        self._items = items
+        self._key = key
+
+    def __len__(self: "_KeyedSequence") -> int:
+        return len(self._items)
+
+    def __getitem__(self: "_KeyedSequence", i: int) -> Any:
+        return self._key(self._items[i])
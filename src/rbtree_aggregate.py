@@ -0,0 +1,184 @@
+# Red-black tree with range aggregates
+#
+# Every node of an AggregateRedBlackTree keeps, for each of a set of monoids
+# (an associative combine function with an identity element), the combined
+# values of all nodes in its subtree, in key order. RedBlackTree calls _pull
+# whenever a subtree changes (rotations, the insert and delete paths, bulk
+# rebuilds and value updates through tree[key] = value), so the summaries
+# stay correct and the sum, minimum or maximum of the values over any key
+# range can be read off O(log n) of them.
+
+from collections import namedtuple
+from typing import Any, Callable, Iterable, Type, TypeVar
+
+from rbtree import RedBlackTree, Node, KeyedNode
+
+
+Monoid = namedtuple("Monoid", ["combine", "identity"])
+
+
+def _add(a: Any, b: Any) -> Any:
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return a + b
+
+
+def _min(a: Any, b: Any) -> Any:
+    if a is None:
+        return b
+    if b is None or a <= b:
+        return a
+    return b
+
+
+def _max(a: Any, b: Any) -> Any:
+    if a is None:
+        return b
+    if b is None or b <= a:
+        return a
+    return b
+
+
+# The built-in monoids skip None, the value of nodes inserted without one.
+# MIN and MAX use it as their identity, so they work for any comparable
+# values.
+SUM = Monoid(_add, 0)
+MIN = Monoid(_min, None)
+MAX = Monoid(_max, None)
+
+
+class AggregateNode(Node):
+    # One subtree summary per monoid of the tree
+    __slots__ = ("_agg",)
+
+
+class KeyedAggregateNode(KeyedNode):
+    __slots__ = ("_agg",)
+
+
+T = TypeVar('T', bound='AggregateRedBlackTree')
+
+
+class AggregateRedBlackTree(RedBlackTree):
+    _node_class = AggregateNode
+    _keyed_node_class = KeyedAggregateNode
+    _augmented = True
+
+    def __init__(self: T, key: Callable = None,
+                 monoids: dict = None) -> None:
+        """
+        monoids maps names to Monoids over the stored values; by default
+        the tree keeps "sum", "min" and "max". Values are combined in key
+        order, so combine does not need to be commutative. Values changed
+        by assigning to node.value directly are not seen until
+        refresh(node) is called.
+        """
+        super().__init__(key=key)
+        if monoids is None:
+            monoids = {"sum": SUM, "min": MIN, "max": MAX}
+        self._names = {name: i for i, name in enumerate(monoids)}
+        self._monoids = list(monoids.values())
+        self.TNULL._agg = tuple(monoid.identity for monoid in self._monoids)
+
+    @classmethod
+    def from_sorted(cls: Type[T], iterable: Iterable, items: bool = False,
+                    key: Callable = None, monoids: dict = None) -> T:
+        return cls(key=key, monoids=monoids)._load_sorted(iterable, items)
+
+    @classmethod
+    def load(cls: Type[T], path: str, key: Callable = None,
+             monoids: dict = None) -> T:
+        return cls(key=key, monoids=monoids)._load_file(path)
+
+    def _pull(self: T, node: Node) -> None:
+        value = node.value
+        node._agg = tuple([
+            combine(combine(left, value), right)
+            for (combine, _), left, right in zip(self._monoids,
+                                                 node.left._agg,
+                                                 node.right._agg)])
+
+    def refresh(self: T, node: Node) -> None:
+        """
+        Update the summaries after node.value was changed in place.
+        """
+        self._pull_up(node)
+
+    # Queries #
+    def aggregate(self: T, name: str = "sum") -> Any:
+        """
+        Return the named aggregate over the whole tree in O(1).
+        """
+        return self.root._agg[self._names[name]]
+
+    def range_reduce(self: T, name: str, lo: Any = None, hi: Any = None,
+                     inclusive: tuple = (True, True)) -> Any:
+        """
+        Combine, in key order, the values of the nodes with keys between
+        lo and hi using the named monoid, in O(log n). Bounds work as in
+        irange. An empty range gives the identity.
+        """
+        index = self._names[name]
+        combine, identity = self._monoids[index]
+        if self._key_func is not None:
+            lo = None if lo is None else self._key_func(lo)
+            hi = None if hi is None else self._key_func(hi)
+        lo_inclusive, hi_inclusive = inclusive
+        tnull = self.TNULL
+
+        def above_lo(key: Any) -> bool:
+            return lo is None or lo < key or (lo_inclusive and key == lo)
+
+        def below_hi(key: Any) -> bool:
+            return hi is None or key < hi or (hi_inclusive and key == hi)
+
+        # Find the highest node in the range; its left subtree holds the
+        # lower end of the range and its right subtree the upper end.
+        split = self.root
+        while split is not tnull:
+            if not above_lo(split._key):
+                split = split.right
+            elif not below_hi(split._key):
+                split = split.left
+            else:
+                break
+        if split is tnull:
+            return identity
+
+        # Below split everything is under hi, so each node in the range
+        # brings its whole right subtree along
+        lower = identity
+        node = split.left
+        while node is not tnull:
+            if above_lo(node._key):
+                lower = combine(combine(node.value, node.right._agg[index]),
+                                lower)
+                node = node.left
+            else:
+                node = node.right
+
+        upper = identity
+        node = split.right
+        while node is not tnull:
+            if below_hi(node._key):
+                upper = combine(upper, combine(node.left._agg[index],
+                                               node.value))
+                node = node.right
+            else:
+                node = node.left
+
+        return combine(combine(lower, split.value), upper)
+
+    def range_sum(self: T, lo: Any = None, hi: Any = None,
+                  inclusive: tuple = (True, True)) -> Any:
+        return self.range_reduce("sum", lo, hi, inclusive)
+
+    def range_min(self: T, lo: Any = None, hi: Any = None,
+                  inclusive: tuple = (True, True)) -> Any:
+        return self.range_reduce("min", lo, hi, inclusive)
+
+    def range_max(self: T, lo: Any = None, hi: Any = None,
+                  inclusive: tuple = (True, True)) -> Any:
+        return self.range_reduce("max", lo, hi, inclusive)
@@ -0,0 +1,438 @@
+# Array-backed red-black tree
+#
+# Same algorithms as rbtree.RedBlackTree, but instead of allocating a Node
+# object per entry, keys, values, colors and left/right/parent links live in
+# parallel arrays indexed by integer node ids. Id 0 is reserved for the
+# TNULL sentinel (it is also the parent of the root), and the ids of deleted
+# nodes are kept on a free list threaded through the right-link array.
+
+from array import array
+from typing import Any, Iterator, TypeVar
+
+from rbtree import BLACK, RED
+
+
+T = TypeVar('T', bound='ArrayRedBlackTree')
+
+# Typecode used for the link arrays (signed 64 bit)
+LINK_TYPECODE = "q"
+
+
+class ArrayRedBlackTree():
+    TNULL = 0
+
+    def __init__(self: T, typecode: str = None) -> None:
+        """
+        Keys are stored in an array.array of the given typecode (e.g. "q"
+        for 64 bit integer keys), or in a plain list if typecode is None.
+        """
+        self._typecode = typecode
+        self._keys = array(typecode, [0]) if typecode else [None]
+        self._values = [None]
+        self._color = bytearray([BLACK])
+        self._left = array(LINK_TYPECODE, [0])
+        self._right = array(LINK_TYPECODE, [0])
+        self._parent = array(LINK_TYPECODE, [0])
+        self._free = 0
+        self.root = 0
+        self.size = 0
+
+    # Dunder Methods #
+    def __iter__(self: T) -> Iterator[int]:
+        return self.iter_inorder()
+
+    # Setters and Getters #
+    def get_root(self: T) -> int:
+        return self.root
+
+    def get_key(self: T, node: int) -> Any:
+        return self._keys[node]
+
+    def get_value(self: T, node: int) -> Any:
+        return self._values[node]
+
+    def set_value(self: T, node: int, value: Any) -> None:
+        self._values[node] = value
+
+    def get_color(self: T, node: int) -> str:
+        return "black" if self._color[node] == BLACK else "red"
+
+    def is_red(self: T, node: int) -> bool:
+        return self._color[node] == RED
+
+    def is_black(self: T, node: int) -> bool:
+        return self._color[node] == BLACK
+
+    def is_null(self: T, node: int) -> bool:
+        return node == 0
+
+    def left(self: T, node: int) -> int:
+        return self._left[node]
+
+    def right(self: T, node: int) -> int:
+        return self._right[node]
+
+    def parent(self: T, node: int) -> int:
+        return self._parent[node]
+
+    # Node storage #
+    def _alloc(self: T, key: Any, value: Any) -> int:
+        node = self._free
+        if node:
+            self._free = self._right[node]
+            self._keys[node] = key
+            self._values[node] = value
+            self._color[node] = RED
+            self._left[node] = 0
+            self._right[node] = 0
+            self._parent[node] = 0
+            return node
+
+        self._keys.append(key)
+        self._values.append(value)
+        self._color.append(RED)
+        self._left.append(0)
+        self._right.append(0)
+        self._parent.append(0)
+        return len(self._values) - 1
+
+    def _release(self: T, node: int) -> None:
+        if not self._typecode:
+            self._keys[node] = None
+        self._values[node] = None
+        self._right[node] = self._free
+        self._free = node
+
+    def copy(self: T) -> T:
+        """
+        Snapshot the whole tree. This only copies the underlying buffers.
+        """
+        other = type(self).__new__(type(self))
+        other._typecode = self._typecode
+        other._keys = self._keys[:]
+        other._values = self._values[:]
+        other._color = self._color[:]
+        other._left = self._left[:]
+        other._right = self._right[:]
+        other._parent = self._parent[:]
+        other._free = self._free
+        other.root = self.root
+        other.size = self.size
+        return other
+
+    # Iterators #
+    def inorder(self: T) -> list:
+        return list(self.iter_inorder())
+
+    def iter_inorder(self: T, node: int = None) -> Iterator[int]:
+        """
+        Lazily yield node ids in key order, starting at the given node
+        (the root by default).
+        """
+        left = self._left
+        right = self._right
+        if node is None:
+            node = self.root
+        stack = []
+        while True:
+            while node:
+                stack.append(node)
+                node = left[node]
+            if not stack:
+                return
+            node = stack.pop()
+            yield node
+            node = right[node]
+
+    # Search the tree
+    def search_tree_helper(self: T, node: int, key: Any) -> int:
+        keys = self._keys
+        left = self._left
+        right = self._right
+        while node:
+            node_key = keys[node]
+            if key == node_key:
+                return node
+            node = left[node] if key < node_key else right[node]
+        return node
+
+    def search(self: T, key: Any) -> int:
+        return self.search_tree_helper(self.root, key)
+
+    def minimum(self: T, node: int = None) -> int:
+        left = self._left
+        if node is None:
+            node = self.root
+        if not node:
+            return 0
+        while left[node]:
+            node = left[node]
+        return node
+
+    def maximum(self: T, node: int = None) -> int:
+        right = self._right
+        if node is None:
+            node = self.root
+        if not node:
+            return 0
+        while right[node]:
+            node = right[node]
+        return node
+
+    def successor(self: T, x: int) -> int:
+        if self._right[x]:
+            return self.minimum(self._right[x])
+
+        parent = self._parent
+        right = self._right
+        y = parent[x]
+        while y and x == right[y]:
+            x = y
+            y = parent[y]
+        return y
+
+    def predecessor(self: T, x: int) -> int:
+        if self._left[x]:
+            return self.maximum(self._left[x])
+
+        parent = self._parent
+        left = self._left
+        y = parent[x]
+        while y and x == left[y]:
+            x = y
+            y = parent[y]
+        return y
+
+    # Rotations #
+    def left_rotate(self: T, x: int) -> None:
+        left = self._left
+        right = self._right
+        parent = self._parent
+        y = right[x]
+        right[x] = left[y]
+        if left[y]:
+            parent[left[y]] = x
+
+        p = parent[x]
+        parent[y] = p
+        if not p:
+            self.root = y
+        elif x == left[p]:
+            left[p] = y
+        else:
+            right[p] = y
+        left[y] = x
+        parent[x] = y
+
+    def right_rotate(self: T, x: int) -> None:
+        left = self._left
+        right = self._right
+        parent = self._parent
+        y = left[x]
+        left[x] = right[y]
+        if right[y]:
+            parent[right[y]] = x
+
+        p = parent[x]
+        parent[y] = p
+        if not p:
+            self.root = y
+        elif x == right[p]:
+            right[p] = y
+        else:
+            left[p] = y
+        right[y] = x
+        parent[x] = y
+
+    # Balance the tree after insertion
+    def fix_insert(self: T, node: int) -> None:
+        color = self._color
+        left = self._left
+        right = self._right
+        parent = self._parent
+        while color[parent[node]] == RED:
+            p = parent[node]
+            g = parent[p]
+            if p == right[g]:
+                u = left[g]
+                if color[u] == RED:
+                    color[u] = BLACK
+                    color[p] = BLACK
+                    color[g] = RED
+                    node = g
+                else:
+                    if node == left[p]:
+                        node = p
+                        self.right_rotate(node)
+                        p = parent[node]
+                    color[p] = BLACK
+                    color[g] = RED
+                    self.left_rotate(g)
+            else:
+                u = right[g]
+                if color[u] == RED:
+                    color[u] = BLACK
+                    color[p] = BLACK
+                    color[g] = RED
+                    node = g
+                else:
+                    if node == right[p]:
+                        node = p
+                        self.left_rotate(node)
+                        p = parent[node]
+                    color[p] = BLACK
+                    color[g] = RED
+                    self.right_rotate(g)
+            if node == self.root:
+                break
+        color[self.root] = BLACK
+
+    def insert(self: T, key: Any, value: Any = None) -> int:
+        node = self._alloc(key, value)
+        keys = self._keys
+        left = self._left
+        right = self._right
+
+        y = 0
+        x = self.root
+        while x:
+            y = x
+            if key < keys[x]:
+                x = left[x]
+            else:
+                x = right[x]
+
+        self._parent[node] = y
+        if not y:
+            self.root = node
+        elif key < keys[y]:
+            left[y] = node
+        else:
+            right[y] = node
+
+        self.size += 1
+
+        if not y:
+            self._color[node] = BLACK
+        elif self._parent[y]:
+            self.fix_insert(node)
+        return node
+
+    # Balancing the tree after deletion
+    def delete_fix(self: T, x: int) -> None:
+        color = self._color
+        left = self._left
+        right = self._right
+        parent = self._parent
+        while x != self.root and color[x] == BLACK:
+            p = parent[x]
+            if x == left[p]:
+                s = right[p]
+                if color[s] == RED:
+                    color[s] = BLACK
+                    color[p] = RED
+                    self.left_rotate(p)
+                    s = right[p]
+
+                if color[left[s]] == BLACK and color[right[s]] == BLACK:
+                    color[s] = RED
+                    x = p
+                else:
+                    if color[right[s]] == BLACK:
+                        color[left[s]] = BLACK
+                        color[s] = RED
+                        self.right_rotate(s)
+                        s = right[p]
+
+                    color[s] = color[p]
+                    color[p] = BLACK
+                    color[right[s]] = BLACK
+                    self.left_rotate(p)
+                    x = self.root
+            else:
+                s = left[p]
+                if color[s] == RED:
+                    color[s] = BLACK
+                    color[p] = RED
+                    self.right_rotate(p)
+                    s = left[p]
+
+                if color[left[s]] == BLACK and color[right[s]] == BLACK:
+                    color[s] = RED
+                    x = p
+                else:
+                    if color[left[s]] == BLACK:
+                        color[right[s]] = BLACK
+                        color[s] = RED
+                        self.left_rotate(s)
+                        s = left[p]
+
+                    color[s] = color[p]
+                    color[p] = BLACK
+                    color[left[s]] = BLACK
+                    self.right_rotate(p)
+                    x = self.root
+        color[x] = BLACK
+
+    def _transplant(self: T, u: int, v: int) -> None:
+        parent = self._parent
+        p = parent[u]
+        if not p:
+            self.root = v
+        elif u == self._left[p]:
+            self._left[p] = v
+        else:
+            self._right[p] = v
+        parent[v] = p
+
+    # Node deletion
+    def delete_node_helper(self: T, node: int, key: Any) -> None:
+        keys = self._keys
+        left = self._left
+        right = self._right
+        parent = self._parent
+        color = self._color
+
+        z = node
+        while z:
+            node_key = keys[z]
+            if key == node_key:
+                break
+            z = left[z] if key < node_key else right[z]
+
+        if not z:
+            return
+
+        y = z
+        y_original_color = color[y]
+        if not left[z]:
+            x = right[z]
+            self._transplant(z, x)
+        elif not right[z]:
+            x = left[z]
+            self._transplant(z, x)
+        else:
+            y = self.minimum(right[z])
+            y_original_color = color[y]
+            x = right[y]
+            if parent[y] == z:
+                parent[x] = y
+            else:
+                self._transplant(y, x)
+                right[y] = right[z]
+                parent[right[y]] = y
+
+            self._transplant(z, y)
+            left[y] = left[z]
+            parent[left[y]] = y
+            color[y] = color[z]
+        if y_original_color == BLACK:
+            self.delete_fix(x)
+
+        # The sentinel's parent link is scratch space for delete_fix
+        parent[0] = 0
+        self._release(z)
+        self.size -= 1
+
+    def delete(self: T, key: Any) -> None:
+        self.delete_node_helper(self.root, key)
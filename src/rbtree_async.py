@@ -0,0 +1,203 @@
+# asyncio facade for RedBlackTree
+#
+# Single lookups and updates take O(log n) and are simply run inline, but
+# anything that touches many nodes (range scans, full traversals, bulk loads
+# and deletes, saving and loading) would block the event loop for as long as
+# it runs on a big tree. AsyncRedBlackTree splits that work into chunks of
+# `chunk` nodes and yields to the loop between them, or hands it to a worker
+# thread. Writers are serialized by an asyncio.Lock, so a bulk update is
+# never interleaved with another update.
+
+import asyncio
+from itertools import islice
+from typing import Any, AsyncIterator, Callable, Iterable, Type, TypeVar
+
+from rbtree import RedBlackTree, Node, _MISSING
+
+
+T = TypeVar('T', bound='AsyncRedBlackTree')
+
+
+class AsyncRedBlackTree():
+    # Nodes handled between two yields to the event loop
+    chunk = 1000
+
+    def __init__(self: T, tree: RedBlackTree = None, key: Callable = None,
+                 chunk: int = None) -> None:
+        """
+        Wrap tree, or a new empty tree (ordered by key if given). The
+        wrapped tree should only be updated through this object.
+        """
+        self._tree = RedBlackTree(key=key) if tree is None else tree
+        if chunk is not None:
+            self.chunk = chunk
+        # Created on first use: before Python 3.10 an asyncio.Lock binds
+        # to the event loop current when it is created.
+        self._write_lock = None
+
+    def _lock(self: T) -> asyncio.Lock:
+        if self._write_lock is None:
+            self._write_lock = asyncio.Lock()
+        return self._write_lock
+
+    # Reads. These take O(log n) and never block the loop for long. #
+    def __len__(self: T) -> int:
+        return self._tree.size
+
+    def __contains__(self: T, key: Any) -> bool:
+        return key in self._tree
+
+    def __getitem__(self: T, key: Any) -> Any:
+        return self._tree[key]
+
+    def get(self: T, key: Any, default: Any = None) -> Any:
+        return self._tree.get(key, default)
+
+    def search(self: T, key: Any) -> Node:
+        return self._tree.search(key)
+
+    def floor(self: T, key: Any) -> Node:
+        return self._tree.floor(key)
+
+    def ceiling(self: T, key: Any) -> Node:
+        return self._tree.ceiling(key)
+
+    # Iteration #
+    def __aiter__(self: T) -> AsyncIterator[Node]:
+        return self.irange()
+
+    async def irange(self: T, lo: Any = None, hi: Any = None,
+                     inclusive: tuple = (True, True),
+                     reverse: bool = False) -> AsyncIterator[Node]:
+        """
+        Asynchronously yield the nodes with keys between lo and hi, like
+        RedBlackTree.irange. Nodes are collected a chunk at a time and the
+        loop gets control back between chunks. Each chunk starts with a
+        fresh descent past the last key seen, so updates made while the
+        scan is suspended are safe: they show up in later chunks, though
+        nodes of the current chunk are yielded even if deleted meanwhile.
+        """
+        tree = self._tree
+        while True:
+            nodes = tree.irange(lo, hi, inclusive, reverse)
+            batch = list(islice(nodes, self.chunk))
+            if not batch:
+                return
+            # Keep runs of equal keys in one chunk, since the next chunk
+            # resumes after the last key
+            last = batch[-1]
+            done = len(batch) < self.chunk
+            for node in nodes:
+                if node._key != last._key:
+                    break
+                batch.append(node)
+            else:
+                done = True
+
+            for node in batch:
+                yield node
+            if done:
+                return
+            if reverse:
+                hi = last.get_key()
+                inclusive = (inclusive[0], False)
+            else:
+                lo = last.get_key()
+                inclusive = (False, inclusive[1])
+            await asyncio.sleep(0)
+
+    async def inorder(self: T) -> list:
+        """
+        Return every node in key order, yielding between chunks.
+        """
+        return [node async for node in self.irange()]
+
+    async def items(self: T) -> list:
+        return [(node.get_key(), node.value)
+                async for node in self.irange()]
+
+    # Updates #
+    async def insert(self: T, key: Any, value: Any = None) -> None:
+        async with self._lock():
+            self._tree.insert(key, value)
+
+    async def set(self: T, key: Any, value: Any) -> None:
+        """
+        Equivalent of tree[key] = value.
+        """
+        async with self._lock():
+            self._tree[key] = value
+
+    async def delete(self: T, key: Any) -> Node:
+        async with self._lock():
+            return self._tree.delete(key)
+
+    async def pop(self: T, key: Any, default: Any = _MISSING) -> Any:
+        async with self._lock():
+            return self._tree.pop(key, default)
+
+    async def pop_min(self: T) -> Node:
+        async with self._lock():
+            return self._tree.pop_min()
+
+    async def pop_max(self: T) -> Node:
+        async with self._lock():
+            return self._tree.pop_max()
+
+    async def insert_many(self: T, iterable: Iterable,
+                          items: bool = False) -> None:
+        """
+        Insert every key (or (key, value) pair if items is True) a chunk
+        at a time, yielding between chunks. Other writers wait until the
+        whole batch is in.
+        """
+        async with self._lock():
+            iterator = iter(iterable)
+            while True:
+                batch = list(islice(iterator, self.chunk))
+                if not batch:
+                    return
+                self._tree.insert_many(batch, items)
+                await asyncio.sleep(0)
+
+    async def delete_many(self: T, iterable: Iterable) -> None:
+        """
+        Delete one node for every key in iterable, a chunk at a time.
+        """
+        async with self._lock():
+            iterator = iter(iterable)
+            while True:
+                batch = list(islice(iterator, self.chunk))
+                if not batch:
+                    return
+                self._tree.delete_many(batch)
+                await asyncio.sleep(0)
+
+    # Whole-tree operations, run in a worker thread #
+    async def _in_thread(self: T, func: Callable, *args: Any) -> Any:
+        """
+        Run func in the default executor with writers locked out. Reads
+        from the loop can carry on in the meantime.
+        """
+        async with self._lock():
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, func, *args)
+
+    async def print_tree(self: T) -> None:
+        await self._in_thread(self._tree.print_tree)
+
+    async def dump(self: T, path: str) -> None:
+        """
+        Save the tree like RedBlackTree.dump without blocking the loop.
+        """
+        await self._in_thread(self._tree.dump, path)
+
+    @classmethod
+    async def load(cls: Type[T], path: str, key: Callable = None,
+                   chunk: int = None) -> T:
+        """
+        Load a tree saved by dump without blocking the loop.
+        """
+        loop = asyncio.get_running_loop()
+        tree = await loop.run_in_executor(None, RedBlackTree.load, path, key)
+        return cls(tree, chunk=chunk)
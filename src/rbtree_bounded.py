@@ -0,0 +1,212 @@
+# Capacity-bounded RedBlackTree
+#
+# BoundedRedBlackTree evicts entries as soon as an update takes it over its
+# capacity: the smallest keys (a sliding window over increasing keys, or a
+# top-k of the largest), the largest keys, or the least recently used
+# entries. Evicting by key order unlinks the cached leftmost or rightmost
+# node without a search. For LRU every node also sits on a doubly linked
+# list threaded through two extra node slots, ordered from least to most
+# recently used, so both touching and evicting take O(1) on top of the tree
+# update itself.
+
+from typing import Any, Callable, Iterable, Iterator, Type, TypeVar
+
+from rbtree import RedBlackTree, Node, KeyedNode
+
+
+class LRUNode(Node):
+    # Neighbours on the tree's recency list
+    __slots__ = ("_prev", "_next")
+
+    def __init__(self: "LRUNode", key: Any) -> None:
+        super().__init__(key)
+        self._prev = None
+        self._next = None
+
+
+class KeyedLRUNode(KeyedNode):
+    __slots__ = ("_prev", "_next")
+
+    def __init__(self: "KeyedLRUNode", sort_key: Any, key: Any) -> None:
+        super().__init__(sort_key, key)
+        self._prev = None
+        self._next = None
+
+
+T = TypeVar('T', bound='BoundedRedBlackTree')
+
+POLICIES = ("min", "max", "lru")
+
+
+class BoundedRedBlackTree(RedBlackTree):
+    _node_class = LRUNode
+    _keyed_node_class = KeyedLRUNode
+
+    def __init__(self: T, capacity: int, policy: str = "lru",
+                 on_evict: Callable[[Node], None] = None,
+                 key: Callable = None) -> None:
+        """
+        Keep at most capacity nodes. policy picks the nodes evicted when
+        there are more: "min" (smallest key), "max" (largest key) or
+        "lru" (least recently inserted, found or updated). on_evict is
+        called with every evicted node once it is out of the tree.
+        """
+        if capacity < 1:
+            raise Exception("Capacity must be at least 1")
+        if policy not in POLICIES:
+            raise Exception("Unknown eviction policy")
+        super().__init__(key=key)
+        self.capacity = capacity
+        self.on_evict = on_evict
+        self._policy = policy
+        # Whether the recency list is kept up to date
+        self._lru = policy == "lru"
+        # Circular list head: _next is the least, _prev the most recently
+        # used node
+        self._head = self._node_class.null()
+        self._head._prev = self._head._next = self._head
+
+    @classmethod
+    def from_sorted(cls: Type[T], iterable: Iterable, capacity: int,
+                    policy: str = "lru",
+                    on_evict: Callable[[Node], None] = None,
+                    items: bool = False, key: Callable = None) -> T:
+        """
+        Build a bounded tree from an iterable of keys (or (key, value)
+        pairs if items is True), evicting down to capacity. Under LRU the
+        last entries count as the most recently used.
+        """
+        return cls(capacity, policy, on_evict, key)._load_sorted(iterable,
+                                                                 items)
+
+    @classmethod
+    def load(cls: Type[T], path: str, capacity: int, policy: str = "lru",
+             on_evict: Callable[[Node], None] = None,
+             key: Callable = None) -> T:
+        """
+        Load a tree saved by dump, evicting down to capacity.
+        """
+        return cls(capacity, policy, on_evict, key)._load_file(path)
+
+    def _load_sorted(self: T, iterable: Iterable, items: bool) -> T:
+        self.insert_many(iterable, items)
+        return self
+
+    def _load_file(self: T, path: str) -> T:
+        # Load into a plain tree first, then insert so that eviction and
+        # the recency list apply
+        tree = RedBlackTree(key=self._key_func)._load_file(path)
+        self.insert_many([(node.get_key(), node.value)
+                          for node in tree.iter_inorder()], items=True)
+        return self
+
+    @property
+    def policy(self: T) -> str:
+        return self._policy
+
+    def _reads_update(self: T) -> bool:
+        return self._lru or super()._reads_update()
+
+    # Recency list #
+    def _append(self: T, node: Node) -> None:
+        head = self._head
+        last = head._prev
+        node._prev = last
+        node._next = head
+        last._next = node
+        head._prev = node
+
+    def _unlink(self: T, node: Node) -> None:
+        node._prev._next = node._next
+        node._next._prev = node._prev
+        node._prev = node._next = None
+
+    def _touch(self: T, node: Node) -> None:
+        """
+        Mark node as the most recently used.
+        """
+        if self._lru and node._next is not self._head:
+            self._unlink(node)
+            self._append(node)
+
+    def lru(self: T) -> Iterator[Node]:
+        """
+        Yield the nodes from least to most recently used. Only tracked
+        under the "lru" policy; otherwise nothing is yielded.
+        """
+        head = self._head
+        node = head._next
+        while node is not head:
+            yield node
+            node = node._next
+
+    # Eviction #
+    def _evict(self: T) -> None:
+        while self.size > self.capacity:
+            if self._policy == "min":
+                node = self._first
+            elif self._policy == "max":
+                node = self._last
+            else:
+                node = self._head._next
+            self._remove(node)
+            if self.on_evict is not None:
+                self.on_evict(node)
+
+    # Hooks into RedBlackTree #
+    def _link(self: T, node: Node, y: Node) -> None:
+        super()._link(node, y)
+        if self._lru:
+            self._append(node)
+
+    def _remove(self: T, z: Node) -> Node:
+        super()._remove(z)
+        if self._lru:
+            self._unlink(z)
+        return z
+
+    def _use_rebuild(self: T, batch_size: int) -> bool:
+        # Rebuilds do not maintain the recency list, and would take new
+        # keys in key order rather than in the order they were used
+        return not self._lru and super()._use_rebuild(batch_size)
+
+    # Updates and lookups #
+    def insert(self: T, key: Any, value: Any = None) -> None:
+        if self.size >= self.capacity and not self._lru:
+            # A full tree would evict the new node straight away when it
+            # lands at the evicting end, so skip linking it
+            sort_key = key if self._key_func is None else self._key_func(key)
+            if (sort_key < self._first._key if self._policy == "min"
+                    else not sort_key < self._last._key):
+                if self.on_evict is not None:
+                    self.on_evict(self._new_node(key, value))
+                return
+        super().insert(key, value)
+        self._evict()
+
+    def _find_or_add(self: T, key: Any, value: Any) -> tuple:
+        node, added = super()._find_or_add(key, value)
+        if added:
+            self._evict()
+        else:
+            self._touch(node)
+        return node, added
+
+    def search(self: T, key: Any) -> Node:
+        node = super().search(key)
+        if node is not self.TNULL:
+            self._touch(node)
+        return node
+
+    def insert_many(self: T, iterable: Iterable, items: bool = False) -> None:
+        """
+        Insert every key in iterable, evicting down to capacity. Under
+        LRU, later keys in the batch count as more recently used.
+        """
+        super().insert_many(iterable, items)
+        self._evict()
+
+    def _unsupported(self: T, *args: Any) -> None:
+        raise Exception("Bounded trees cannot be split, joined or combined")
+
+    split = join = union = intersection = difference = _unsupported
@@ -0,0 +1,271 @@
+# Thread-safe red-black tree
+#
+# ConcurrentRedBlackTree wraps a RedBlackTree with a reader-writer lock, so
+# any number of threads can search and scan the tree at the same time while
+# writers get exclusive access. A writer can apply many updates under a
+# single acquisition with batch(), and snapshot() returns an immutable copy
+# that can be read without taking any lock at all.
+
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Iterable, Iterator, TypeVar
+
+from rbtree import RedBlackTree, Node, _MISSING
+from rbtree_persistent import PersistentRedBlackTree
+
+
+T = TypeVar('T', bound='RWLock')
+
+
+class RWLock():
+    """
+    Reader-writer lock. Many readers can hold it at once, a writer holds
+    it alone. Waiting writers block new readers, so a steady stream of
+    reads cannot starve writes. The lock is not reentrant.
+    """
+
+    def __init__(self: T) -> None:
+        # Uncontended paths only take the plain mutex; the condition
+        # shares it and is only used to wait.
+        self._mutex = threading.Lock()
+        self._cond = threading.Condition(self._mutex)
+        self._readers = 0
+        self._writer = False
+        self._waiting_writers = 0
+        self._read_locked = _ReadLocked(self)
+        self._write_locked = _WriteLocked(self)
+
+    def acquire_read(self: T) -> None:
+        with self._mutex:
+            while self._writer or self._waiting_writers:
+                self._cond.wait()
+            self._readers += 1
+
+    def release_read(self: T) -> None:
+        with self._mutex:
+            self._readers -= 1
+            if not self._readers and self._waiting_writers:
+                self._cond.notify_all()
+
+    def acquire_write(self: T) -> None:
+        with self._mutex:
+            self._waiting_writers += 1
+            while self._writer or self._readers:
+                self._cond.wait()
+            self._waiting_writers -= 1
+            self._writer = True
+
+    def release_write(self: T) -> None:
+        with self._mutex:
+            self._writer = False
+            self._cond.notify_all()
+
+    def read_locked(self: T) -> "_ReadLocked":
+        """
+        Context manager holding the lock for reading.
+        """
+        return self._read_locked
+
+    def write_locked(self: T) -> "_WriteLocked":
+        """
+        Context manager holding the lock for writing.
+        """
+        return self._write_locked
+
+
+# Plain classes rather than @contextmanager generators, which would add a
+# generator round trip to every read of the tree.
+class _ReadLocked():
+    __slots__ = ("_lock",)
+
+    def __init__(self: "_ReadLocked", lock: RWLock) -> None:
+        self._lock = lock
+
+    def __enter__(self: "_ReadLocked") -> None:
+        self._lock.acquire_read()
+
+    def __exit__(self: "_ReadLocked", *exc_info: Any) -> None:
+        self._lock.release_read()
+
+
+class _WriteLocked():
+    __slots__ = ("_lock",)
+
+    def __init__(self: "_WriteLocked", lock: RWLock) -> None:
+        self._lock = lock
+
+    def __enter__(self: "_WriteLocked") -> None:
+        self._lock.acquire_write()
+
+    def __exit__(self: "_WriteLocked", *exc_info: Any) -> None:
+        self._lock.release_write()
+
+
+T = TypeVar('T', bound='ConcurrentRedBlackTree')
+
+
+class ConcurrentRedBlackTree():
+    """
+    A RedBlackTree that can be shared between threads. Reads take the
+    lock in shared mode and updates take it exclusively. Methods that
+    return several nodes collect them while holding the lock and return
+    a list, so the lock is never held while the caller iterates.
+
+    Some trees update themselves on reads: one with a finger (see
+    RedBlackTree.enable_finger) moves it on every lookup, and an LRU
+    BoundedRedBlackTree reorders its recency list. Such reads cannot
+    share the lock, so for these trees every read, and reader(), takes
+    the lock exclusively and reads no longer run concurrently.
+    """
+
+    def __init__(self: T, tree: RedBlackTree = None,
+                 key: Callable = None) -> None:
+        """
+        Wrap tree, or a new empty tree (ordered by key if given). The
+        wrapped tree must not be used directly afterwards.
+        """
+        self._tree = RedBlackTree(key=key) if tree is None else tree
+        self._lock = RWLock()
+
+    def _read_locked(self: T) -> Any:
+        if self._tree._reads_update():
+            return self._lock.write_locked()
+        return self._lock.read_locked()
+
+    # Batches #
+    @contextmanager
+    def batch(self: T) -> Iterator[RedBlackTree]:
+        """
+        Hold the write lock for a block of updates and yield the wrapped
+        tree, so many inserts and deletes cost a single acquisition:
+
+            with ctree.batch() as bst:
+                bst.insert(1)
+                bst.delete(2)
+        """
+        with self._lock.write_locked():
+            yield self._tree
+
+    @contextmanager
+    def reader(self: T) -> Iterator[RedBlackTree]:
+        """
+        Hold the read lock (exclusively if reads update the tree) for a
+        block of reads and yield the wrapped tree. The tree must not be
+        modified inside the block.
+        """
+        with self._read_locked():
+            yield self._tree
+
+    def snapshot(self: T) -> PersistentRedBlackTree:
+        """
+        Return an immutable copy of the current contents. Building it
+        takes O(n) under the read lock; reading it afterwards needs no
+        locking at all, however many writes happen in the meantime.
+        """
+        with self._lock.read_locked():
+            return PersistentRedBlackTree.from_sorted(
+                ((node.get_key(), node.value)
+                 for node in self._tree.iter_inorder()), items=True)
+
+    # Reads #
+    def __len__(self: T) -> int:
+        return self._tree.size
+
+    def __contains__(self: T, key: Any) -> bool:
+        with self._read_locked():
+            return key in self._tree
+
+    def __getitem__(self: T, key: Any) -> Any:
+        with self._read_locked():
+            return self._tree[key]
+
+    def get(self: T, key: Any, default: Any = None) -> Any:
+        with self._read_locked():
+            return self._tree.get(key, default)
+
+    def search(self: T, key: Any) -> Node:
+        with self._read_locked():
+            return self._tree.search(key)
+
+    def minimum(self: T) -> Node:
+        with self._read_locked():
+            return self._tree.minimum()
+
+    def maximum(self: T) -> Node:
+        with self._read_locked():
+            return self._tree.maximum()
+
+    def floor(self: T, key: Any) -> Node:
+        with self._read_locked():
+            return self._tree.floor(key)
+
+    def ceiling(self: T, key: Any) -> Node:
+        with self._read_locked():
+            return self._tree.ceiling(key)
+
+    def select(self: T, i: int) -> Node:
+        with self._read_locked():
+            return self._tree.select(i)
+
+    def rank(self: T, key: Any) -> int:
+        with self._read_locked():
+            return self._tree.rank(key)
+
+    def count_range(self: T, lo: Any, hi: Any,
+                    inclusive: tuple = (True, True)) -> int:
+        with self._read_locked():
+            return self._tree.count_range(lo, hi, inclusive)
+
+    def irange(self: T, lo: Any = None, hi: Any = None,
+               inclusive: tuple = (True, True),
+               reverse: bool = False) -> list:
+        """
+        Return the nodes with keys between lo and hi as a list.
+        """
+        with self._read_locked():
+            return list(self._tree.irange(lo, hi, inclusive, reverse))
+
+    def items(self: T) -> list:
+        with self._read_locked():
+            return list(self._tree.items())
+
+    # Writes #
+    def insert(self: T, key: Any, value: Any = None) -> None:
+        with self._lock.write_locked():
+            self._tree.insert(key, value)
+
+    def delete(self: T, key: Any) -> Node:
+        with self._lock.write_locked():
+            return self._tree.delete(key)
+
+    def __setitem__(self: T, key: Any, value: Any) -> None:
+        with self._lock.write_locked():
+            self._tree[key] = value
+
+    def __delitem__(self: T, key: Any) -> None:
+        with self._lock.write_locked():
+            del self._tree[key]
+
+    def setdefault(self: T, key: Any, default: Any = None) -> Any:
+        with self._lock.write_locked():
+            return self._tree.setdefault(key, default)
+
+    def pop(self: T, key: Any, default: Any = _MISSING) -> Any:
+        with self._lock.write_locked():
+            return self._tree.pop(key, default)
+
+    def pop_min(self: T) -> Node:
+        with self._lock.write_locked():
+            return self._tree.pop_min()
+
+    def pop_max(self: T) -> Node:
+        with self._lock.write_locked():
+            return self._tree.pop_max()
+
+    def insert_many(self: T, iterable: Iterable, items: bool = False) -> None:
+        with self._lock.write_locked():
+            self._tree.insert_many(iterable, items)
+
+    def delete_many(self: T, iterable: Iterable) -> None:
+        with self._lock.write_locked():
+            self._tree.delete_many(iterable)
@@ -0,0 +1,100 @@
+# Interval tree on top of RedBlackTree
+#
+# Keys are closed intervals given as (start, end) tuples, so the tree is
+# ordered by start (then end). Each node also keeps the largest end of any
+# interval in its subtree, maintained through RedBlackTree's _pull hook. A
+# search can then skip every subtree whose intervals all end before the
+# query begins, and stop as soon as intervals start after the query ends.
+
+from typing import Any, Callable, Iterator, TypeVar
+
+from rbtree import RedBlackTree, Node
+
+
+class IntervalNode(Node):
+    # Largest end of the intervals in the subtree rooted here
+    __slots__ = ("_max_end",)
+
+
+T = TypeVar('T', bound='IntervalRedBlackTree')
+
+
+class IntervalRedBlackTree(RedBlackTree):
+    _node_class = IntervalNode
+    _augmented = True
+
+    def __init__(self: T, key: Callable = None) -> None:
+        """
+        Keys are (start, end) tuples with start <= end; the bounds can
+        be of any mutually comparable type.
+        """
+        if key is not None:
+            raise Exception("Interval trees do not take a key function")
+        super().__init__()
+        self.TNULL._max_end = None
+
+    def _pull(self: T, node: Node) -> None:
+        max_end = node._key[1]
+        left = node.left._max_end
+        if left is not None and max_end < left:
+            max_end = left
+        right = node.right._max_end
+        if right is not None and max_end < right:
+            max_end = right
+        node._max_end = max_end
+
+    # Queries #
+    def find_overlap(self: T, lo: Any, hi: Any = None) -> Node:
+        """
+        Return some node whose interval contains the point lo, or
+        overlaps [lo, hi] if hi is given, or TNULL if there is none, in
+        a single O(log n) descent.
+        """
+        if hi is None:
+            hi = lo
+        tnull = self.TNULL
+        node = self.root
+        while node is not tnull:
+            start, end = node._key
+            if start <= hi and lo <= end:
+                return node
+            left = node.left
+            if left is not tnull and lo <= left._max_end:
+                node = left
+            else:
+                node = node.right
+        return tnull
+
+    def overlaps(self: T, lo: Any, hi: Any = None) -> Iterator[Node]:
+        """
+        Lazily yield, in order of start, every node whose interval
+        contains the point lo, or overlaps [lo, hi] if hi is given.
+        Subtrees that end before lo are skipped and the walk stops at the
+        first interval starting after hi, so only nodes on the paths to
+        the k results are visited: O(log n + k) for typical data and at
+        most O(k log n). The tree must not be modified while iterating.
+        """
+        if hi is None:
+            hi = lo
+        tnull = self.TNULL
+        stack = []
+        node = self.root
+        while True:
+            while node is not tnull and lo <= node._max_end:
+                stack.append(node)
+                node = node.left
+            if not stack:
+                return
+            node = stack.pop()
+            start, end = node._key
+            if hi < start:
+                return
+            if lo <= end:
+                yield node
+            node = node.right
+
+    def max_end(self: T) -> Any:
+        """
+        Return the largest end of any interval, or None if empty.
+        """
+        return self.root._max_end
@@ -0,0 +1,73 @@
+# Streaming merges across several trees
+#
+# When data is spread over many trees, for instance one per time bucket,
+# queries have to look at all of them in key order. These functions walk
+# the trees in step with irange and successor, so they hold one node per
+# tree at a time instead of materialising every inorder() list. The trees
+# must order their nodes the same way, i.e. use the same key function.
+
+from heapq import merge as heap_merge
+from typing import Any, Iterator
+
+from rbtree import RedBlackTree, _node_sort_key
+
+
+def merge(*trees: RedBlackTree, lo: Any = None, hi: Any = None,
+          inclusive: tuple = (True, True), reverse: bool = False,
+          dedup: bool = False) -> Iterator:
+    """
+    Lazily yield the nodes of all trees with keys between lo and hi in
+    key order, like RedBlackTree.irange on their union. Equal keys come
+    in the order of the trees. If dedup is True only the first node of
+    each key is yielded. Takes O(log k) per node for k trees.
+    """
+    nodes = heap_merge(*[tree.irange(lo, hi, inclusive, reverse)
+                         for tree in trees],
+                       key=_node_sort_key, reverse=reverse)
+    if not dedup:
+        yield from nodes
+        return
+    last = None
+    for node in nodes:
+        if last is None or node._key != last._key:
+            yield node
+        last = node
+
+
+def zip_matching(*trees: RedBlackTree) -> Iterator[tuple]:
+    """
+    Lazily yield, in key order, a tuple with one node from each tree for
+    every key that is in all of them. With repeated keys the first node
+    of the key in each tree is used. A tree that falls behind first
+    tries a successor step and otherwise searches for the key, so small
+    trees can be matched against big ones in O(log n) per step.
+    """
+    if not trees:
+        return
+    nodes = [tree.minimum() for tree in trees]
+    while True:
+        for node, tree in zip(nodes, trees):
+            if node is tree.TNULL:
+                return
+        target = max(node._key for node in nodes)
+        matched = True
+        for i, tree in enumerate(trees):
+            node = nodes[i]
+            if node._key < target:
+                node = tree.successor(node)
+                if node is not tree.TNULL and node._key < target:
+                    node = tree._first_above(target, True)
+                nodes[i] = node
+                if node is tree.TNULL:
+                    return
+                if target < node._key:
+                    matched = False
+        if not matched:
+            continue
+
+        yield tuple(nodes)
+        for i, tree in enumerate(trees):
+            node = tree.successor(nodes[i])
+            if node is not tree.TNULL and node._key == target:
+                node = tree._first_above(target, False)
+            nodes[i] = node
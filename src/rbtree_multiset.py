@@ -0,0 +1,292 @@
+# Multiset on top of RedBlackTree
+#
+# A plain RedBlackTree stores every inserted key in its own node, so a key
+# inserted k times takes k nodes and makes the tree deeper for every other
+# key as well. MultisetRedBlackTree keeps one node per distinct key with a
+# multiplicity count. Each node also keeps the total count of its subtree,
+# maintained through RedBlackTree's _pull hook, so order statistics count
+# elements rather than nodes. join and the set operations combine the
+# counts of equal keys: union adds them up, intersection keeps the smaller
+# one and difference subtracts.
+
+from heapq import merge
+from itertools import repeat
+from typing import Any, Callable, Iterable, Iterator, TypeVar
+
+from rbtree import RedBlackTree, Node, KeyedNode, _node_sort_key, \
+    _write_tree
+
+
+class CountedNode(Node):
+    # Multiplicity of the key, and total multiplicity of the subtree
+    __slots__ = ("_count", "_total")
+
+    def __init__(self: "CountedNode", key: Any) -> None:
+        super().__init__(key)
+        self._count = 1
+        self._total = 1
+
+
+class KeyedCountedNode(KeyedNode):
+    __slots__ = ("_count", "_total")
+
+    def __init__(self: "KeyedCountedNode", sort_key: Any, key: Any) -> None:
+        super().__init__(sort_key, key)
+        self._count = 1
+        self._total = 1
+
+
+T = TypeVar('T', bound='MultisetRedBlackTree')
+
+
+class MultisetRedBlackTree(RedBlackTree):
+    _node_class = CountedNode
+    _keyed_node_class = KeyedCountedNode
+    _augmented = True
+
+    def __init__(self: T, key: Callable = None) -> None:
+        """
+        Equal keys share a node, which keeps the value it was created
+        with. size is the number of distinct keys and len() the number of
+        elements, counting repeats.
+        """
+        super().__init__(key=key)
+        self.TNULL._count = 0
+        self.TNULL._total = 0
+
+    def _load_sorted(self: T, iterable: Iterable, items: bool) -> T:
+        # insert_many collapses repeated keys into one node
+        self.insert_many(iterable, items)
+        return self
+
+    def _load_file(self: T, path: str) -> T:
+        tree = RedBlackTree(key=self._key_func)._load_file(path)
+        self.insert_many([(node.get_key(), node.value)
+                          for node in tree.iter_inorder()], items=True)
+        return self
+
+    def dump(self: T, path: str) -> None:
+        """
+        Write every element to path like RedBlackTree.dump, repeating a
+        key once per occurrence so that load (or a plain tree or a
+        MappedTree reading the file) sees the counts.
+        """
+        keys = []
+        values = []
+        for node in self.iter_inorder():
+            keys.extend(repeat(node.get_key(), node._count))
+            values.extend(repeat(node.value, node._count))
+        with open(path, "wb") as outfile:
+            _write_tree(outfile, keys, values)
+
+    def _pull(self: T, node: Node) -> None:
+        node._total = node.left._total + node.right._total + node._count
+
+    def __len__(self: T) -> int:
+        return self.root._total
+
+    # Counting #
+    def count(self: T, key: Any) -> int:
+        """
+        Return how many times key is in the tree.
+        """
+        return self.search(key)._count
+
+    def elements(self: T, lo: Any = None, hi: Any = None,
+                 inclusive: tuple = (True, True),
+                 reverse: bool = False) -> Iterator[Any]:
+        """
+        Lazily yield every key between lo and hi once per occurrence, in
+        order. Bounds work as in irange.
+        """
+        for node in self.irange(lo, hi, inclusive, reverse):
+            yield from repeat(node.get_key(), node._count)
+
+    # Updates #
+    def insert(self: T, key: Any, value: Any = None) -> None:
+        """
+        Add one occurrence of key. value is only stored if key is new.
+        """
+        node, added = self._find_or_add(key, value)
+        if not added:
+            node._count += 1
+            self._pull_up(node)
+
+    def _remove_one(self: T, node: Node) -> Node:
+        if node._count > 1:
+            node._count -= 1
+            self._pull_up(node)
+            return node
+        return self._remove(node)
+
+    def delete(self: T, key: Any) -> Node:
+        """
+        Remove one occurrence of key. Returns its node, which only leaves
+        the tree with the last occurrence, or TNULL if the key was not
+        found.
+        """
+        node = self.search(key)
+        if node is self.TNULL:
+            return node
+        return self._remove_one(node)
+
+    def remove_one(self: T, key: Any) -> int:
+        """
+        Remove one occurrence of key and return how many are left.
+        Raises KeyError if key is not in the tree.
+        """
+        node = self.search(key)
+        if node is self.TNULL:
+            raise KeyError(key)
+        remaining = node._count - 1
+        self._remove_one(node)
+        return remaining
+
+    def remove_all(self: T, key: Any) -> int:
+        """
+        Remove every occurrence of key and return how many there were.
+        """
+        node = self.search(key)
+        if node is self.TNULL:
+            return 0
+        self._remove(node)
+        return node._count
+
+    def pop_min(self: T) -> Node:
+        """
+        Remove one occurrence of the smallest key and return its node.
+        """
+        node = self._first
+        if node is self.TNULL:
+            raise IndexError("pop from an empty tree")
+        return self._remove_one(node)
+
+    def pop_max(self: T) -> Node:
+        """
+        Remove one occurrence of the largest key and return its node.
+        """
+        node = self._last
+        if node is self.TNULL:
+            raise IndexError("pop from an empty tree")
+        return self._remove_one(node)
+
+    def insert_many(self: T, iterable: Iterable, items: bool = False) -> None:
+        """
+        Insert every key in iterable, like RedBlackTree.insert_many. Large
+        batches are merged with the existing nodes, adding up the counts
+        of equal keys, and rebuilt in linear time.
+        """
+        batch = list(iterable)
+        if not self._use_rebuild(len(batch)):
+            super().insert_many(batch, items)
+            return
+
+        if items:
+            new_nodes = [self._new_node(k, v) for k, v in batch]
+        else:
+            new_nodes = [self._new_node(k) for k in batch]
+        new_nodes.sort(key=_node_sort_key)
+
+        # merge is stable, so existing nodes come first and absorb the
+        # counts of the new ones
+        merged = []
+        append = merged.append
+        for node in merge(self.iter_inorder(), new_nodes,
+                          key=_node_sort_key):
+            if merged and merged[-1]._key == node._key:
+                merged[-1]._count += node._count
+            else:
+                append(node)
+        self._build(merged)
+
+    def delete_many(self: T, iterable: Iterable) -> None:
+        """
+        Remove one occurrence for every key in iterable, ignoring keys
+        that are not in the tree.
+        """
+        batch = list(iterable)
+        if not self._use_rebuild(len(batch)):
+            super().delete_many(batch)
+            return
+
+        if self._key_func is not None:
+            batch = [self._key_func(key) for key in batch]
+        batch.sort()
+        kept = []
+        append = kept.append
+        i = 0
+        n_batch = len(batch)
+        for node in self.iter_inorder():
+            key = node._key
+            while i < n_batch and batch[i] < key:
+                i += 1
+            while i < n_batch and batch[i] == key and node._count:
+                node._count -= 1
+                i += 1
+            if node._count:
+                append(node)
+        self._build(kept)
+
+    # Order statistics, counting every occurrence #
+    def select(self: T, i: int) -> Node:
+        """
+        Return the node holding the i-th smallest element (0-based,
+        negative indices count from the end) in O(log n).
+        """
+        total = self.root._total
+        if i < 0:
+            i += total
+        if not 0 <= i < total:
+            raise IndexError("tree index out of range")
+        node = self.root
+        while True:
+            left_total = node.left._total
+            if i < left_total:
+                node = node.left
+            elif i < left_total + node._count:
+                return node
+            else:
+                i -= left_total + node._count
+                node = node.right
+
+    def _count_below(self: T, key: Any, inclusive: bool) -> int:
+        tnull = self.TNULL
+        node = self.root
+        count = 0
+        while node is not tnull:
+            node_key = node._key
+            if node_key < key or (inclusive and node_key == key):
+                count += node.left._total + node._count
+                node = node.right
+            else:
+                node = node.left
+        return count
+
+    # Splitting and combining, counting every occurrence #
+    def join(self: T, key: Any, other: T, value: Any = None) -> T:
+        """
+        Like RedBlackTree.join, but an occurrence of key that is already
+        at the end of this tree or the start of other is counted on that
+        node rather than linked as a new one.
+        """
+        node = self._new_node(key, value)
+        self._check_join(node._key, other)
+        # From the right so that the leftmost node, and its value, stays
+        for tree, end in ((other, other._first), (self, self._last)):
+            if end is not tree.TNULL and end._key == node._key:
+                tree._remove(end)
+                end._count += node._count
+                node = end
+        return self._join_node(node, other)
+
+    def _keep_common(self: T, node: Node, other: Node, both: bool,
+                     a_only: bool, b_only: bool) -> bool:
+        # union adds up the counts, intersection keeps the smaller one
+        # and difference subtracts
+        if b_only:
+            node._count += other._count
+        elif both:
+            node._count = min(node._count, other._count)
+        else:
+            node._count -= other._count
+        return node._count > 0
@@ -0,0 +1,418 @@
+# Persistent (immutable) red-black tree
+#
+# Every update returns a new tree and leaves the old one untouched. Nodes
+# are never modified after they are created and have no parent links, so
+# an update only copies the O(log n) nodes on the path it changes and
+# shares every other node with the previous version. That makes holding on
+# to a snapshot free: readers keep a reference to a version while a writer
+# builds newer ones.
+#
+# Insertion follows Okasaki's functional balancing and deletion follows
+# Kahrs ("Red-black trees with types", JFP 2001).
+
+from typing import Any, Iterable, Iterator, Type, TypeVar
+
+from rbtree import BLACK, RED
+
+
+T = TypeVar('T', bound='PersistentNode')
+
+
+class PersistentNode():
+    __slots__ = ("_color", "left", "_key", "value", "right", "_size")
+
+    def __init__(self: T, color: int, left: T, key: Any, value: Any,
+                 right: T) -> None:
+        self._color = color
+        self.left = left
+        self._key = key
+        self.value = value
+        self.right = right
+        self._size = 1 + (left._size if left is not None else 0) + \
+            (right._size if right is not None else 0)
+
+    def __repr__(self: T) -> str:
+        return "Key: " + str(self._key) + " Value: " + str(self.value)
+
+    def get_key(self: T) -> Any:
+        return self._key
+
+    def get_color(self: T) -> str:
+        return "black" if self._color == BLACK else "red"
+
+    def is_red(self: T) -> bool:
+        return self._color == RED
+
+    def is_black(self: T) -> bool:
+        return self._color == BLACK
+
+
+Node = PersistentNode
+
+
+# Balancing helpers. Empty subtrees are None. #
+def _is_red(node: Node) -> bool:
+    return node is not None and node._color == RED
+
+
+def _is_black(node: Node) -> bool:
+    return node is not None and node._color == BLACK
+
+
+def _recolor(node: Node, color: int) -> Node:
+    if node._color == color:
+        return node
+    return Node(color, node.left, node._key, node.value, node.right)
+
+
+def _balance(left: Node, key: Any, value: Any, right: Node) -> Node:
+    """
+    Build a node above left and right, rotating away a red-red violation
+    in either child. Without a violation the node is black.
+    """
+    if _is_red(left) and _is_red(right):
+        return Node(RED, _recolor(left, BLACK), key, value,
+                    _recolor(right, BLACK))
+    if _is_red(left):
+        if _is_red(left.left):
+            return Node(RED, _recolor(left.left, BLACK), left._key,
+                        left.value, Node(BLACK, left.right, key, value, right))
+        if _is_red(left.right):
+            lr = left.right
+            return Node(RED,
+                        Node(BLACK, left.left, left._key, left.value, lr.left),
+                        lr._key, lr.value,
+                        Node(BLACK, lr.right, key, value, right))
+    if _is_red(right):
+        if _is_red(right.right):
+            return Node(RED, Node(BLACK, left, key, value, right.left),
+                        right._key, right.value,
+                        _recolor(right.right, BLACK))
+        if _is_red(right.left):
+            rl = right.left
+            return Node(RED, Node(BLACK, left, key, value, rl.left),
+                        rl._key, rl.value,
+                        Node(BLACK, rl.right, right._key, right.value,
+                             right.right))
+    return Node(BLACK, left, key, value, right)
+
+
+def _insert(node: Node, key: Any, value: Any, replace: bool) -> Node:
+    """
+    Insert below node. Equal keys go to the right, as in
+    RedBlackTree.insert, unless replace is set, in which case the value
+    of the first node found with the key is replaced.
+    """
+    if node is None:
+        return Node(RED, None, key, value, None)
+    node_key = node._key
+    if replace and key == node_key:
+        return Node(node._color, node.left, key, value, node.right)
+    if key < node_key:
+        left = _insert(node.left, key, value, replace)
+        if node._color == BLACK:
+            return _balance(left, node_key, node.value, node.right)
+        return Node(RED, left, node_key, node.value, node.right)
+    right = _insert(node.right, key, value, replace)
+    if node._color == BLACK:
+        return _balance(node.left, node_key, node.value, right)
+    return Node(RED, node.left, node_key, node.value, right)
+
+
+def _balance_left(left: Node, key: Any, value: Any, right: Node) -> Node:
+    """
+    Rebuild a node whose left subtree's black height just dropped by one.
+    """
+    if _is_red(left):
+        return Node(RED, _recolor(left, BLACK), key, value, right)
+    if _is_black(right):
+        return _balance(left, key, value, _recolor(right, RED))
+    # right is red with a black left child
+    rl = right.left
+    return Node(RED, Node(BLACK, left, key, value, rl.left), rl._key,
+                rl.value, _balance(rl.right, right._key, right.value,
+                                   _recolor(right.right, RED)))
+
+
+def _balance_right(left: Node, key: Any, value: Any, right: Node) -> Node:
+    """
+    Rebuild a node whose right subtree's black height just dropped by one.
+    """
+    if _is_red(right):
+        return Node(RED, left, key, value, _recolor(right, BLACK))
+    if _is_black(left):
+        return _balance(_recolor(left, RED), key, value, right)
+    # left is red with a black right child
+    lr = left.right
+    return Node(RED, _balance(_recolor(left.left, RED), left._key,
+                              left.value, lr.left),
+                lr._key, lr.value, Node(BLACK, lr.right, key, value, right))
+
+
+def _append(left: Node, right: Node) -> Node:
+    """
+    Join two subtrees of equal black height whose keys are in order.
+    """
+    if left is None:
+        return right
+    if right is None:
+        return left
+    if left._color == RED and right._color == RED:
+        middle = _append(left.right, right.left)
+        if _is_red(middle):
+            return Node(RED,
+                        Node(RED, left.left, left._key, left.value,
+                             middle.left),
+                        middle._key, middle.value,
+                        Node(RED, middle.right, right._key, right.value,
+                             right.right))
+        return Node(RED, left.left, left._key, left.value,
+                    Node(RED, middle, right._key, right.value, right.right))
+    if left._color == BLACK and right._color == BLACK:
+        middle = _append(left.right, right.left)
+        if _is_red(middle):
+            return Node(RED,
+                        Node(BLACK, left.left, left._key, left.value,
+                             middle.left),
+                        middle._key, middle.value,
+                        Node(BLACK, middle.right, right._key, right.value,
+                             right.right))
+        return _balance_left(left.left, left._key, left.value,
+                             Node(BLACK, middle, right._key, right.value,
+                                  right.right))
+    if right._color == RED:
+        return Node(RED, _append(left, right.left), right._key, right.value,
+                    right.right)
+    return Node(RED, left.left, left._key, left.value,
+                _append(left.right, right))
+
+
+def _delete(node: Node, key: Any) -> Node:
+    """
+    Remove one node with the given key, which must be in the subtree.
+    """
+    node_key = node._key
+    if key < node_key:
+        left = node.left
+        if _is_black(left):
+            return _balance_left(_delete(left, key), node_key, node.value,
+                                 node.right)
+        return Node(RED, _delete(left, key), node_key, node.value, node.right)
+    if node_key < key:
+        right = node.right
+        if _is_black(right):
+            return _balance_right(node.left, node_key, node.value,
+                                  _delete(right, key))
+        return Node(RED, node.left, node_key, node.value,
+                    _delete(right, key))
+    return _append(node.left, node.right)
+
+
+T = TypeVar('T', bound='PersistentRedBlackTree')
+
+
+class PersistentRedBlackTree():
+    """
+    Immutable red-black tree. insert, set and delete return a new tree
+    and never modify the tree they are called on, so any version can be
+    read safely while newer versions are being built.
+    """
+    __slots__ = ("root", "size")
+
+    def __init__(self: T) -> None:
+        self.root = None
+        self.size = 0
+
+    @classmethod
+    def _from_root(cls: Type[T], root: Node) -> T:
+        tree = cls.__new__(cls)
+        tree.root = root
+        tree.size = 0 if root is None else root._size
+        return tree
+
+    @classmethod
+    def from_sorted(cls: Type[T], iterable: Iterable,
+                    items: bool = False) -> T:
+        """
+        Build a tree from keys (or (key, value) pairs if items is True) in
+        linear time, like RedBlackTree.from_sorted.
+        """
+        if items:
+            pairs = list(iterable)
+        else:
+            pairs = [(key, None) for key in iterable]
+        if not all(pairs[i][0] <= pairs[i + 1][0]
+                   for i in range(len(pairs) - 1)):
+            pairs.sort(key=lambda pair: pair[0])
+        red_depth = (len(pairs) + 1).bit_length() - 1
+
+        def build(lo: int, hi: int, depth: int) -> Node:
+            if lo >= hi:
+                return None
+            mid = (lo + hi) // 2
+            key, value = pairs[mid]
+            return Node(RED if depth == red_depth else BLACK,
+                        build(lo, mid, depth + 1), key, value,
+                        build(mid + 1, hi, depth + 1))
+
+        return cls._from_root(build(0, len(pairs), 0))
+
+    # Dunder Methods #
+    def __len__(self: T) -> int:
+        return self.size
+
+    def __iter__(self: T) -> Iterator[Node]:
+        return self.iter_inorder()
+
+    def __contains__(self: T, key: Any) -> bool:
+        return self.search(key) is not None
+
+    def __getitem__(self: T, key: Any) -> Any:
+        node = self.search(key)
+        if node is None:
+            raise KeyError(key)
+        return node.value
+
+    # Getters #
+    def get_root(self: T) -> Node:
+        return self.root
+
+    def get(self: T, key: Any, default: Any = None) -> Any:
+        node = self.search(key)
+        return default if node is None else node.value
+
+    def search(self: T, key: Any) -> Node:
+        """
+        Return a node with the given key, or None.
+        """
+        node = self.root
+        while node is not None:
+            node_key = node._key
+            if key == node_key:
+                return node
+            node = node.left if key < node_key else node.right
+        return None
+
+    def minimum(self: T) -> Node:
+        node = self.root
+        if node is None:
+            return None
+        while node.left is not None:
+            node = node.left
+        return node
+
+    def maximum(self: T) -> Node:
+        node = self.root
+        if node is None:
+            return None
+        while node.right is not None:
+            node = node.right
+        return node
+
+    # Iterators #
+    def iter_inorder(self: T) -> Iterator[Node]:
+        stack = []
+        node = self.root
+        while True:
+            while node is not None:
+                stack.append(node)
+                node = node.left
+            if not stack:
+                return
+            node = stack.pop()
+            yield node
+            node = node.right
+
+    def inorder(self: T) -> list:
+        return list(self.iter_inorder())
+
+    def irange(self: T, lo: Any = None, hi: Any = None,
+               inclusive: tuple = (True, True),
+               reverse: bool = False) -> Iterator[Node]:
+        """
+        Lazily yield the nodes with keys between lo and hi, like
+        RedBlackTree.irange. Without parent links the walk keeps the
+        pending ancestors on a stack, seeded by one descent to the bound.
+        """
+        stack = []
+        node = self.root
+        if not reverse:
+            while node is not None:
+                if lo is None or lo < node._key or \
+                        (inclusive[0] and lo == node._key):
+                    stack.append(node)
+                    node = node.left
+                else:
+                    node = node.right
+            while stack:
+                node = stack.pop()
+                if hi is not None and \
+                        (hi < node._key or (not inclusive[1] and
+                                            node._key == hi)):
+                    return
+                yield node
+                node = node.right
+                while node is not None:
+                    stack.append(node)
+                    node = node.left
+        else:
+            while node is not None:
+                if hi is None or node._key < hi or \
+                        (inclusive[1] and hi == node._key):
+                    stack.append(node)
+                    node = node.right
+                else:
+                    node = node.left
+            while stack:
+                node = stack.pop()
+                if lo is not None and \
+                        (node._key < lo or (not inclusive[0] and
+                                            node._key == lo)):
+                    return
+                yield node
+                node = node.left
+                while node is not None:
+                    stack.append(node)
+                    node = node.right
+
+    def keys(self: T) -> Iterator:
+        for node in self.iter_inorder():
+            yield node._key
+
+    def values(self: T) -> Iterator:
+        for node in self.iter_inorder():
+            yield node.value
+
+    def items(self: T) -> Iterator:
+        for node in self.iter_inorder():
+            yield (node._key, node.value)
+
+    # Updates #
+    def insert(self: T, key: Any, value: Any = None) -> T:
+        """
+        Return a new tree with a node for key added. Like
+        RedBlackTree.insert, this always adds a node, so keys can repeat.
+        """
+        return self._from_root(_recolor(_insert(self.root, key, value,
+                                                False), BLACK))
+
+    def set(self: T, key: Any, value: Any) -> T:
+        """
+        Return a new tree in which key maps to value, replacing the value
+        of an existing node with that key or adding a node if there is
+        none.
+        """
+        return self._from_root(_recolor(_insert(self.root, key, value,
+                                                True), BLACK))
+
+    def delete(self: T, key: Any) -> T:
+        """
+        Return a new tree with one node with the given key removed, or
+        this tree if the key is not present.
+        """
+        if self.search(key) is None:
+            return self
+        root = _delete(self.root, key)
+        if root is not None:
+            root = _recolor(root, BLACK)
+        return self._from_root(root)
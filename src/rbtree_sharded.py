@@ -0,0 +1,411 @@
+# Multi-process sharded red-black tree
+#
+# ShardedRedBlackTree splits the key space into contiguous ranges at a sorted
+# list of boundary keys. Each range (shard) is owned by a RedBlackTree living
+# in its own worker process, so shards do their work in parallel instead of
+# sharing one interpreter lock. Shard i holds the keys k with
+# boundaries[i - 1] <= k < boundaries[i]; the first and last shards are open
+# ended. Point operations are routed to one shard with bisect, while range
+# queries and batches are sent to every shard involved before any reply is
+# awaited, so the shards work on them concurrently. Results cross process
+# boundaries, so the tree deals in keys and (key, value) pairs rather than
+# nodes, and keys, values and functions passed in must be picklable.
+
+import multiprocessing
+from bisect import bisect_right
+from typing import Any, Callable, Iterable, List, TypeVar
+
+from rbtree import RedBlackTree
+
+
+# Commands run by the workers. Each takes the shard's tree first. #
+def _insert(tree: RedBlackTree, key: Any, value: Any) -> int:
+    tree.insert(key, value)
+    return tree.size
+
+
+def _setitem(tree: RedBlackTree, key: Any, value: Any) -> int:
+    tree[key] = value
+    return tree.size
+
+
+def _delete(tree: RedBlackTree, key: Any) -> bool:
+    return tree.delete(key) is not tree.TNULL
+
+
+def _search(tree: RedBlackTree, key: Any) -> tuple:
+    node = tree.search(key)
+    if node is tree.TNULL:
+        return None
+    return (node.get_key(), node.value)
+
+
+def _getitem(tree: RedBlackTree, key: Any) -> Any:
+    return tree[key]
+
+
+def _select(tree: RedBlackTree, i: int) -> tuple:
+    node = tree.select(i)
+    return (node.get_key(), node.value)
+
+
+def _insert_many(tree: RedBlackTree, pairs: list) -> int:
+    tree.insert_many(pairs, items=True)
+    return tree.size
+
+
+def _delete_many(tree: RedBlackTree, keys: list) -> int:
+    tree.delete_many(keys)
+    return tree.size
+
+
+def _irange(tree: RedBlackTree, lo: Any, hi: Any, inclusive: tuple,
+            reverse: bool) -> list:
+    return [(node.get_key(), node.value)
+            for node in tree.irange(lo, hi, inclusive, reverse)]
+
+
+def _count_range(tree: RedBlackTree, lo: Any, hi: Any,
+                 inclusive: tuple) -> int:
+    count = tree.size if hi is None else tree._count_below(hi, inclusive[1])
+    if lo is not None:
+        count -= tree._count_below(lo, not inclusive[0])
+    return max(count, 0)
+
+
+def _map_range(tree: RedBlackTree, func: Callable, lo: Any, hi: Any,
+               inclusive: tuple) -> Any:
+    return func((node.get_key(), node.value)
+                for node in tree.irange(lo, hi, inclusive))
+
+
+def _take_outside(tree: RedBlackTree, lo: Any, hi: Any) -> tuple:
+    """
+    Remove and return the pairs with keys below lo or at or above hi,
+    along with the new size of the tree.
+    """
+    pairs = []
+    if lo is not None:
+        pairs += _irange(tree, None, lo, (True, False), False)
+    if hi is not None:
+        pairs += _irange(tree, hi, None, (True, True), False)
+    if pairs:
+        tree.delete_many([key for key, _ in pairs])
+    return pairs, tree.size
+
+
+_COMMANDS = {func.__name__: func for func in [
+    _insert, _setitem, _delete, _search, _getitem, _select, _insert_many,
+    _delete_many, _irange, _count_range, _map_range, _take_outside]}
+
+
+def _serve(conn: Any) -> None:
+    """
+    Worker loop: run each (command, args) received on conn against the
+    shard's tree and send back (True, result), or (False, exception) if
+    the command raised. None shuts the worker down.
+    """
+    tree = RedBlackTree()
+    while True:
+        message = conn.recv()
+        if message is None:
+            conn.close()
+            return
+        name, args = message
+        try:
+            reply = (True, _COMMANDS[name](tree, *args))
+        except Exception as e:
+            reply = (False, e)
+        conn.send(reply)
+
+
+T = TypeVar('T', bound='ShardedRedBlackTree')
+
+
+class ShardedRedBlackTree():
+    # A shard holding more than rebalance_factor times the average number
+    # of keys per shard (and at least rebalance_min keys) triggers a
+    # rebalance after the write that made it grow.
+    rebalance_factor = 2
+    rebalance_min = 1024
+
+    def __init__(self: T, shards: int = None, boundaries: Iterable = None,
+                 context: str = None) -> None:
+        """
+        Start one worker per shard. Either give the number of shards,
+        in which case the boundaries are picked from the first batch
+        passed to insert_many or by the first rebalance, or give the
+        boundaries themselves. context names the multiprocessing start
+        method (e.g. "spawn"); the platform default is used if None.
+        """
+        if boundaries is not None:
+            boundaries = sorted(boundaries)
+            if shards is None:
+                shards = len(boundaries) + 1
+            if len(boundaries) != shards - 1:
+                raise Exception("Need one boundary fewer than shards")
+        if shards is None:
+            shards = multiprocessing.cpu_count()
+        if shards < 1:
+            raise Exception("Need at least one shard")
+
+        ctx = multiprocessing.get_context(context)
+        self._boundaries = [] if boundaries is None else boundaries
+        self._sizes = [0] * shards
+        self._conns = []
+        self._procs = []
+        for _ in range(shards):
+            conn, child = ctx.Pipe()
+            proc = ctx.Process(target=_serve, args=(child,), daemon=True)
+            proc.start()
+            child.close()
+            self._conns.append(conn)
+            self._procs.append(proc)
+
+    def close(self: T) -> None:
+        """
+        Shut down the workers. The tree's contents are lost.
+        """
+        for conn in self._conns:
+            conn.send(None)
+            conn.close()
+        for proc in self._procs:
+            proc.join()
+        self._conns = []
+        self._procs = []
+
+    def __enter__(self: T) -> T:
+        return self
+
+    def __exit__(self: T, *exc_info: Any) -> None:
+        self.close()
+
+    # Messaging #
+    def _call(self: T, shard: int, name: str, *args: Any) -> Any:
+        return self._call_many([shard], name, [args])[0]
+
+    def _call_many(self: T, shards: List[int], name: str,
+                   args: List[tuple]) -> list:
+        """
+        Send a command to every shard in shards (with the matching
+        arguments from args) before waiting on any reply, so the shards
+        run it in parallel. Returns the results in the same order.
+        """
+        for shard, shard_args in zip(shards, args):
+            self._conns[shard].send((name, shard_args))
+        results = []
+        error = None
+        for shard in shards:
+            ok, result = self._conns[shard].recv()
+            if not ok and error is None:
+                error = result
+            results.append(result)
+        if error is not None:
+            raise error
+        return results
+
+    # Routing #
+    def shard_of(self: T, key: Any) -> int:
+        """
+        Return the index of the shard that owns key.
+        """
+        return bisect_right(self._boundaries, key)
+
+    def _shard_range(self: T, lo: Any, hi: Any) -> range:
+        first = 0 if lo is None else self.shard_of(lo)
+        last = len(self._sizes) - 1 if hi is None else self.shard_of(hi)
+        return range(first, last + 1)
+
+    def _split(self: T, pairs: Iterable) -> List[list]:
+        """
+        Partition (key, value) pairs by the shard that owns each key.
+        """
+        parts = [[] for _ in self._sizes]
+        boundaries = self._boundaries
+        for pair in pairs:
+            parts[bisect_right(boundaries, pair[0])].append(pair)
+        return parts
+
+    # Getters #
+    @property
+    def boundaries(self: T) -> list:
+        return list(self._boundaries)
+
+    def shard_sizes(self: T) -> list:
+        return list(self._sizes)
+
+    def __len__(self: T) -> int:
+        return sum(self._sizes)
+
+    def __contains__(self: T, key: Any) -> bool:
+        return self.search(key) is not None
+
+    def __getitem__(self: T, key: Any) -> Any:
+        return self._call(self.shard_of(key), "_getitem", key)
+
+    def get(self: T, key: Any, default: Any = None) -> Any:
+        pair = self.search(key)
+        return default if pair is None else pair[1]
+
+    def search(self: T, key: Any) -> tuple:
+        """
+        Return the (key, value) pair of a node with the given key, or
+        None if there is none.
+        """
+        return self._call(self.shard_of(key), "_search", key)
+
+    def select(self: T, i: int) -> tuple:
+        """
+        Return the (key, value) pair with the i-th smallest key.
+        """
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("tree index out of range")
+        for shard, size in enumerate(self._sizes):
+            if i < size:
+                return self._call(shard, "_select", i)
+            i -= size
+
+    # Range queries #
+    def irange(self: T, lo: Any = None, hi: Any = None,
+               inclusive: tuple = (True, True),
+               reverse: bool = False) -> list:
+        """
+        Return the (key, value) pairs with keys between lo and hi, like
+        RedBlackTree.irange. Every shard overlapping the range scans its
+        part in parallel; as the shards cover consecutive key ranges,
+        their sorted results only need concatenating.
+        """
+        shards = list(self._shard_range(lo, hi))
+        if reverse:
+            shards.reverse()
+        parts = self._call_many(shards, "_irange",
+                                [(lo, hi, inclusive, reverse)] * len(shards))
+        return [pair for part in parts for pair in part]
+
+    def items(self: T) -> list:
+        return self.irange()
+
+    def count_range(self: T, lo: Any = None, hi: Any = None,
+                    inclusive: tuple = (True, True)) -> int:
+        shards = list(self._shard_range(lo, hi))
+        return sum(self._call_many(shards, "_count_range",
+                                   [(lo, hi, inclusive)] * len(shards)))
+
+    def map_range(self: T, func: Callable, lo: Any = None, hi: Any = None,
+                  inclusive: tuple = (True, True)) -> list:
+        """
+        Call func in every shard overlapping the range, passing it an
+        iterator over that shard's (key, value) pairs in the range, and
+        return the results in key order. func must be picklable (e.g. a
+        module-level function). For example, to add up the values:
+
+            sum(stree.map_range(sum_values, lo, hi))
+        """
+        shards = list(self._shard_range(lo, hi))
+        return self._call_many(shards, "_map_range",
+                               [(func, lo, hi, inclusive)] * len(shards))
+
+    # Updates #
+    def insert(self: T, key: Any, value: Any = None) -> None:
+        shard = self.shard_of(key)
+        self._sizes[shard] = self._call(shard, "_insert", key, value)
+        self._maybe_rebalance()
+
+    def __setitem__(self: T, key: Any, value: Any) -> None:
+        shard = self.shard_of(key)
+        self._sizes[shard] = self._call(shard, "_setitem", key, value)
+        self._maybe_rebalance()
+
+    def delete(self: T, key: Any) -> bool:
+        """
+        Delete a node with the given key. Returns whether there was one.
+        """
+        shard = self.shard_of(key)
+        found = self._call(shard, "_delete", key)
+        if found:
+            self._sizes[shard] -= 1
+        return found
+
+    def __delitem__(self: T, key: Any) -> None:
+        if not self.delete(key):
+            raise KeyError(key)
+
+    def insert_many(self: T, iterable: Iterable, items: bool = False) -> None:
+        """
+        Insert every key (or (key, value) pair if items is True). The
+        batch is split by shard and all shards insert their part in
+        parallel. A batch loaded into an empty tree without boundaries
+        picks the boundaries that split it evenly.
+        """
+        if items:
+            pairs = list(iterable)
+        else:
+            pairs = [(key, None) for key in iterable]
+        if not pairs:
+            return
+        if not self._boundaries and not len(self) and len(self._sizes) > 1:
+            keys = sorted(key for key, _ in pairs)
+            self._boundaries = self._quantiles(len(keys),
+                                               keys.__getitem__)
+        self._apply_parts(self._split(pairs))
+        self._maybe_rebalance()
+
+    def delete_many(self: T, iterable: Iterable) -> None:
+        """
+        Delete one node for every key in iterable, in parallel.
+        """
+        parts = [[] for _ in self._sizes]
+        boundaries = self._boundaries
+        for key in iterable:
+            parts[bisect_right(boundaries, key)].append(key)
+        shards = [i for i, part in enumerate(parts) if part]
+        sizes = self._call_many(shards, "_delete_many",
+                                [(parts[i],) for i in shards])
+        for shard, size in zip(shards, sizes):
+            self._sizes[shard] = size
+
+    def _apply_parts(self: T, parts: List[list]) -> None:
+        shards = [i for i, part in enumerate(parts) if part]
+        sizes = self._call_many(shards, "_insert_many",
+                                [(parts[i],) for i in shards])
+        for shard, size in zip(shards, sizes):
+            self._sizes[shard] = size
+
+    # Rebalancing #
+    def _quantiles(self: T, total: int, key_at: Callable) -> list:
+        """
+        Boundaries splitting total keys evenly across the shards, where
+        key_at(i) returns the i-th smallest key.
+        """
+        shards = len(self._sizes)
+        return [key_at(total * i // shards) for i in range(1, shards)]
+
+    def _maybe_rebalance(self: T) -> None:
+        largest = max(self._sizes)
+        if largest >= self.rebalance_min and largest > \
+                self.rebalance_factor * len(self) / len(self._sizes):
+            self.rebalance()
+
+    def rebalance(self: T) -> None:
+        """
+        Move the boundaries so the shards hold about the same number of
+        keys, then move every key outside its shard's new range to the
+        shard that now owns it. Keys equal to a boundary always stay
+        together, so heavily repeated keys can leave shards uneven.
+        """
+        if len(self._sizes) < 2 or not len(self):
+            return
+        self._boundaries = self._quantiles(
+            len(self), lambda i: self.select(i)[0])
+        shards = list(range(len(self._sizes)))
+        bounds = [None] + self._boundaries + [None]
+        results = self._call_many(shards, "_take_outside",
+                                  [(bounds[i], bounds[i + 1])
+                                   for i in shards])
+        moved = []
+        for shard, (pairs, size) in enumerate(results):
+            self._sizes[shard] = size
+            moved += pairs
+        self._apply_parts(self._split(moved))
@@ -0,0 +1,61 @@
+import json
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..",
+                                "benchmarks"))
+
+from harness import compare, main  # noqa: E402
+
+SMALL_TRACE = os.path.join(os.path.dirname(__file__), "small_input.txt")
+
+
+def result(ops_per_sec: float, memory: int) -> dict:
+    return {"insert": {"ops": 100, "ops_per_sec": ops_per_sec,
+                       "p50_ns": 500, "p99_ns": 900},
+            "peak_memory_bytes": memory}
+
+
+def test_compare_flags_regressions() -> None:
+    baseline = {"random": result(1000, 4096)}
+    assert compare({"random": result(800, 4096)}, baseline, 0.25) == []
+    assert compare({"random": result(1000, 5000)}, baseline, 0.25) == []
+    assert compare({"random": result(700, 4096)}, baseline, 0.25) == [
+        "random/insert: 700 ops/s, baseline 1000"]
+    assert compare({"random": result(1000, 8192)}, baseline, 0.25) == [
+        "random: peak memory 8192 bytes, baseline 4096"]
+    # Workloads and kinds missing from the baseline are not compared
+    assert compare({"zipf": result(1, 8192)}, baseline, 0.25) == []
+    assert compare({"random": dict(result(1000, 4096), search={
+        "ops": 1, "ops_per_sec": 1, "p50_ns": 1, "p99_ns": 1})},
+        baseline, 0.25) == []
+
+
+def test_main_exit_status() -> None:
+    args = ["--trace", SMALL_TRACE, "--workload", "random", "-n", "200"]
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "baseline.json")
+        assert main(args + ["--save", path]) == 0
+        with open(path) as infile:
+            results = json.load(infile)
+        assert set(results) == {"trace:small_input.txt", "random"}
+
+        # A baseline no run can keep up with is a regression
+        for workload in results.values():
+            for kind, stats in workload.items():
+                if kind != "peak_memory_bytes":
+                    stats["ops_per_sec"] *= 1000
+        with open(path, "w") as outfile:
+            json.dump(results, outfile)
+        assert main(args + ["--compare", path]) == 1
+
+        # ...and one every run beats is not
+        for workload in results.values():
+            workload["peak_memory_bytes"] *= 1000
+            for kind, stats in workload.items():
+                if kind != "peak_memory_bytes":
+                    stats["ops_per_sec"] /= 10 ** 6
+        with open(path, "w") as outfile:
+            json.dump(results, outfile)
+        assert main(args + ["--compare", path]) == 0
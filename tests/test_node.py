@@ -1,3 +1,4 @@
+import sys
 import pytest
 from rbtree import Node
 from typing import Any
@@ -66,3 +67,26 @@ def test_null_node() -> None:
     null = Node.null()
     assert null.is_null()
     assert null.is_black()
+
+
+def test_deep_depth() -> None:
+    """
+    Depth is computed without recursion, so it works on chains deeper
+    than the interpreter's recursion limit.
+    """
+    node = Node(0)
+    for i in range(sys.getrecursionlimit() + 10):
+        child = Node(i)
+        child.parent = node
+        node = child
+    assert node.depth() == sys.getrecursionlimit() + 10
+
+
+def test_slots() -> None:
+    """
+    Nodes use __slots__ to keep them small, so they have no __dict__.
+    """
+    node = Node(0)
+    assert not hasattr(node, "__dict__")
+    with pytest.raises(AttributeError):
+        node.spam = 1
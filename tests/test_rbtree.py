@@ -1,5 +1,8 @@
+import random
+from bisect import insort
 import pytest
-from rbtree import RedBlackTree, Node
+from rbtree import MappedTree, RedBlackTree, Node
+from typing import Any
 
 
 def check_node_valid(bst: RedBlackTree, node: Node) -> None:
@@ -11,10 +14,14 @@ def check_node_valid(bst: RedBlackTree, node: Node) -> None:
         assert node.left.is_black()
         assert node.right.is_black()
 
+    assert node._size == node.left._size + node.right._size + 1
+
+    # Compare the keys the tree orders by, which differ from get_key()
+    # when the tree has a key function
     if not node.left.is_null() and node.left is not None:
-        assert node.get_key() >= node.left.get_key()
+        assert node._key >= node.left._key
     if not node.right.is_null() and node.right is not None:
-        assert node.get_key() <= node.right.get_key()
+        assert node._key <= node.right._key
 
 
 def check_valid_recur(bst: RedBlackTree, node: Node) -> int:
@@ -164,6 +171,75 @@ def test_dictionary() -> None:
     assert bst[67] == 3
 
 
+def test_mapping_upsert() -> None:
+    bst = RedBlackTree()
+    bst[5] = "a"
+    bst[3] = "b"
+    bst[5] = "c"
+    assert bst.size == len(bst) == 2
+    assert bst[5] == "c"
+    assert bst[3] == "b"
+    for key in range(100):
+        bst[key] = key * 2
+    assert len(bst) == 100
+    assert bst[5] == 10
+    check_valid(bst)
+
+
+def test_mapping_missing_keys() -> None:
+    bst = RedBlackTree()
+    bst[1] = "one"
+    with pytest.raises(KeyError):
+        bst[2]
+    with pytest.raises(KeyError):
+        del bst[2]
+    with pytest.raises(KeyError):
+        bst.pop(2)
+    assert bst.get(2) is None
+    assert bst.get(2, "spam") == "spam"
+    assert bst.pop(2, "spam") == "spam"
+    # Missing keys no longer share the sentinel's value
+    assert bst.TNULL.value is None
+
+
+def test_mapping_methods() -> None:
+    bst = RedBlackTree()
+    bst.insert(4, "four")
+    assert 4 in bst
+    assert 5 not in bst
+    assert bst.setdefault(4, "spam") == "four"
+    assert bst.setdefault(5, "five") == "five"
+    assert bst.setdefault(6) is None
+    assert len(bst) == 3
+    assert bst.pop(6) is None
+    del bst[5]
+    assert 5 not in bst
+    assert len(bst) == 1
+    check_valid(bst)
+
+
+def test_mapping_views() -> None:
+    bst = RedBlackTree()
+    for key in [3, 1, 2]:
+        bst[key] = str(key)
+    keys = bst.keys()
+    assert list(keys) == [1, 2, 3]
+    assert list(reversed(keys)) == [3, 2, 1]
+    assert list(bst.values()) == ["1", "2", "3"]
+    assert list(bst.items()) == [(1, "1"), (2, "2"), (3, "3")]
+    assert list(reversed(bst.items())) == [(3, "3"), (2, "2"), (1, "1")]
+    assert len(keys) == len(bst.values()) == len(bst.items()) == 3
+    assert 2 in keys
+    assert "2" in bst.values()
+    assert (2, "2") in bst.items()
+    assert (2, "3") not in bst.items()
+    assert keys & {2, 3, 4} == {2, 3}
+
+    # Views are live
+    bst[0] = "0"
+    assert list(keys) == [0, 1, 2, 3]
+
+
 def test_get_root() -> None:
     bst = RedBlackTree()
     assert bst.get_root().is_null()
@@ -355,3 +431,637 @@ def test_duplicates() -> None:
     bst.delete(42)
     bst.delete(42)
     check_valid(bst)
+
+
+def test_lazy_traversals() -> None:
+    bst = RedBlackTree()
+    keys = [50, 20, 80, 10, 30, 70, 90, 25, 35, 5, 95, 60]
+    for key in keys:
+        bst.insert(key)
+
+    assert [n.get_key() for n in bst.iter_preorder()] == \
+        [n.get_key() for n in bst.preorder()]
+    assert [n.get_key() for n in bst.iter_inorder()] == sorted(keys)
+    assert [n.get_key() for n in bst.iter_postorder()] == \
+        [n.get_key() for n in bst.postorder()]
+
+    # Subtree traversals start from the given node
+    sub = bst.get_root().left
+    assert [n.get_key() for n in bst.iter_inorder(sub)] == \
+        [k for k in sorted(keys) if k < bst.get_root().get_key()]
+
+    # Iteration is lazy, so stopping early is fine
+    bst.set_iteration_style("in")
+    it = iter(bst)
+    assert next(it).get_key() == 5
+    assert next(it).get_key() == 10
+
+
+def test_traversals_empty() -> None:
+    bst = RedBlackTree()
+    assert list(bst.iter_preorder()) == []
+    assert list(bst.iter_inorder()) == []
+    assert list(bst.iter_postorder()) == []
+    assert bst.inorder() == []
+
+
+def test_from_sorted() -> None:
+    for n in range(70):
+        bst = RedBlackTree.from_sorted(range(n))
+        assert bst.size == n
+        assert [node.get_key() for node in bst.inorder()] == list(range(n))
+        check_valid(bst)
+
+    bst = RedBlackTree.from_sorted([1, 1, 2, 3, 3, 3, 4])
+    check_valid(bst)
+    bst.insert(3)
+    bst.delete(1)
+    bst.delete(3)
+    assert [node.get_key() for node in bst.inorder()] == [1, 2, 3, 3, 3, 4]
+    check_valid(bst)
+
+
+def test_from_sorted_items() -> None:
+    bst = RedBlackTree.from_sorted([(1, "a"), (2, "b"), (3, "c")], items=True)
+    assert bst[2] == "b"
+    assert bst.size == 3
+    check_valid(bst)
+
+
+def test_from_sorted_unsorted_input() -> None:
+    bst = RedBlackTree.from_sorted([5, 3, 9, 1, 7])
+    assert [node.get_key() for node in bst.inorder()] == [1, 3, 5, 7, 9]
+    check_valid(bst)
+
+    bst = RedBlackTree.from_sorted([(5, "e"), (1, "a"), (3, "c")],
+                                   items=True)
+    assert [node.value for node in bst.inorder()] == ["a", "c", "e"]
+    check_valid(bst)
+
+
+@pytest.mark.parametrize("batch_size", [3, 100])
+def test_insert_many(batch_size: int) -> None:
+    bst = RedBlackTree.from_sorted(range(0, 40, 2))
+    batch = list(range(batch_size, 0, -1))
+    bst.insert_many(batch)
+    assert bst.size == 20 + batch_size
+    assert [node.get_key() for node in bst.inorder()] == \
+        sorted(list(range(0, 40, 2)) + batch)
+    check_valid(bst)
+
+
+@pytest.mark.parametrize("batch_size", [2, 50])
+def test_insert_many_items(batch_size: int) -> None:
+    bst = RedBlackTree.from_sorted(range(20))
+    bst.insert_many([(100 + i, str(i)) for i in range(batch_size)],
+                    items=True)
+    assert bst.size == 20 + batch_size
+    assert bst[101] == "1"
+    check_valid(bst)
+
+
+@pytest.mark.parametrize("batch", [[4, 4, 99], [4, 4, 99] + list(range(10))])
+def test_delete_many(batch: list) -> None:
+    keys = list(range(40)) + [4, 4, 4]
+    bst = RedBlackTree.from_sorted(keys)
+    bst.delete_many(batch)
+    for key in batch:
+        if key in keys:
+            keys.remove(key)
+    assert bst.size == len(keys)
+    assert [node.get_key() for node in bst.inorder()] == sorted(keys)
+    check_valid(bst)
+
+
+def test_batches_on_empty_tree() -> None:
+    bst = RedBlackTree()
+    bst.delete_many([1, 2, 3])
+    assert bst.size == 0
+    bst.insert_many([3, 1, 2])
+    assert [node.get_key() for node in bst.inorder()] == [1, 2, 3]
+    check_valid(bst)
+
+
+def test_select() -> None:
+    bst = RedBlackTree()
+    keys = [55, 40, 58, 42, 42, 43, -10, 10, 100]
+    for key in keys:
+        bst.insert(key)
+    keys.sort()
+    for i, key in enumerate(keys):
+        assert bst.select(i).get_key() == key
+    assert bst.select(-1).get_key() == 100
+    with pytest.raises(IndexError):
+        bst.select(len(keys))
+    with pytest.raises(IndexError):
+        RedBlackTree().select(0)
+
+
+def test_rank_and_count_range() -> None:
+    bst = RedBlackTree.from_sorted([1, 3, 3, 3, 5, 7, 9])
+    assert bst.rank(0) == 0
+    assert bst.rank(3) == 1
+    assert bst.rank(4) == 4
+    assert bst.rank(10) == 7
+    assert bst.count_range(3, 7) == 5
+    assert bst.count_range(3, 7, inclusive=(False, True)) == 2
+    assert bst.count_range(3, 7, inclusive=(True, False)) == 4
+    assert bst.count_range(3, 7, inclusive=(False, False)) == 1
+    assert bst.count_range(8, 2) == 0
+    assert RedBlackTree().rank(5) == 0
+
+
+def test_order_statistics_after_updates() -> None:
+    bst = RedBlackTree()
+    with open("tests/small_input.txt") as infile:
+        for line in infile:
+            sline = line.split()
+            if sline[0] == "a":
+                bst.insert(int(sline[1]))
+            else:
+                bst.delete(int(sline[1]))
+    bst.insert_many(range(100))
+    bst.delete_many(range(0, 100, 3))
+    check_valid(bst)
+    keys = [node.get_key() for node in bst.inorder()]
+    assert bst.get_root()._size == bst.size == len(keys)
+    for i, key in enumerate(keys):
+        assert bst.select(i).get_key() == key
+        assert bst.rank(key) == keys.index(key)
+
+
+def test_successor_predecessor_ends() -> None:
+    bst = RedBlackTree.from_sorted([1, 2, 3])
+    assert bst.successor(bst.maximum()).is_null()
+    assert bst.predecessor(bst.minimum()).is_null()
+
+
+def test_floor_ceiling() -> None:
+    bst = RedBlackTree.from_sorted([10, 20, 20, 30])
+    assert bst.floor(5).is_null()
+    assert bst.floor(10).get_key() == 10
+    assert bst.floor(25).get_key() == 20
+    assert bst.floor(99).get_key() == 30
+    assert bst.ceiling(5).get_key() == 10
+    assert bst.ceiling(20).get_key() == 20
+    assert bst.ceiling(21).get_key() == 30
+    assert bst.ceiling(31).is_null()
+    assert bst.lower_bound(20) is bst.select(1)
+    assert bst.upper_bound(20) is bst.select(3)
+    assert bst.floor(20) is bst.select(2)
+    assert bst.upper_bound(30).is_null()
+    assert RedBlackTree().floor(1).is_null()
+    assert RedBlackTree().ceiling(1).is_null()
+
+
+def test_irange() -> None:
+    keys = [1, 3, 3, 5, 7, 9, 11]
+    bst = RedBlackTree.from_sorted(keys)
+
+    def irange_keys(*args: int, **kwargs: bool) -> list:
+        return [node.get_key() for node in bst.irange(*args, **kwargs)]
+
+    assert irange_keys() == keys
+    assert irange_keys(3, 9) == [3, 3, 5, 7, 9]
+    assert irange_keys(3, 9, inclusive=(False, False)) == [5, 7]
+    assert irange_keys(2, 8) == [3, 3, 5, 7]
+    assert irange_keys(hi=5, inclusive=(True, False)) == [1, 3, 3]
+    assert irange_keys(lo=9) == [9, 11]
+    assert irange_keys(3, 9, reverse=True) == [9, 7, 5, 3, 3]
+    assert irange_keys(3, 9, inclusive=(False, False), reverse=True) == \
+        [7, 5]
+    assert irange_keys(reverse=True) == keys[::-1]
+    assert irange_keys(20, 30) == []
+    assert irange_keys(9, 3) == []
+    assert list(RedBlackTree().irange(reverse=True)) == []
+
+
+@pytest.mark.parametrize("keys", [
+    ["pear", "apple", "fig", "kiwi", "banana", "apple"],
+    [(2, "b"), (1, "z"), (2, "a"), (0, "q"), (1, "z")],
+    [2.5, -1.0, 3.25, 0.0],
+])
+def test_key_types(keys: list) -> None:
+    bst = RedBlackTree()
+    for key in keys:
+        bst.insert(key)
+    assert [node.get_key() for node in bst.inorder()] == sorted(keys)
+    check_valid(bst)
+    for key in keys:
+        assert bst.search(key).get_key() == key
+    bst.delete(keys[0])
+    assert bst.size == len(keys) - 1
+    check_valid(bst)
+
+
+def test_key_function() -> None:
+    calls = []
+
+    def key(k: str) -> str:
+        calls.append(k)
+        return k.lower()
+
+    bst = RedBlackTree(key=key)
+    for word in ["b", "C", "a", "D"]:
+        bst.insert(word)
+    # The key function runs once per insert, not once per comparison
+    assert len(calls) == 4
+    assert [node.get_key() for node in bst.inorder()] == ["a", "b", "C", "D"]
+    check_valid(bst)
+
+    assert bst.search("c").get_key() == "C"
+    assert bst.floor("cc").get_key() == "C"
+    assert bst.ceiling("cc").get_key() == "D"
+    assert bst.rank("C") == 2
+    assert bst.count_range("A", "c") == 3
+    assert [n.get_key() for n in bst.irange("B", "d")] == ["b", "C", "D"]
+
+    bst["d"] = 4
+    assert bst["D"] == 4
+    assert list(bst.keys()) == ["a", "b", "C", "D"]
+    assert repr(bst.search("c")) == "Key: C Value: None"
+    bst.delete("A")
+    assert "a" not in bst
+    check_valid(bst)
+
+
+def test_key_function_bulk() -> None:
+    bst = RedBlackTree.from_sorted([3, 1, 2], key=lambda k: -k)
+    assert list(bst.keys()) == [3, 2, 1]
+    check_valid(bst)
+    bst.insert_many([5, 4, 0, -1, 7])
+    assert list(bst.keys()) == [7, 5, 4, 3, 2, 1, 0, -1]
+    bst.delete_many([5, 1, 7, 0, 99])
+    assert list(bst.keys()) == [4, 3, 2, -1]
+    check_valid(bst)
+
+
+def test_stats_disabled_by_default() -> None:
+    bst = RedBlackTree()
+    bst.insert(1)
+    assert bst.stats() is None
+
+
+def test_stats() -> None:
+    bst = RedBlackTree()
+    bst.enable_stats()
+    for key in range(1, 8):
+        bst.insert(key)
+    stats = bst.stats()
+    # Ascending inserts rotate at 3, 5 and 7 (7 also recolors up the tree)
+    assert stats["rotations"] == 3
+    assert stats["insert_fixup_iterations"] > 0
+    assert stats["recolors"] > 0
+    assert sum(stats["insert_comparisons"].values()) == 7
+    assert stats["insert_comparisons"][0] == 1
+
+    bst.search(4)
+    bst.search(100)
+    stats = bst.stats()
+    assert stats["search_comparisons"] == {2: 1, 4: 1}
+
+    for key in range(1, 8):
+        bst.delete(key)
+    assert bst.stats()["delete_fixup_iterations"] > 0
+
+    bst.reset_stats()
+    assert bst.stats()["rotations"] == 0
+    bst.disable_stats()
+    assert bst.stats() is None
+
+
+def test_stats_count_finger_descents() -> None:
+    bst = RedBlackTree()
+    bst.enable_finger()
+    bst.enable_stats()
+    for key in range(1000):
+        bst.insert(key)
+    check_valid(bst)
+    # Increasing keys are placed below the rightmost node straight away
+    assert set(bst.stats()["insert_comparisons"]) <= {0, 1}
+
+    bst.reset_stats()
+    for key in range(1000):
+        assert bst.search(key).get_key() == key
+    assert bst.search(1000.5) is bst.TNULL
+    # Scanning keys in order mostly steps to a neighbour of the finger,
+    # where a descent from the root would take about log2(1000) steps
+    histogram = bst.stats()["search_comparisons"]
+    assert sum(k * v for k, v in histogram.items()) / 1001 < 4
+    rng = random.Random(3)
+    for _ in range(200):
+        key = rng.randrange(1000)
+        assert bst.search(key).get_key() == key
+
+
+def test_stats_hooks() -> None:
+    bst = RedBlackTree()
+    events = []
+
+    def hook(event: str, value: object) -> None:
+        events.append((event, value))
+
+    bst.add_stats_hook(hook)
+    bst.insert(1)
+    bst.insert(2)
+    bst.insert(3)
+    assert ("rotation", "left") in events
+    assert ("insert", 2) in events
+    assert ("insert_fixup", 1) in events
+
+    bst.remove_stats_hook(hook)
+    events.clear()
+    bst.insert(4)
+    assert events == []
+    assert bst.stats()["rotations"] == 1
+
+
+@pytest.mark.parametrize("keys", [
+    [5, -3, 2 ** 40, 7, 7],
+    [2.5, -1.0, 0.0],
+    ["pear", "apple", "fig"],
+    [(1, "b"), (0, "z"), (1, "a")],
+    [],
+])
+def test_dump_load(tmp_path: Any, keys: list) -> None:
+    bst = RedBlackTree()
+    for key in keys:
+        bst.insert(key)
+    path = str(tmp_path / "tree.rbt")
+    bst.dump(path)
+    loaded = RedBlackTree.load(path)
+    assert list(loaded.keys()) == sorted(keys)
+    assert loaded.size == len(keys)
+    check_valid(loaded)
+
+
+def test_dump_load_values(tmp_path: Any) -> None:
+    bst = RedBlackTree()
+    for key in range(100):
+        bst[key] = {"square": key * key}
+    path = str(tmp_path / "tree.rbt")
+    bst.dump(path)
+    loaded = RedBlackTree.load(path)
+    assert list(loaded.items()) == list(bst.items())
+    check_valid(loaded)
+
+    bst = RedBlackTree(key=lambda k: -k)
+    bst.insert_many([1, 2, 3])
+    bst.dump(path)
+    loaded = RedBlackTree.load(path, key=lambda k: -k)
+    assert list(loaded.keys()) == [3, 2, 1]
+
+
+def test_load_bad_file(tmp_path: Any) -> None:
+    path = tmp_path / "spam.rbt"
+    path.write_bytes(b"spam" * 10)
+    with pytest.raises(ValueError):
+        RedBlackTree.load(str(path))
+
+
+@pytest.mark.parametrize("keys", [
+    [5, -3, 2 ** 40, 7, 7, 10],
+    ["pear", "apple", "fig", "kiwi"],
+])
+def test_mapped_tree(tmp_path: Any, keys: list) -> None:
+    bst = RedBlackTree()
+    for key in keys:
+        bst.insert(key, str(key))
+    path = str(tmp_path / "tree.rbt")
+    bst.dump(path)
+
+    with MappedTree(path) as mapped:
+        assert len(mapped) == len(keys)
+        assert list(mapped.keys()) == sorted(keys)
+        assert list(mapped.values()) == [str(k) for k in sorted(keys)]
+        for key in keys:
+            assert key in mapped
+            assert mapped[key] == str(key)
+        missing = "zzz" if isinstance(keys[0], str) else 11
+        assert missing not in mapped
+        assert mapped.get(missing, "spam") == "spam"
+        with pytest.raises(KeyError):
+            mapped[missing]
+
+        lo, hi = sorted(keys)[1], sorted(keys)[-2]
+        assert [k for k, v in mapped.irange(lo, hi)] == \
+            [n.get_key() for n in bst.irange(lo, hi)]
+        assert [k for k, v in mapped.irange(lo, hi, (False, False), True)] \
+            == [n.get_key() for n in bst.irange(lo, hi, (False, False), True)]
+
+
+def test_mapped_tree_key_function(tmp_path: Any) -> None:
+    bst = RedBlackTree(key=str.lower)
+    for word in ["b", "C", "a"]:
+        bst[word] = word
+    path = str(tmp_path / "tree.rbt")
+    bst.dump(path)
+    with MappedTree(path, key=str.lower) as mapped:
+        assert list(mapped.keys()) == ["a", "b", "C"]
+        assert mapped["c"] == "C"
+        assert "B" in mapped
+
+
+def test_load_with_other_order(tmp_path: Any) -> None:
+    bst = RedBlackTree(key=lambda k: -k)
+    bst.insert_many([1, 2, 3])
+    path = str(tmp_path / "tree.rbt")
+    bst.dump(path)
+    loaded = RedBlackTree.load(path)
+    assert list(loaded.keys()) == [1, 2, 3]
+    check_valid(loaded)
+
+
+def check_links(bst: RedBlackTree) -> None:
+    # Every leaf is this tree's own sentinel and parent links match
+    check_valid(bst)
+    assert bst.root.parent is None
+    for node in bst.iter_inorder():
+        for child in (node.left, node.right):
+            assert child is bst.TNULL or child.parent is node
+            assert not child.is_null() or child is bst.TNULL
+    # The cached extremes match a walk down the tree
+    assert bst.minimum() is bst.minimum(bst.root)
+    assert bst.maximum() is bst.maximum(bst.root)
+
+
+def test_split_join() -> None:
+    keys = [5, 1, 9, 3, 3, 7, 3, 12, 0, 8]
+    for key in [-1, 0, 3, 4, 12, 13]:
+        bst = RedBlackTree()
+        for k in keys:
+            bst.insert(k, str(k))
+        lower, upper = bst.split(key)
+        assert bst.size == 0
+        assert [n.get_key() for n in lower.inorder()] == \
+            sorted(k for k in keys if k < key)
+        assert [n.get_key() for n in upper.inorder()] == \
+            sorted(k for k in keys if k >= key)
+        check_links(lower)
+        check_links(upper)
+
+        joined = lower.join(key, upper, "mid")
+        assert lower.size == upper.size == 0
+        assert [n.get_key() for n in joined.inorder()] == \
+            sorted(keys + [key])
+        assert joined.search(9).value == "9"
+        check_links(joined)
+
+
+def test_join_separate_trees() -> None:
+    left = RedBlackTree.from_sorted(range(100))
+    right = RedBlackTree.from_sorted(range(101, 105))
+    joined = left.join(100, right)
+    assert [n.get_key() for n in joined.inorder()] == list(range(105))
+    check_links(joined)
+    joined = RedBlackTree().join(0, RedBlackTree.from_sorted([1, 2]))
+    assert [n.get_key() for n in joined.inorder()] == [0, 1, 2]
+    check_links(joined)
+    with pytest.raises(Exception):
+        RedBlackTree.from_sorted([1, 5]).join(3, RedBlackTree())
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_set_operations(seed: int) -> None:
+    rng = random.Random(seed)
+    for _ in range(30):
+        a = [rng.randrange(80) for _ in range(rng.randrange(60))]
+        b = [rng.randrange(80) for _ in range(rng.randrange(60))]
+
+        def tree(keys: list, tag: str) -> RedBlackTree:
+            bst = RedBlackTree()
+            for k in keys:
+                bst.insert(k, tag)
+            return bst
+
+        union = tree(a, "a").union(tree(b, "b"))
+        assert [(n.get_key(), n.value) for n in union.inorder()] == \
+            sorted([(k, "a") for k in a] +
+                   [(k, "b") for k in b if k not in a])
+        check_links(union)
+        intersection = tree(a, "a").intersection(tree(b, "b"))
+        assert [n.get_key() for n in intersection.inorder()] == \
+            sorted(k for k in a if k in b)
+        check_links(intersection)
+        difference = tree(a, "a").difference(tree(b, "b"))
+        assert [n.get_key() for n in difference.inorder()] == \
+            sorted(k for k in a if k not in b)
+        check_links(difference)
+
+
+def test_set_operation_result_has_black_root() -> None:
+    def build(keys: list) -> RedBlackTree:
+        bst = RedBlackTree()
+        for k in keys:
+            bst.insert(k)
+        return bst
+
+    a = build([2, 8, 16, 18])
+    b = build([0, 2, 2, 4, 6, 6, 8, 9, 9, 10, 10, 11, 14, 14, 16, 16, 16])
+    result = a.difference(b)
+    assert result.root.is_black()
+    assert [n.get_key() for n in result.inorder()] == [18]
+    result.insert(20)
+    check_links(result)
+
+
+def test_set_operations_key_function() -> None:
+    a = RedBlackTree.from_sorted(["a", "B", "c"], key=str.lower)
+    b = RedBlackTree.from_sorted(["b", "C", "d"], key=str.lower)
+    union = a.union(b)
+    assert [n.get_key() for n in union.inorder()] == ["a", "B", "c", "d"]
+    lower, upper = union.split("C")
+    assert [n.get_key() for n in upper.inorder()] == ["c", "d"]
+
+
+def test_pop_min_max() -> None:
+    rng = random.Random(7)
+    bst = RedBlackTree()
+    with pytest.raises(IndexError):
+        bst.pop_min()
+    with pytest.raises(IndexError):
+        bst.pop_max()
+    keys = [rng.randrange(200) for _ in range(500)]
+    for k in keys:
+        bst.insert(k, k)
+    expected = sorted(keys)
+    while expected:
+        if rng.random() < 0.5:
+            assert bst.pop_min().get_key() == expected.pop(0)
+        else:
+            assert bst.pop_max().get_key() == expected.pop()
+        if rng.random() < 0.2:
+            k = rng.randrange(200)
+            bst.insert(k)
+            insort(expected, k)
+        if rng.random() < 0.2 and expected:
+            k = rng.choice(expected)
+            assert bst.delete(k).get_key() == k
+            expected.remove(k)
+        check_links(bst)
+    assert bst.minimum().is_null() and bst.maximum().is_null()
+
+
+def test_extremes_after_bulk_updates() -> None:
+    bst = RedBlackTree.from_sorted(range(100))
+    assert bst.minimum().get_key() == 0 and bst.maximum().get_key() == 99
+    bst.delete_many(range(50))
+    check_links(bst)
+    bst.insert_many(range(-100, -50))
+    check_links(bst)
+    assert bst.pop_min().get_key() == -100
+    lower, upper = bst.split(70)
+    check_links(lower)
+    check_links(upper)
+    assert lower.pop_max().get_key() == 69
+    assert upper.pop_min().get_key() == 70
+
+
+def test_delete_stops_at_first_match() -> None:
+    bst = RedBlackTree()
+    for i in range(20):
+        bst.insert(5, i)
+    removed = bst.delete(5)
+    assert removed.get_key() == 5
+    assert bst.size == 19
+    assert removed.value not in [n.value for n in bst.inorder()]
+    assert bst.delete(6) is bst.TNULL
+    check_links(bst)
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_finger_matches_plain_tree(seed: int) -> None:
+    rng = random.Random(seed)
+    plain = RedBlackTree()
+    bst = RedBlackTree()
+    bst.enable_finger()
+    for step in range(600):
+        op = rng.random()
+        # Drift upwards on odd seeds, like timestamps
+        k = rng.randrange(60) + (step if seed % 2 else 0)
+        if op < 0.35:
+            plain.insert(k)
+            bst.insert(k)
+        elif op < 0.45:
+            plain.setdefault(k)
+            bst.setdefault(k)
+        elif op < 0.6:
+            assert (plain.delete(k) is plain.TNULL) == \
+                (bst.delete(k) is bst.TNULL)
+        elif op < 0.65:
+            plain.delete_many([k, k + 1])
+            bst.delete_many([k, k + 1])
+        else:
+            for name in ["search", "floor", "ceiling", "lower_bound",
+                         "upper_bound"]:
+                expected = getattr(plain, name)(k)
+                found = getattr(bst, name)(k)
+                assert expected.is_null() == found.is_null()
+                assert expected.get_key() == found.get_key()
+            assert [n.get_key() for n in bst.irange(k - 5, k + 5)] == \
+                [n.get_key() for n in plain.irange(k - 5, k + 5)]
+        assert [n.get_key() for n in bst.inorder()] == \
+            [n.get_key() for n in plain.inorder()]
+    check_links(bst)
+    bst.disable_finger()
+    assert bst.search(k).get_key() == plain.search(k).get_key()
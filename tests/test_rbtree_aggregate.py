@@ -0,0 +1,111 @@
+import os
+import random
+import tempfile
+from rbtree_aggregate import AggregateRedBlackTree, Monoid
+from test_rbtree import check_valid
+
+
+def check_aggregates(bst: AggregateRedBlackTree) -> None:
+    check_valid(bst)
+    for node in bst.iter_inorder():
+        values = [n.value for n in bst.iter_inorder(node)
+                  if n.value is not None]
+        assert node._agg == (sum(values), min(values, default=None),
+                             max(values, default=None))
+
+
+def brute(bst: AggregateRedBlackTree, lo: int, hi: int,
+          inclusive: tuple) -> list:
+    return [n.value for n in bst.irange(lo, hi, inclusive)]
+
+
+def test_random_operations() -> None:
+    rng = random.Random(5)
+    bst = AggregateRedBlackTree()
+    for step in range(2000):
+        op = rng.random()
+        key = rng.randrange(200)
+        if op < 0.4:
+            bst.insert(key, rng.randrange(-50, 50))
+        elif op < 0.55:
+            bst[key] = rng.randrange(-50, 50)
+        elif op < 0.8:
+            bst.delete(key)
+        elif op < 0.85:
+            bst.insert_many([(rng.randrange(200), rng.randrange(-50, 50))
+                             for _ in range(rng.randrange(60))], items=True)
+        elif op < 0.9:
+            bst.delete_many(rng.randrange(200)
+                            for _ in range(rng.randrange(60)))
+        else:
+            lo, hi = sorted([rng.randrange(-10, 210), rng.randrange(-10, 210)])
+            for inclusive in [(True, True), (True, False), (False, True),
+                              (False, False)]:
+                values = brute(bst, lo, hi, inclusive)
+                assert bst.range_sum(lo, hi, inclusive) == sum(values)
+                assert bst.range_min(lo, hi, inclusive) == \
+                    min(values, default=None)
+                assert bst.range_max(lo, hi, inclusive) == \
+                    max(values, default=None)
+        if step % 100 == 0:
+            check_aggregates(bst)
+    check_aggregates(bst)
+
+
+def test_open_ranges_and_whole_tree() -> None:
+    bst = AggregateRedBlackTree.from_sorted([(k, k) for k in range(100)],
+                                            items=True)
+    check_aggregates(bst)
+    assert bst.aggregate("sum") == 4950
+    assert bst.aggregate("max") == 99
+    assert bst.range_sum() == 4950
+    assert bst.range_sum(None, 9) == 45
+    assert bst.range_sum(90) == sum(range(90, 100))
+    assert bst.range_min(10.5, 20) == 11
+    assert bst.range_sum(200, 300) == 0
+    assert bst.range_min(200, 300) is None
+    assert AggregateRedBlackTree().range_sum(1, 2) == 0
+
+
+def test_values_default_to_none() -> None:
+    bst = AggregateRedBlackTree()
+    for key in range(10):
+        bst.insert(key)
+    bst[3] = 7
+    assert bst.range_sum(0, 9) == 7
+    assert bst.range_max(4, 9) is None
+
+
+def test_custom_monoid_in_key_order() -> None:
+    bst = AggregateRedBlackTree(
+        key=lambda k: -k, monoids={"concat": Monoid(lambda a, b: a + b, "")})
+    for key in range(10):
+        bst.insert(key, str(key))
+    del bst[5]
+    assert bst.range_reduce("concat") == "98764321" + "0"
+    assert bst.range_reduce("concat", 8, 2) == "876432"
+    assert bst.range_reduce("concat", 8, 2, (False, False)) == "7643"
+
+    node = bst.search(4)
+    node.value = "x"
+    bst.refresh(node)
+    assert bst.range_reduce("concat", 6, 2) == "6x32"
+
+
+def test_from_sorted_and_load() -> None:
+    pairs = [(k, k * 10) for k in range(50)]
+    bst = AggregateRedBlackTree.from_sorted(pairs, items=True)
+    check_aggregates(bst)
+    assert bst.range_sum(10, 19) == sum(range(100, 200, 10))
+
+    concat = {"concat": Monoid(lambda a, b: a + b, "")}
+    bst = AggregateRedBlackTree.from_sorted(
+        [(k, str(k)) for k in range(5)], items=True, monoids=concat)
+    assert bst.aggregate("concat") == "01234"
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "tree.bin")
+        bst.dump(path)
+        loaded = AggregateRedBlackTree.load(path, monoids=concat)
+        assert loaded.range_reduce("concat", 1, 3) == "123"
+        AggregateRedBlackTree.from_sorted(pairs, items=True).dump(path)
+        assert AggregateRedBlackTree.load(path).aggregate("max") == 490
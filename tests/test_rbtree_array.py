@@ -0,0 +1,129 @@
+import pytest
+from rbtree import RedBlackTree
+from rbtree_array import ArrayRedBlackTree
+
+
+def check_valid_recur(bst: ArrayRedBlackTree, node: int) -> int:
+    if bst.is_null(node):
+        assert bst.is_black(node)
+        return 1
+
+    left = bst.left(node)
+    right = bst.right(node)
+    if bst.is_red(node):
+        assert bst.is_black(left)
+        assert bst.is_black(right)
+    if not bst.is_null(left):
+        assert bst.parent(left) == node
+        assert bst.get_key(node) >= bst.get_key(left)
+    if not bst.is_null(right):
+        assert bst.parent(right) == node
+        assert bst.get_key(node) <= bst.get_key(right)
+
+    left_count = check_valid_recur(bst, left)
+    right_count = check_valid_recur(bst, right)
+    assert left_count == right_count
+    return left_count + (1 if bst.is_black(node) else 0)
+
+
+def check_valid(bst: ArrayRedBlackTree) -> None:
+    root = bst.get_root()
+    assert bst.is_black(root)
+    check_valid_recur(bst, root)
+
+
+def keys(bst: ArrayRedBlackTree) -> list:
+    return [bst.get_key(node) for node in bst.iter_inorder()]
+
+
+def test_insert_search() -> None:
+    bst = ArrayRedBlackTree()
+    assert bst.is_null(bst.search(5))
+    for key in [55, 40, 58, 42, 42, 42, 43, 44, -10, 10, 100, 101, 102]:
+        bst.insert(key)
+        assert bst.get_key(bst.search(key)) == key
+    assert bst.size == 13
+    assert keys(bst) == sorted(keys(bst))
+    check_valid(bst)
+
+
+def test_values() -> None:
+    bst = ArrayRedBlackTree()
+    node = bst.insert(3, "three")
+    bst.insert(1, "one")
+    assert bst.get_value(bst.search(3)) == "three"
+    bst.set_value(node, "drei")
+    assert bst.get_value(bst.search(3)) == "drei"
+    assert bst.get_value(bst.search(1)) == "one"
+
+
+def test_accessors() -> None:
+    bst = ArrayRedBlackTree()
+    assert bst.is_null(bst.minimum())
+    assert bst.is_null(bst.maximum())
+
+    for key in [55, 40, 58, 42]:
+        bst.insert(key)
+
+    assert bst.get_key(bst.maximum()) == 58
+    assert bst.get_key(bst.minimum()) == 40
+    assert bst.get_key(bst.successor(bst.search(42))) == 55
+    assert bst.get_key(bst.successor(bst.search(55))) == 58
+    assert bst.is_null(bst.successor(bst.search(58)))
+    assert bst.get_key(bst.predecessor(bst.search(42))) == 40
+    assert bst.get_key(bst.predecessor(bst.search(58))) == 55
+    assert bst.is_null(bst.predecessor(bst.search(40)))
+
+
+def test_free_list_reuse() -> None:
+    bst = ArrayRedBlackTree()
+    for key in range(10):
+        bst.insert(key)
+    capacity = len(bst._values)
+    for key in range(5):
+        bst.delete(key)
+    for key in range(5):
+        bst.insert(key + 100)
+    assert len(bst._values) == capacity
+    assert keys(bst) == list(range(5, 10)) + list(range(100, 105))
+    check_valid(bst)
+
+
+def test_typed_keys() -> None:
+    bst = ArrayRedBlackTree("q")
+    for key in [5, -3, 2 ** 40, 7]:
+        bst.insert(key)
+    bst.delete(5)
+    assert keys(bst) == [-3, 7, 2 ** 40]
+    with pytest.raises(TypeError):
+        bst.insert("spam")
+
+
+def test_copy() -> None:
+    bst = ArrayRedBlackTree()
+    for key in range(20):
+        bst.insert(key)
+    snapshot = bst.copy()
+    bst.delete(3)
+    bst.insert(50)
+    assert keys(snapshot) == list(range(20))
+    assert snapshot.size == 20
+    check_valid(snapshot)
+    check_valid(bst)
+
+
+def test_matches_node_tree() -> None:
+    bst = ArrayRedBlackTree()
+    reference = RedBlackTree()
+    with open("tests/small_input.txt") as infile:
+        for line in infile:
+            sline = line.split()
+            if sline[0] == "a":
+                bst.insert(int(sline[1]))
+                reference.insert(int(sline[1]))
+            else:
+                bst.delete(int(sline[1]))
+                reference.delete(int(sline[1]))
+            check_valid(bst)
+            assert bst.size == reference.size
+    assert keys(bst) == [node.get_key() for node in reference.inorder()]
@@ -0,0 +1,112 @@
+import asyncio
+import os
+import tempfile
+from rbtree import RedBlackTree
+from rbtree_async import AsyncRedBlackTree
+from test_rbtree import check_valid
+
+
+def test_updates_and_reads() -> None:
+    async def main() -> None:
+        atree = AsyncRedBlackTree(chunk=3)
+        await atree.insert(2, "b")
+        await atree.set(1, "a")
+        await atree.insert_many([(k, str(k)) for k in range(3, 20)],
+                                items=True)
+        assert len(atree) == 19
+        assert atree[1] == "a"
+        assert 5 in atree
+        assert atree.get(50, "x") == "x"
+        assert atree.search(7).value == "7"
+        assert atree.floor(0.5) is atree._tree.TNULL
+        assert atree.ceiling(0.5).get_key() == 1
+        assert (await atree.delete(3)).get_key() == 3
+        assert await atree.pop(4) == "4"
+        await atree.delete_many(range(10, 20))
+        assert [key for key, _ in await atree.items()] == \
+            [1, 2, 5, 6, 7, 8, 9]
+        check_valid(atree._tree)
+
+    asyncio.run(main())
+
+
+def test_irange_chunks() -> None:
+    async def main() -> None:
+        tree = RedBlackTree()
+        for key in [1, 2, 2, 2, 2, 3, 4, 5, 5, 6]:
+            tree.insert(key)
+        atree = AsyncRedBlackTree(tree, chunk=2)
+        for lo, hi in [(None, None), (2, 5), (1, 6), (0, 10), (7, 9)]:
+            for inclusive in [(True, True), (False, False)]:
+                for reverse in [False, True]:
+                    expected = [n.get_key() for n in
+                                tree.irange(lo, hi, inclusive, reverse)]
+                    assert [n.get_key() async for n in
+                            atree.irange(lo, hi, inclusive, reverse)] == \
+                        expected
+        assert [n.get_key() for n in await atree.inorder()] == \
+            [1, 2, 2, 2, 2, 3, 4, 5, 5, 6]
+
+    asyncio.run(main())
+
+
+def test_irange_yields_to_loop() -> None:
+    async def main() -> None:
+        atree = AsyncRedBlackTree(RedBlackTree.from_sorted(range(100)),
+                                  chunk=10)
+        ticks = []
+
+        async def ticker() -> None:
+            while True:
+                ticks.append(len(seen))
+                await asyncio.sleep(0)
+
+        seen = []
+        task = asyncio.ensure_future(ticker())
+        await asyncio.sleep(0)
+        async for node in atree:
+            seen.append(node.get_key())
+            if node.get_key() == 25:
+                # Updates made while the scan is suspended are safe. 26-29
+                # were collected with 25's chunk, so they are still seen.
+                await atree.delete_many(range(26, 40))
+                await atree.insert(95.5)
+        task.cancel()
+        assert seen == list(range(30)) + list(range(40, 96)) + \
+            [95.5] + list(range(96, 100))
+        assert len(set(ticks)) > 5
+
+    asyncio.run(main())
+
+
+def test_writers_are_serialized() -> None:
+    async def main() -> None:
+        atree = AsyncRedBlackTree(chunk=5)
+        order = []
+
+        async def bulk() -> None:
+            await atree.insert_many(range(50))
+            order.append("bulk")
+
+        async def single() -> None:
+            await atree.insert(-1)
+            order.append(("single", len(atree)))
+
+        await asyncio.gather(bulk(), single())
+        assert order == ["bulk", ("single", 51)]
+
+    asyncio.run(main())
+
+
+def test_dump_and_load() -> None:
+    async def main(path: str) -> None:
+        atree = AsyncRedBlackTree(key=lambda k: -k)
+        await atree.insert_many(range(100))
+        await atree.dump(path)
+        loaded = await AsyncRedBlackTree.load(path, key=lambda k: -k)
+        assert [n.get_key() async for n in loaded] == \
+            list(range(99, -1, -1))
+        check_valid(loaded._tree)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(main(os.path.join(tmp, "tree.rbt")))
@@ -0,0 +1,111 @@
+import os
+import random
+import tempfile
+import pytest
+from rbtree import RedBlackTree
+from rbtree_bounded import BoundedRedBlackTree
+from test_rbtree import check_links
+
+
+def test_evict_min_keeps_largest() -> None:
+    evicted = []
+    bst = BoundedRedBlackTree(3, policy="min",
+                              on_evict=lambda n: evicted.append(n.get_key()))
+    for k in [5, 1, 9, 7, 3, 8]:
+        bst.insert(k)
+    assert [n.get_key() for n in bst.inorder()] == [7, 8, 9]
+    assert evicted == [1, 3, 5]
+    check_links(bst)
+
+
+def test_evict_max_sliding_window() -> None:
+    bst = BoundedRedBlackTree(4, policy="max")
+    bst.insert_many(range(10, 0, -1))
+    assert [n.get_key() for n in bst.inorder()] == [1, 2, 3, 4]
+    bst.insert_many(range(100))
+    assert [n.get_key() for n in bst.inorder()] == [0, 1, 1, 2]
+    check_links(bst)
+
+
+def test_lru() -> None:
+    evicted = []
+    bst = BoundedRedBlackTree(3, on_evict=lambda n: evicted.append(
+        (n.get_key(), n.value)))
+    bst["a"] = 1
+    bst["b"] = 2
+    bst["c"] = 3
+    assert bst["a"] == 1      # a is now the most recently used
+    bst["d"] = 4
+    assert evicted == [("b", 2)]
+    bst["c"] = 30             # updates count as use too
+    bst.insert("e", 5)
+    assert evicted == [("b", 2), ("a", 1)]
+    assert [n.get_key() for n in bst.lru()] == ["d", "c", "e"]
+    assert "b" not in bst     # a miss does not change anything
+    bst.delete("c")
+    assert [n.get_key() for n in bst.lru()] == ["d", "e"]
+    bst.insert_many(["f", "g"])
+    assert [n.get_key() for n in bst.lru()] == ["e", "f", "g"]
+    check_links(bst)
+
+
+def test_random_lru() -> None:
+    rng = random.Random(3)
+    bst = BoundedRedBlackTree(50)
+    recent = []
+    for _ in range(3000):
+        k = rng.randrange(120)
+        if rng.random() < 0.6:
+            bst[k] = k
+        elif rng.random() < 0.8:
+            if bst.get(k) is None:
+                continue
+        else:
+            bst.delete(k)
+            if k in recent:
+                recent.remove(k)
+            continue
+        if k in recent:
+            recent.remove(k)
+        recent.append(k)
+        del recent[:-50]
+    assert [n.get_key() for n in bst.lru()] == recent
+    assert sorted(recent) == [n.get_key() for n in bst.inorder()]
+    bst.delete_many(recent[:20])
+    assert [n.get_key() for n in bst.lru()] == recent[20:]
+    check_links(bst)
+
+
+def test_invalid() -> None:
+    with pytest.raises(Exception):
+        BoundedRedBlackTree(0)
+    with pytest.raises(Exception):
+        BoundedRedBlackTree(5, policy="fifo")
+    with pytest.raises(Exception):
+        BoundedRedBlackTree(5).split(3)
+
+
+def test_from_sorted_and_load() -> None:
+    evicted = []
+    bst = BoundedRedBlackTree.from_sorted(
+        range(10), 4, policy="min",
+        on_evict=lambda n: evicted.append(n.get_key()))
+    assert [n.get_key() for n in bst.inorder()] == [6, 7, 8, 9]
+    assert sorted(evicted) == list(range(6))
+
+    bst = BoundedRedBlackTree.from_sorted([(k, str(k)) for k in range(5)], 3,
+                                          items=True)
+    assert [n.get_key() for n in bst.lru()] == [2, 3, 4]
+    assert bst[3] == "3"
+    check_links(bst)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "tree.bin")
+        RedBlackTree.from_sorted([(k, -k) for k in range(20)],
+                                 items=True).dump(path)
+        bst = BoundedRedBlackTree.load(path, 5, policy="max")
+        assert [(n.get_key(), n.value) for n in bst.inorder()] == \
+            [(k, -k) for k in range(5)]
+        bst = BoundedRedBlackTree.load(path, 5)
+        assert [n.get_key() for n in bst.lru()] == list(range(15, 20))
+        check_links(bst)
@@ -0,0 +1,150 @@
+import threading
+import pytest
+from typing import Any
+from rbtree import RedBlackTree
+from rbtree_bounded import BoundedRedBlackTree
+from rbtree_concurrent import ConcurrentRedBlackTree, RWLock
+from test_rbtree import check_valid
+
+
+def test_rwlock_shared_readers() -> None:
+    lock = RWLock()
+    lock.acquire_read()
+    lock.acquire_read()
+    acquired = threading.Event()
+
+    def writer() -> None:
+        with lock.write_locked():
+            acquired.set()
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    assert not acquired.wait(0.05)
+    lock.release_read()
+    assert not acquired.wait(0.05)
+    lock.release_read()
+    assert acquired.wait(5)
+    thread.join()
+
+
+def test_rwlock_writer_blocks_readers() -> None:
+    lock = RWLock()
+    lock.acquire_write()
+    acquired = threading.Event()
+
+    def reader() -> None:
+        with lock.read_locked():
+            acquired.set()
+
+    thread = threading.Thread(target=reader)
+    thread.start()
+    assert not acquired.wait(0.05)
+    lock.release_write()
+    assert acquired.wait(5)
+    thread.join()
+
+
+def test_mapping_and_queries() -> None:
+    ctree = ConcurrentRedBlackTree()
+    ctree[3] = "c"
+    ctree.insert(1, "a")
+    ctree.insert_many([(2, "b"), (4, "d")], items=True)
+    assert len(ctree) == 4
+    assert ctree[3] == "c"
+    assert 2 in ctree
+    assert ctree.get(9) is None
+    assert ctree.search(4).value == "d"
+    assert ctree.minimum().get_key() == 1
+    assert ctree.maximum().get_key() == 4
+    assert ctree.floor(2.5).get_key() == 2
+    assert ctree.ceiling(2.5).get_key() == 3
+    assert ctree.select(1).get_key() == 2
+    assert ctree.rank(3) == 2
+    assert ctree.count_range(2, 3) == 2
+    assert [n.get_key() for n in ctree.irange(2, 4, reverse=True)] == \
+        [4, 3, 2]
+    assert ctree.items() == [(1, "a"), (2, "b"), (3, "c"), (4, "d")]
+    assert ctree.pop(1) == "a"
+    assert ctree.setdefault(5, "e") == "e"
+    assert ctree.pop_max().get_key() == 5
+    ctree[5] = "e"
+    del ctree[5]
+    ctree.delete(2)
+    ctree.delete_many([4])
+    assert ctree.items() == [(3, "c")]
+    with pytest.raises(KeyError):
+        ctree[42]
+
+
+def test_batch_and_snapshot() -> None:
+    ctree = ConcurrentRedBlackTree(RedBlackTree.from_sorted(range(10)))
+    snapshot = ctree.snapshot()
+    with ctree.batch() as bst:
+        for key in range(10, 20):
+            bst.insert(key)
+        bst.delete(0)
+    assert list(snapshot.keys()) == list(range(10))
+    with ctree.reader() as bst:
+        assert [n.get_key() for n in bst.inorder()] == list(range(1, 20))
+        check_valid(bst)
+
+
+def test_concurrent_readers_and_writers() -> None:
+    ctree = ConcurrentRedBlackTree()
+    errors = []
+
+    def writer(offset: int) -> None:
+        for key in range(offset, 2000, 4):
+            ctree.insert(key)
+            if key % 3 == 0:
+                ctree.delete(key)
+
+    def reader() -> None:
+        try:
+            for key in range(2000):
+                ctree.search(key)
+                ctree.irange(key, key + 10)
+        except Exception as e:  # pragma: no cover
+            errors.append(e)
+
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(4)]
+    threads += [threading.Thread(target=reader) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    with ctree.reader() as bst:
+        assert [n.get_key() for n in bst.inorder()] == \
+            [key for key in range(2000) if key % 3]
+        check_valid(bst)
+
+
+@pytest.mark.parametrize("make_tree", [
+    lambda: RedBlackTree(),
+    lambda: BoundedRedBlackTree(100),
+])
+def test_reads_that_update_the_tree_are_exclusive(make_tree: Any) -> None:
+    bst = make_tree()
+    if not isinstance(bst, BoundedRedBlackTree):
+        bst.enable_finger()
+    ctree = ConcurrentRedBlackTree(bst)
+    ctree.insert_many(range(10))
+    done = threading.Event()
+
+    def read() -> None:
+        ctree.search(3)
+        done.set()
+
+    with ctree.reader():
+        thread = threading.Thread(target=read)
+        thread.start()
+        assert not done.wait(0.05)
+    assert done.wait(5)
+    thread.join()
+
+    # Plain trees still share the lock between readers
+    ctree = ConcurrentRedBlackTree()
+    with ctree.reader():
+        assert ctree.search(3).is_null()
@@ -0,0 +1,58 @@
+import random
+import pytest
+from rbtree_interval import IntervalRedBlackTree
+from test_rbtree import check_valid
+
+
+def check_max_end(bst: IntervalRedBlackTree) -> None:
+    check_valid(bst)
+    for node in bst.iter_inorder():
+        assert node._max_end == max(n.get_key()[1]
+                                    for n in bst.iter_inorder(node))
+
+
+def test_random_overlaps() -> None:
+    rng = random.Random(11)
+    bst = IntervalRedBlackTree()
+    intervals = []
+    for step in range(3000):
+        if rng.random() < 0.65 or not intervals:
+            start = rng.randrange(1000)
+            interval = (start, start + rng.randrange(60))
+            bst.insert(interval, step)
+            intervals.append(interval)
+        else:
+            interval = intervals.pop(rng.randrange(len(intervals)))
+            assert bst.delete(interval) is not bst.TNULL
+        lo = rng.randrange(-10, 1010)
+        hi = lo + rng.choice([0, 0, 5, 100])
+        expected = sorted(i for i in intervals if i[0] <= hi and lo <= i[1])
+        found = [n.get_key() for n in bst.overlaps(lo, hi)]
+        assert found == expected
+        node = bst.find_overlap(lo, hi)
+        if expected:
+            assert node.get_key() in expected
+        else:
+            assert node is bst.TNULL
+        if step % 300 == 0:
+            check_max_end(bst)
+    check_max_end(bst)
+    assert bst.max_end() == max(i[1] for i in intervals)
+
+
+def test_points_and_batches() -> None:
+    bst = IntervalRedBlackTree.from_sorted([(0, 10), (2, 3), (5, 5), (8, 20)])
+    check_max_end(bst)
+    assert [n.get_key() for n in bst.overlaps(5)] == [(0, 10), (5, 5)]
+    assert [n.get_key() for n in bst.overlaps(11, 30)] == [(8, 20)]
+    assert list(bst.overlaps(21)) == []
+    bst.insert_many([(i, i + 1) for i in range(0, 40, 2)])
+    bst.delete_many([(0, 10), (8, 20)])
+    check_max_end(bst)
+    assert [n.get_key() for n in bst.overlaps(5)] == [(4, 5), (5, 5)]
+    bst[(30, 50)] = "lease"
+    assert bst.max_end() == 50
+    assert bst.find_overlap(45).value == "lease"
+    assert IntervalRedBlackTree().max_end() is None
+    with pytest.raises(Exception):
+        IntervalRedBlackTree(key=abs)
@@ -0,0 +1,58 @@
+import random
+from rbtree import RedBlackTree
+from rbtree_merge import merge, zip_matching
+
+
+def make_trees(rng: random.Random, count: int) -> tuple:
+    trees = []
+    keys = []
+    for t in range(count):
+        bst = RedBlackTree()
+        tree_keys = [rng.randrange(100) for _ in range(rng.randrange(80))]
+        for k in tree_keys:
+            bst.insert(k, t)
+        trees.append(bst)
+        keys.append(tree_keys)
+    return trees, keys
+
+
+def test_merge() -> None:
+    rng = random.Random(5)
+    for _ in range(30):
+        trees, keys = make_trees(rng, rng.randrange(1, 5))
+        everything = sorted(k for tree_keys in keys for k in tree_keys)
+        merged = list(merge(*trees))
+        assert [n.get_key() for n in merged] == everything
+        # Equal keys keep the order of the trees
+        assert [(n.get_key(), n.value) for n in merged] == \
+            sorted((n.get_key(), n.value) for n in merged)
+        assert [n.get_key() for n in merge(*trees, dedup=True)] == \
+            sorted(set(everything))
+        assert [n.get_key() for n in merge(*trees, lo=20, hi=60,
+                                           inclusive=(False, True),
+                                           reverse=True)] == \
+            [k for k in reversed(everything) if 20 < k <= 60]
+    assert list(merge()) == []
+
+
+def test_merge_is_lazy() -> None:
+    big = RedBlackTree.from_sorted(range(0, 100000, 2))
+    other = RedBlackTree.from_sorted(range(1, 100000, 2))
+    nodes = merge(big, other)
+    assert [next(nodes).get_key() for _ in range(5)] == [0, 1, 2, 3, 4]
+
+
+def test_zip_matching() -> None:
+    rng = random.Random(6)
+    for _ in range(30):
+        trees, keys = make_trees(rng, rng.randrange(1, 4))
+        common = sorted(set.intersection(*[set(k) for k in keys]))
+        matches = list(zip_matching(*trees))
+        assert [m[0].get_key() for m in matches] == common
+        for match in matches:
+            assert [n.value for n in match] == list(range(len(trees)))
+            assert len(set(n.get_key() for n in match)) == 1
+    big = RedBlackTree.from_sorted(range(100000))
+    small = RedBlackTree.from_sorted([-1, 5, 70000, 100001])
+    assert [a.get_key() for a, b in zip_matching(small, big)] == [5, 70000]
+    assert list(zip_matching()) == []
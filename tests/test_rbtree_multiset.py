@@ -0,0 +1,138 @@
+import os
+import random
+import tempfile
+from collections import Counter
+import pytest
+from rbtree import RedBlackTree
+from rbtree_multiset import MultisetRedBlackTree
+from test_rbtree import check_links
+
+
+def check_counts(bst: MultisetRedBlackTree, expected: Counter) -> None:
+    check_links(bst)
+    for node in bst.iter_inorder():
+        assert node._count > 0
+        assert node._total == node.left._total + node.right._total + \
+            node._count
+    assert bst.size == len(expected)
+    assert len(bst) == sum(expected.values())
+    assert list(bst.elements()) == sorted(expected.elements(),
+                                          key=bst._key_func)
+
+
+def test_counts() -> None:
+    bst = MultisetRedBlackTree()
+    for _ in range(1000):
+        bst.insert(42, "first")
+    bst.insert(7)
+    check_counts(bst, Counter({42: 1000, 7: 1}))
+    assert bst.count(42) == 1000
+    assert bst.count(8) == 0
+    assert bst[42] == "first"
+    assert bst.remove_one(42) == 999
+    assert bst.delete(42).get_key() == 42
+    assert bst.count(42) == 998
+    assert bst.remove_all(42) == 998
+    assert bst.remove_all(42) == 0
+    with pytest.raises(KeyError):
+        bst.remove_one(42)
+    assert bst.remove_one(7) == 0
+    assert bst.size == 0 and len(bst) == 0
+
+
+def test_elements_and_order_statistics() -> None:
+    bst = MultisetRedBlackTree.from_sorted([1, 1, 2, 5, 5, 5, 9])
+    assert bst.size == 4
+    assert list(bst.elements(2, 5)) == [2, 5, 5, 5]
+    assert list(bst.elements(reverse=True))[:4] == [9, 5, 5, 5]
+    assert [bst.select(i).get_key() for i in range(7)] == \
+        [1, 1, 2, 5, 5, 5, 9]
+    assert bst.select(-1).get_key() == 9
+    with pytest.raises(IndexError):
+        bst.select(7)
+    assert bst.rank(5) == 3
+    assert bst.count_range(1, 5) == 6
+    assert bst.count_range(1, 5, inclusive=(False, True)) == 4
+    assert bst.pop_max().get_key() == 9
+    assert bst.pop_min().get_key() == 1
+    assert bst.count(1) == 1
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_random_updates(seed: int) -> None:
+    rng = random.Random(seed)
+    bst = MultisetRedBlackTree(key=lambda k: -k)
+    expected = Counter()
+    for step in range(200):
+        op = rng.random()
+        if op < 0.4:
+            k = rng.randrange(30)
+            bst.insert(k)
+            expected[k] += 1
+        elif op < 0.6:
+            k = rng.randrange(30)
+            removed = bst.delete(k)
+            assert (removed is not bst.TNULL) == (expected[k] > 0)
+            expected[k] = max(expected[k] - 1, 0)
+        elif op < 0.7:
+            k = rng.randrange(30)
+            assert bst.remove_all(k) == expected.pop(k, 0)
+        elif op < 0.85:
+            batch = [rng.randrange(30) for _ in range(rng.randrange(40))]
+            bst.insert_many(batch)
+            expected.update(batch)
+        else:
+            batch = [rng.randrange(30) for _ in range(rng.randrange(40))]
+            bst.delete_many(batch)
+            for k in batch:
+                if expected[k]:
+                    expected[k] -= 1
+        expected = +expected
+        check_counts(bst, expected)
+
+
+def test_dump_and_load_keep_counts() -> None:
+    bst = MultisetRedBlackTree()
+    for key in [1, 1, 1, 2]:
+        bst.insert(key, str(key))
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "tree.bin")
+        bst.dump(path)
+        loaded = MultisetRedBlackTree.load(path)
+        check_counts(loaded, Counter({1: 3, 2: 1}))
+        assert loaded[1] == "1"
+        # A plain tree's repeated keys are collapsed into counted nodes
+        RedBlackTree.from_sorted([1, 1, 2]).dump(path)
+        check_counts(MultisetRedBlackTree.load(path), Counter({1: 2, 2: 1}))
+        # ...and a plain tree reads a multiset's dump one node per element
+        assert len(RedBlackTree.load(path)) == 3
+
+
+def test_join_counts_keys_at_the_seam() -> None:
+    M = MultisetRedBlackTree
+    bst = M.from_sorted([1, 1, 2]).join(2, M.from_sorted([3]))
+    check_counts(bst, Counter({1: 2, 2: 2, 3: 1}))
+    bst = M.from_sorted([1, 2]).join(2, M.from_sorted([2, 2, 3]))
+    check_counts(bst, Counter({1: 1, 2: 4, 3: 1}))
+    bst = M.from_sorted([1]).join(2, M.from_sorted([3]))
+    check_counts(bst, Counter({1: 1, 2: 1, 3: 1}))
+    left, right = bst.split(2)
+    check_counts(left, Counter({1: 1}))
+    check_counts(right, Counter({2: 1, 3: 1}))
+    with pytest.raises(Exception):
+        M.from_sorted([1, 3]).join(2, M.from_sorted([2]))
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_set_operations_combine_counts(seed: int) -> None:
+    rng = random.Random(seed)
+    M = MultisetRedBlackTree
+    for _ in range(20):
+        a = [rng.randrange(30) for _ in range(rng.randrange(60))]
+        b = [rng.randrange(30) for _ in range(rng.randrange(60))]
+        check_counts(M.from_sorted(a).union(M.from_sorted(b)),
+                     Counter(a) + Counter(b))
+        check_counts(M.from_sorted(a).intersection(M.from_sorted(b)),
+                     Counter(a) & Counter(b))
+        check_counts(M.from_sorted(a).difference(M.from_sorted(b)),
+                     Counter(a) - Counter(b))
@@ -0,0 +1,142 @@
+from rbtree_persistent import PersistentRedBlackTree, PersistentNode
+from typing import Any
+
+
+def check_valid_recur(node: PersistentNode) -> int:
+    if node is None:
+        return 1
+
+    if node.is_red():
+        assert node.left is None or node.left.is_black()
+        assert node.right is None or node.right.is_black()
+    if node.left is not None:
+        assert node.get_key() >= node.left.get_key()
+    if node.right is not None:
+        assert node.get_key() <= node.right.get_key()
+
+    left_count = check_valid_recur(node.left)
+    right_count = check_valid_recur(node.right)
+    assert left_count == right_count
+    assert node._size == 1 + (node.left._size if node.left else 0) + \
+        (node.right._size if node.right else 0)
+    return left_count + (1 if node.is_black() else 0)
+
+
+def check_valid(tree: PersistentRedBlackTree) -> None:
+    if tree.get_root() is not None:
+        assert tree.get_root().is_black()
+        assert tree.get_root()._size == tree.size
+    check_valid_recur(tree.get_root())
+
+
+def keys(tree: PersistentRedBlackTree) -> list:
+    return list(tree.keys())
+
+
+def test_insert_search() -> None:
+    tree = PersistentRedBlackTree()
+    assert tree.search(3) is None
+    for key in [55, 40, 58, 42, 42, 42, 43, 44, -10, 10, 100, 101]:
+        tree = tree.insert(key, str(key))
+        check_valid(tree)
+    assert len(tree) == 12
+    assert keys(tree) == sorted(keys(tree))
+    assert tree[43] == "43"
+    assert 44 in tree
+    assert 45 not in tree
+    assert tree.get(45, "spam") == "spam"
+    assert tree.minimum().get_key() == -10
+    assert tree.maximum().get_key() == 101
+
+
+def test_set() -> None:
+    tree = PersistentRedBlackTree().set(1, "a").set(2, "b").set(1, "c")
+    assert list(tree.items()) == [(1, "c"), (2, "b")]
+    check_valid(tree)
+
+
+def test_versions_are_independent() -> None:
+    versions = [PersistentRedBlackTree()]
+    for key in range(50):
+        versions.append(versions[-1].insert(key))
+    for key in range(0, 50, 2):
+        versions.append(versions[-1].delete(key))
+
+    for i in range(51):
+        assert keys(versions[i]) == list(range(i))
+        check_valid(versions[i])
+    assert keys(versions[-1]) == list(range(1, 50, 2))
+    check_valid(versions[-1])
+
+
+def test_delete() -> None:
+    tree = PersistentRedBlackTree()
+    assert tree.delete(5) is tree
+    with open("tests/small_input.txt") as infile:
+        reference = []
+        for line in infile:
+            sline = line.split()
+            key = int(sline[1])
+            if sline[0] == "a":
+                tree = tree.insert(key)
+                reference.append(key)
+            else:
+                tree = tree.delete(key)
+                if key in reference:
+                    reference.remove(key)
+            check_valid(tree)
+            assert keys(tree) == sorted(reference)
+
+
+def test_delete_patterns() -> None:
+    tree = PersistentRedBlackTree.from_sorted(range(200))
+    # Interleave deletes from both ends and the middle, plus duplicates
+    for key in [100, 0, 199, 50, 150, 1, 198, 99, 101]:
+        tree = tree.insert(key)
+    order = list(range(0, 200, 3)) + list(range(1, 200, 3)) + \
+        list(range(2, 200, 3))
+    expected = sorted(list(range(200)) + [100, 0, 199, 50, 150, 1, 198, 99,
+                                          101])
+    for key in order:
+        tree = tree.delete(key)
+        expected.remove(key)
+        check_valid(tree)
+    assert keys(tree) == expected
+
+
+def test_from_sorted() -> None:
+    for n in range(40):
+        tree = PersistentRedBlackTree.from_sorted(range(n))
+        assert keys(tree) == list(range(n))
+        check_valid(tree)
+    tree = PersistentRedBlackTree.from_sorted([(2, "b"), (1, "a")],
+                                              items=True)
+    assert list(tree.items()) == [(1, "a"), (2, "b")]
+
+
+def test_iteration() -> None:
+    tree = PersistentRedBlackTree.from_sorted([(1, "a"), (2, "b")],
+                                              items=True)
+    nodes: Any = list(tree)
+    assert [node.get_key() for node in nodes] == [1, 2]
+    assert list(tree.values()) == ["a", "b"]
+    assert tree.inorder() == nodes
+
+
+def test_irange() -> None:
+    tree = PersistentRedBlackTree.from_sorted(range(0, 40, 2))
+    for lo in [None, -1, 0, 7, 8, 38, 50]:
+        for hi in [None, -1, 0, 7, 8, 38, 50]:
+            for inclusive in [(True, True), (False, True), (True, False),
+                              (False, False)]:
+                expected = [k for k in range(0, 40, 2)
+                            if (lo is None or k > lo or
+                                (inclusive[0] and k == lo)) and
+                            (hi is None or k < hi or
+                             (inclusive[1] and k == hi))]
+                assert [n.get_key() for n in
+                        tree.irange(lo, hi, inclusive)] == expected
+                assert [n.get_key() for n in
+                        tree.irange(lo, hi, inclusive, reverse=True)] == \
+                    expected[::-1]
+    assert list(PersistentRedBlackTree().irange(1, 2)) == []
@@ -0,0 +1,105 @@
+import random
+import pytest
+from rbtree_sharded import ShardedRedBlackTree
+
+
+def sum_values(pairs: object) -> int:
+    return sum(value for _, value in pairs)
+
+
+def check_shards(stree: ShardedRedBlackTree) -> None:
+    pairs = stree.items()
+    assert len(pairs) == len(stree) == sum(stree.shard_sizes())
+    assert [key for key, _ in pairs] == sorted(key for key, _ in pairs)
+    for key, _ in pairs:
+        assert stree.search(key) is not None
+
+
+def test_point_operations() -> None:
+    with ShardedRedBlackTree(boundaries=[10, 20]) as stree:
+        for key in [5, 15, 25, 10, 20]:
+            stree.insert(key, key * 2)
+        assert stree.shard_sizes() == [1, 2, 2]
+        assert stree.shard_of(9) == 0 and stree.shard_of(10) == 1
+        assert stree.search(15) == (15, 30)
+        assert stree.search(16) is None
+        assert stree[20] == 40
+        assert 25 in stree and 26 not in stree
+        assert stree.get(26, "x") == "x"
+        stree[15] = "fifteen"
+        assert stree[15] == "fifteen"
+        assert len(stree) == 5
+        assert stree.delete(5) and not stree.delete(5)
+        del stree[25]
+        with pytest.raises(KeyError):
+            del stree[25]
+        with pytest.raises(KeyError):
+            stree[25]
+        assert stree.select(0) == (10, 20)
+        assert stree.select(-1) == (20, 40)
+        with pytest.raises(IndexError):
+            stree.select(3)
+        check_shards(stree)
+
+
+def test_ranges() -> None:
+    with ShardedRedBlackTree(boundaries=[25, 50, 75]) as stree:
+        stree.insert_many([(key, key) for key in range(0, 100, 3)],
+                          items=True)
+        keys = list(range(0, 100, 3))
+        for lo, hi in [(None, None), (10, 60), (25, 75), (-5, 200),
+                       (30, 31), (80, 20)]:
+            for inclusive in [(True, True), (False, False)]:
+                expected = [k for k in keys
+                            if (lo is None or k > lo or
+                                (inclusive[0] and k == lo)) and
+                            (hi is None or k < hi or
+                             (inclusive[1] and k == hi))]
+                assert [k for k, _ in stree.irange(lo, hi, inclusive)] == \
+                    expected
+                assert [k for k, _ in stree.irange(lo, hi, inclusive,
+                                                   reverse=True)] == \
+                    expected[::-1]
+                assert stree.count_range(lo, hi, inclusive) == len(expected)
+                assert sum(stree.map_range(sum_values, lo, hi,
+                                           inclusive)) == sum(expected)
+
+
+def test_batches_and_rebalance() -> None:
+    rng = random.Random(3)
+    with ShardedRedBlackTree(shards=3) as stree:
+        stree.rebalance_min = 50
+        keys = [rng.randrange(1000) for _ in range(300)]
+        stree.insert_many(keys)
+        # The first batch picks even boundaries
+        assert len(stree.boundaries) == 2
+        assert max(stree.shard_sizes()) <= 110
+        # Skewed inserts trigger a rebalance
+        for key in range(2000, 2400):
+            stree.insert(key)
+        assert max(stree.shard_sizes()) <= 2 * len(stree) / 3
+        stree.delete_many(keys[:100])
+        expected = sorted(keys[100:] + list(range(2000, 2400)))
+        assert [key for key, _ in stree.items()] == expected
+        stree.rebalance()
+        assert [key for key, _ in stree.items()] == expected
+        assert max(stree.shard_sizes()) - min(stree.shard_sizes()) <= 2
+        check_shards(stree)
+
+
+def test_rebalance_from_one_shard() -> None:
+    with ShardedRedBlackTree(shards=4) as stree:
+        stree.rebalance_min = 20
+        for key in range(100):
+            stree.insert(key)
+        assert len(stree.boundaries) == 3
+        assert max(stree.shard_sizes()) <= 50
+        assert [key for key, _ in stree.items()] == list(range(100))
+
+
+def test_remote_errors() -> None:
+    with ShardedRedBlackTree(shards=2) as stree:
+        stree.insert(1)
+        with pytest.raises(TypeError):
+            stree.insert("a")
+        assert stree.search(1) == (1, None)